@@ -0,0 +1,358 @@
+import json
+import numpy as np
+from history import ChunkedArray
+
+# 事件记录：sample 为报警/解除时的采样点编号（日志按此有序），onset 为该次报警条件开始成立的编号，
+# lead 为导联编号（-1 表示不区分导联），active 为 1 表示报警、0 表示解除，value 为当时的数值
+EVENT_DTYPE = np.dtype([('sample', '<i8'), ('onset', '<i8'), ('rule', '<i2'), ('lead', '<i2'),
+                        ('active', 'u1'), ('value', '<f4')])
+# 报警记录的索引：(sample, 在事件日志中的位置)
+INDEX_DTYPE = np.dtype([('sample', '<i8'), ('position', '<i8')])
+
+# 信号质量汇总（SignalQualityMonitor.summary）中按导联排列的项
+QUALITY_SOURCES = ('lead_off', 'flat', 'quality', 'saturation', 'hf_noise', 'baseline_wander')
+
+
+class ThresholdRule:
+    """单个阈值报警规则
+
+    source 为数据来源：
+      - 'rr_gap'：距上一个 R 波的秒数（每批数据末尾和每个 R 波处取值），用于停搏报警
+      - HRV 快照中的键，如 'heart_rate'、'SDNN_1min'：每个心拍取一次值，0（数据不足）视为无效
+      - 信号质量中的逐导联项，如 'lead_off'：每次重新评估取一次值，每个导联独立报警
+    above=True 时数值 >= level 进入报警条件、< clear 退出；above=False 时 <= level 进入、> clear 退出，
+    level 与 clear 之间为回差区，保持原状态。条件连续成立 delay 秒后才报警（去抖），条件退出即解除。
+    """
+
+    def __init__(self, name, label, source, level, clear=None, above=True, delay=0.0):
+        self.name = name
+        self.label = label  # 界面显示的名称
+        self.source = source
+        self.level = level
+        self.clear = level if clear is None else clear
+        self.above = above
+        self.delay = delay
+        self.reset()
+
+    def reset(self):
+        self.condition = None  # (k,) 回差判断后的条件状态
+        self.since = None  # (k,) 条件开始成立的采样点编号
+        self.active = None  # (k,) 是否正在报警
+
+    def config(self):
+        """可写入 JSON 的规则参数，load_rules 读回"""
+        return {'name': self.name, 'label': self.label, 'source': self.source, 'level': self.level,
+                'clear': self.clear, 'above': self.above, 'delay': self.delay}
+
+    def evaluate(self, samples, values, fs):
+        """按时间顺序的一组取值 samples (m,)、values (m,) 或 (m, k)，返回报警状态变化
+
+        所有取值点和导联一次完成：回差状态由每个点之前最后一次进入/退出决定（累积最大值找到该位置），
+        去抖用同样的方法找到当前条件的起点。返回 (samples, onsets, leads, active, values)，按时间排列。
+        """
+        samples = np.asarray(samples, dtype=np.int64)
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 1:
+            values = values[:, None]
+        m, k = values.shape
+        if m == 0:
+            return _NO_CHANGES
+        if self.condition is None or len(self.condition) != k:
+            self.condition = np.zeros(k, dtype=bool)
+            self.since = np.zeros(k, dtype=np.int64)
+            self.active = np.zeros(k, dtype=bool)
+
+        # 与 NaN 的比较均为 False，无效值不改变状态
+        if self.above:
+            enter, leave = values >= self.level, values < self.clear
+        else:
+            enter, leave = values <= self.level, values > self.clear
+        rows = np.arange(m)[:, None]
+        columns = np.arange(k)
+        last = np.maximum.accumulate(np.where(enter | leave, rows, -1), axis=0)
+        condition = np.where(last >= 0, enter[np.maximum(last, 0), columns], self.condition)
+
+        previous = np.vstack((self.condition, condition[:-1]))
+        start = np.maximum.accumulate(np.where(condition & ~previous, rows, -1), axis=0)
+        since = np.where(start >= 0, samples[np.maximum(start, 0)], self.since)
+        active = condition & (samples[:, None] - since >= self.delay * fs)
+
+        previous_active = np.vstack((self.active, active[:-1]))
+        changed_rows, leads = np.nonzero(active != previous_active)
+        self.condition = condition[-1]
+        self.since = since[-1]
+        self.active = active[-1]
+        if k == 1:
+            lead_numbers = np.full(len(leads), -1)
+        else:
+            lead_numbers = leads
+        return (samples[changed_rows], since[changed_rows, leads], lead_numbers,
+                active[changed_rows, leads], values[changed_rows, leads])
+
+
+_NO_CHANGES = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+               np.zeros(0, dtype=bool), np.zeros(0))
+
+
+def default_rules():
+    """默认报警规则（每次调用返回新的实例）"""
+    return [
+        ThresholdRule('tachycardia', "心动过速", 'heart_rate', 120, clear=110, above=True, delay=5.0),
+        ThresholdRule('bradycardia', "心动过缓", 'heart_rate', 45, clear=50, above=False, delay=5.0),
+        ThresholdRule('asystole', "停搏", 'rr_gap', 4.0, clear=2.0, above=True),
+        ThresholdRule('lead_off', "导联脱落", 'lead_off', 1, clear=0.5, above=True, delay=1.0),
+        ThresholdRule('low_hrv', "心率变异性过低", 'SDNN_1min', 20, clear=25, above=False, delay=30.0),
+    ]
+
+
+def load_rules(path):
+    """从 JSON 文件读取规则参数列表，每项为 ThresholdRule 的参数（格式同 ThresholdRule.config()）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [dict(item) for item in json.load(f)]
+
+
+def _searchsorted(array, value, side='left'):
+    """在按 sample 字段有序的 ChunkedArray 中二分查找插入位置：先按每块最后一条找到所在块，再在块内查找"""
+    length = len(array)  # 先取长度，之后追加的数据不影响本次查找
+    chunk_len = array.chunk_len
+    chunks = array.chunks
+    low, high = 0, -(-length // chunk_len)
+    n_chunks = high
+    while low < high:
+        middle = (low + high) // 2
+        key = chunks[middle]['sample'][min(chunk_len, length - middle * chunk_len) - 1]
+        if key < value or (side == 'right' and key == value):
+            low = middle + 1
+        else:
+            high = middle
+    if low == n_chunks:
+        return length
+    count = min(chunk_len, length - low * chunk_len)
+    return low * chunk_len + int(np.searchsorted(chunks[low]['sample'][:count], value, side=side))
+
+
+class EventLog:
+    """只追加的报警事件日志，按采样点编号有序
+
+    记录保存在 ChunkedArray 中（每条 25 字节，长时间会话也不需要移动已有数据），
+    另为全部报警和每个规则各保存一份 (编号, 位置) 索引。按时间段统计报警次数、
+    查找某时刻之前/之后的报警都是在有序数组上二分查找，O(log n)。
+    单写者/单读者：采集线程追加，界面线程查询，无需加锁。
+    """
+
+    def __init__(self, rule_names, labels=None, directory=None, chunk_len=4096):
+        self.rule_names = list(rule_names)
+        self.labels = dict(labels or {})  # 规则名 -> 显示名称
+        self.records = ChunkedArray((), dtype=EVENT_DTYPE, chunk_len=chunk_len, directory=directory,
+                                    name='events')
+        self.alarms = ChunkedArray((), dtype=INDEX_DTYPE, chunk_len=chunk_len, directory=directory,
+                                   name='alarms')
+        self.rule_alarms = [ChunkedArray((), dtype=INDEX_DTYPE, chunk_len=chunk_len, directory=directory,
+                                         name=f'alarms_{i}') for i in range(len(self.rule_names))]
+
+    def __len__(self):
+        return len(self.records)
+
+    def last_sample(self):
+        n = len(self.records)
+        return int(self.records.read(n - 1, n)['sample'][0]) if n else None
+
+    def append(self, records):
+        """追加一批按 sample 排序的记录（EVENT_DTYPE），sample 不得早于已有的记录"""
+        if len(records) == 0:
+            return
+        first = len(self.records)
+        self.records.append(records)
+        # 索引在记录写入之后追加，读者从索引查到的位置总是有效的
+        raised = np.flatnonzero(records['active'])
+        if len(raised):
+            index = np.zeros(len(raised), dtype=INDEX_DTYPE)
+            index['sample'] = records['sample'][raised]
+            index['position'] = first + raised
+            for rule in np.unique(records['rule'][raised]).tolist():
+                self.rule_alarms[rule].append(index[records['rule'][raised] == rule])
+            self.alarms.append(index)
+
+    def _index(self, rule):
+        if rule is None:
+            return self.alarms
+        return self.rule_alarms[self.rule_names.index(rule)]
+
+    def count(self, start=None, stop=None, rule=None):
+        """[start, stop) 采样点范围内的报警次数，rule 为规则名（None 为全部规则）"""
+        index = self._index(rule)
+        first = 0 if start is None else _searchsorted(index, start)
+        last = len(index) if stop is None else _searchsorted(index, stop)
+        return max(last - first, 0)
+
+    def next_alarm(self, sample, rule=None):
+        """sample 之后（不含）的第一次报警，没有时返回 None"""
+        index = self._index(rule)
+        position = _searchsorted(index, sample, side='right')
+        if position >= len(index):
+            return None
+        return self.event(int(index.read(position, position + 1)['position'][0]))
+
+    def previous_alarm(self, sample, rule=None):
+        """sample 之前（不含）的最后一次报警，没有时返回 None"""
+        index = self._index(rule)
+        position = _searchsorted(index, sample) - 1
+        if position < 0:
+            return None
+        return self.event(int(index.read(position, position + 1)['position'][0]))
+
+    def read(self, start, stop):
+        """第 start 到 stop 条记录（EVENT_DTYPE 数组）"""
+        return self.records.read(start, stop)
+
+    def between(self, start, stop):
+        """[start, stop) 采样点范围内的全部记录（报警和解除）"""
+        return self.records.read(_searchsorted(self.records, start), _searchsorted(self.records, stop))
+
+    def event(self, position):
+        """第 position 条记录转换为字典"""
+        return self.to_dict(self.records.read(position, position + 1)[0])
+
+    def to_dict(self, record):
+        rule = self.rule_names[int(record['rule'])]
+        return {
+            'sample': int(record['sample']),
+            'onset': int(record['onset']),
+            'rule': rule,
+            'label': self.labels.get(rule, rule),
+            'lead': int(record['lead']),
+            'active': bool(record['active']),
+            'value': float(record['value'])
+        }
+
+    def close(self):
+        self.records.close()
+        self.alarms.close()
+        for index in self.rule_alarms:
+            index.close()
+
+
+class AlarmEngine:
+    """基于规则的报警引擎，作为 SerialHandler 的数据输出端
+
+    write_r_peak / write_hrv 收集本批的心拍和 HRV 快照，write_processed 时对本批数据一次评估所有规则：
+    每个规则的取值整理成 (编号, 数值) 数组后用 NumPy 完成回差和去抖判断，不逐样本执行 Python 代码。
+    报警和解除写入 EventLog；active 和 summary() 供界面线程读取。
+    rules 的每项为 ThresholdRule 或其参数字典（规则带有状态，多个引擎之间传参数字典）。
+    quality 为返回信号质量汇总的函数（SerialHandler.get_signal_quality），仅在有规则使用导联质量项时调用。
+    事件的 sample 取评估时的编号，R 波和信号质量的编号可能略早于已记录的事件（相差不超过一批数据），
+    此时按已记录的最后编号保存以保持日志有序，onset 保留原始编号。
+    """
+
+    def __init__(self, fs=250, rules=None, quality=None, directory=None):
+        self.fs = fs
+        if rules is None:
+            self.rules = default_rules()
+        else:
+            self.rules = [ThresholdRule(**rule) if isinstance(rule, dict) else rule for rule in rules]
+        self.quality = quality
+        self.log = EventLog([rule.name for rule in self.rules], {rule.name: rule.label for rule in self.rules},
+                            directory=directory)
+        self.reset()
+
+    def reset(self):
+        self.next_sample = 0  # 下一个收到的样本编号
+        self.last_peak = 0  # 上一个 R 波的编号（开始时按第 0 个样本计算停搏时间）
+        self.beats = []  # 本批收到的 R 波编号
+        self.hrv = []  # 本批收到的 (编号, HRV 快照)
+        self.quality_version = None
+        self.active = []  # 正在报警的 (规则名, 导联)，整体替换
+        self.version = 0
+        for rule in self.rules:
+            rule.reset()
+
+    # ---- 数据输出端接口 ----
+
+    def write_raw(self, frames):
+        pass
+
+    def write_processed(self, frames):
+        self.next_sample += len(frames)
+        self.evaluate()
+
+    def write_r_peak(self, sample_index):
+        self.beats.append(int(sample_index))
+
+    def write_hrv(self, sample_index, hrv_data):
+        self.hrv.append((int(sample_index), hrv_data))
+
+    # ---- 规则评估 ----
+
+    def _series(self, source, cache):
+        """source 在本批中的 (编号, 数值) 数组"""
+        if source in cache:
+            return cache[source]
+        peak = self.beats[-1] if self.beats else self.last_peak
+        now = max(self.next_sample, peak)
+        if source == 'rr_gap':
+            beats = np.array(self.beats, dtype=np.int64)
+            samples = np.append(beats, now)
+            values = np.append(np.zeros(len(beats)), (now - peak) / self.fs)
+            order = np.argsort(samples, kind='stable')
+            series = (samples[order], values[order])
+        elif source in QUALITY_SOURCES:
+            summary = self.quality() if self.quality is not None else {}
+            if summary.get('version', 0) in (0, self.quality_version) or source not in summary:
+                series = (np.zeros(0, dtype=np.int64), np.zeros((0, 1)))
+            else:
+                series = (np.array([now]), np.array([summary[source]], dtype=float))
+                cache['quality_version'] = summary['version']
+        else:
+            samples = np.array([sample for sample, _ in self.hrv], dtype=np.int64)
+            values = np.array([data.get(source, 0) for _, data in self.hrv], dtype=float)
+            values[values == 0] = np.nan  # 数据不足时 HRV 快照为 0
+            series = (samples, values)
+        cache[source] = series
+        return series
+
+    def evaluate(self):
+        """对本批收集的数据评估所有规则，把状态变化写入事件日志"""
+        cache = {}
+        parts = []
+        for rule_index, rule in enumerate(self.rules):
+            samples, values = self._series(rule.source, cache)
+            changes = rule.evaluate(samples, values, self.fs)
+            if len(changes[0]):
+                records = np.zeros(len(changes[0]), dtype=EVENT_DTYPE)
+                records['sample'], records['onset'], records['lead'], records['active'], records['value'] = changes
+                records['rule'] = rule_index
+                parts.append(records)
+        if 'quality_version' in cache:
+            self.quality_version = cache['quality_version']
+        if self.beats:
+            self.last_peak = self.beats[-1]
+        self.beats = []
+        self.hrv = []
+        if not parts:
+            return
+
+        records = np.concatenate(parts)
+        records = records[np.argsort(records['sample'], kind='stable')]
+        last = self.log.last_sample()
+        if last is not None:
+            records['sample'] = np.maximum(records['sample'], last)
+        self.log.append(records)
+        self.active = [(rule.name, lead if len(rule.active) > 1 else -1)
+                       for rule in self.rules if rule.active is not None
+                       for lead in np.flatnonzero(rule.active).tolist()]
+        self.version += 1
+
+    def summary(self, recent=10):
+        """正在报警的项目、最近 recent 条事件和各规则的报警次数（跨线程读取用）"""
+        log = self.log
+        n = len(log)
+        return {
+            'active': [{'rule': name, 'label': log.labels[name], 'lead': lead} for name, lead in self.active],
+            'recent': [log.to_dict(record) for record in log.read(n - recent, n)],
+            'counts': {rule.name: log.count(rule=rule.name) for rule in self.rules},
+            'fs': self.fs,
+            'version': self.version
+        }
+
+    def close(self):
+        self.log.close()
@@ -0,0 +1,147 @@
+import numpy as np
+
+
+class BeatTemplateEngine:
+    """各导联的代表性平均心拍（中值模板），用于 ST 段和形态观察
+
+    作为 SerialHandler 的数据输出端：write_processed 收到去噪后的样本，write_r_peak 收到 R 波位置，
+    R 波之后的样本到齐时截取 [R - pre, R + post) 的十二导联窗口，处理步骤均对所有导联一次完成：
+    - 对齐：在 ±max_shift 范围内找与当前模板内积最大的位置，消除检测位置的抖动
+    - 剔除：初始模板建立后，各导联与模板的相关系数按模板能量加权平均，低于 min_correlation 的心拍（早搏、伪差）不参与更新
+    - 更新：模板按 template += step * sign(beat - template) 逐拍逼近中值，step 取各点平均绝对偏差的一部分，
+      每拍只需 O(窗口长度 × 导联数)；接受的心拍同时存入 capacity 个窗口的环形矩阵，
+      每凑满一轮用精确中值重新校准一次，摊到每拍的代价仍是常数
+    template 在每次更新时整体替换，界面线程读取到的总是完整的一份。
+    """
+
+    def __init__(self, fs=250, n_channels=12, pre=0.25, post=0.45, capacity=32, min_beats=8,
+                 min_correlation=0.8, max_shift=0.04, learning_rate=0.1):
+        self.fs = fs
+        self.n_channels = n_channels
+        self.pre = int(pre * fs)  # R 波前的样本数
+        self.post = int(post * fs)  # R 波后的样本数
+        self.length = self.pre + self.post
+        self.capacity = capacity
+        self.min_beats = min_beats  # 前 min_beats 个心拍直接取中值作为初始模板
+        self.min_correlation = min_correlation
+        self.max_shift = int(max_shift * fs)
+        self.learning_rate = learning_rate
+        # 保留的去噪样本：足够截取最早一个待处理心拍的窗口
+        self.history_size = self.length + 2 * self.max_shift + fs * 2
+        self.reset()
+
+    def reset(self, start_sample=0):
+        self.samples = np.zeros((self.history_size, self.n_channels))
+        self.next_sample = start_sample  # 下一个收到的样本编号
+        self.pending = []  # 等待后续样本到齐的 R 波位置
+        self.beats = np.zeros((self.capacity, self.length, self.n_channels))  # 已接受心拍的环形矩阵
+        self.beat_count = 0  # 累计接受的心拍数
+        self.rejected = 0
+        self.template = None  # (length, n_channels)
+        self.deviation = None  # 各点的平均绝对偏差，决定中值更新的步长
+        self.last_correlation = None
+        self.version = 0
+
+    # ---- 数据输出端接口 ----
+
+    def write_raw(self, frames):
+        pass
+
+    def write_processed(self, frames):
+        frames = np.asarray(frames, dtype=float)
+        n = len(frames)
+        if n == 0:
+            return
+        if n >= self.history_size:
+            self.samples[:] = frames[-self.history_size:]
+        else:
+            # 旧数据前移，新数据放在末尾；每批只有几十个样本，拷贝代价很小
+            self.samples[:-n] = self.samples[n:]
+            self.samples[-n:] = frames
+        self.next_sample += n
+        self._process_pending()
+
+    def write_r_peak(self, sample_index):
+        self.pending.append(int(sample_index))
+        self._process_pending()
+
+    def write_hrv(self, sample_index, hrv_data):
+        pass
+
+    # ---- 模板更新 ----
+
+    def _process_pending(self):
+        oldest = self.next_sample - self.history_size
+        while self.pending:
+            peak = self.pending[0]
+            start = peak - self.pre - self.max_shift
+            stop = peak + self.post + self.max_shift
+            if stop > self.next_sample:
+                break  # 后续样本尚未到齐
+            self.pending.pop(0)
+            if start < oldest:
+                continue  # 已超出保留的数据
+            offset = start - oldest
+            self.add_beat(self.samples[offset:offset + stop - start])
+
+    def _align(self, segment):
+        """segment 为两侧各多 max_shift 个样本的窗口，返回与模板最吻合的 (length, n_channels) 窗口"""
+        shift = self.max_shift
+        if self.template is None or shift == 0:
+            return segment[shift:shift + self.length]
+        centered = self.template - self.template.mean(axis=0)
+        index = np.arange(2 * shift + 1)[:, None] + np.arange(self.length)
+        candidates = segment[index]  # (2*shift+1, length, n_channels)
+        scores = np.einsum('sln,ln->s', candidates, centered)
+        return candidates[int(np.argmax(scores))]
+
+    def correlation(self, beat):
+        """各导联与当前模板的相关系数按模板能量加权平均"""
+        a = beat - beat.mean(axis=0)
+        b = self.template - self.template.mean(axis=0)
+        energy_a = np.sum(a * a, axis=0)
+        energy_b = np.sum(b * b, axis=0)
+        denominator = np.sqrt(energy_a * energy_b)
+        per_lead = np.divide(np.sum(a * b, axis=0), denominator, out=np.zeros(self.n_channels),
+                             where=denominator > 0)
+        total = energy_b.sum()
+        if total <= 0:
+            return 0.0
+        return float(np.dot(per_lead, energy_b) / total)
+
+    def add_beat(self, segment):
+        """处理一个截取好的心拍窗口（两侧各多 max_shift 个样本），返回是否被接受"""
+        beat = self._align(np.asarray(segment, dtype=float))
+        if self.beat_count >= self.min_beats:
+            self.last_correlation = self.correlation(beat)
+            if self.last_correlation < self.min_correlation:
+                self.rejected += 1
+                return False
+
+        self.beats[self.beat_count % self.capacity] = beat
+        self.beat_count += 1
+        if self.beat_count <= self.min_beats or self.beat_count % self.capacity == 0:
+            # 初始阶段和每满一轮：用环形矩阵中的心拍精确计算中值
+            stored = self.beats[:min(self.beat_count, self.capacity)]
+            template = np.median(stored, axis=0)
+            self.deviation = np.mean(np.abs(stored - template), axis=0) + 1e-6
+        else:
+            difference = beat - self.template
+            template = self.template + self.learning_rate * self.deviation * np.sign(difference)
+            self.deviation += self.learning_rate * (np.abs(difference) - self.deviation)
+        self.template = template
+        self.version += 1
+        return True
+
+    def summary(self):
+        """当前模板和统计（跨线程读取用）"""
+        template = self.template
+        return {
+            'template': None if template is None else template.copy(),
+            'fs': self.fs,
+            'pre': self.pre,
+            'beats': self.beat_count,
+            'rejected': self.rejected,
+            'correlation': self.last_correlation,
+            'version': self.version
+        }
@@ -0,0 +1,636 @@
+"""SerialHandler 与 ECGMonitorUI 热点路径的性能测试
+
+用法:
+    python benchmark.py                      # 全部测试，结果以 JSON 输出到标准输出
+    python benchmark.py --output bench.json  # 结果写入文件，便于不同提交之间对比
+    python benchmark.py --skip-ui --rates 250 1000
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import contextlib
+import subprocess
+import numpy as np
+
+from frame_parser import FrameParser, encode_frames, derive_leads, TRANSMITTED_LEADS
+from qrs_detector import evaluate_detections
+from hrv import analyze_rr
+from sources import SyntheticECGSource
+from serial_handle import SerialHandler
+from instrumentation import MetricsWindow
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class MemorySerialPort:
+    """内存中的假串口：每次 in_waiting 给出一个刷新周期的数据"""
+
+    def __init__(self, data, chunk_size):
+        self.data = data
+        self.chunk_size = chunk_size
+        self.position = 0
+        self.is_open = True
+
+    @property
+    def in_waiting(self):
+        return min(self.chunk_size, len(self.data) - self.position)
+
+    def read(self, size=1):
+        data = self.data[self.position:self.position + size]
+        self.position += len(data)
+        return data
+
+    def close(self):
+        self.is_open = False
+
+
+def peak_rss_mb():
+    """进程峰值常驻内存（MB），不支持的平台返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def summarize(name, call_times, items_per_call, unit='frames'):
+    """汇总一组计时结果"""
+    call_times = np.asarray(call_times)
+    items = np.asarray(items_per_call)
+    total_time = call_times.sum()
+    # 每个样本的延迟取其所在批次的处理时间
+    per_item = np.repeat(call_times, items) if items.sum() else call_times
+    return {
+        'name': name,
+        'unit': unit,
+        'calls': len(call_times),
+        'items': int(items.sum()),
+        'total_s': float(total_time),
+        f'{unit}_per_s': float(items.sum() / total_time) if total_time > 0 else None,
+        'p50_ms': float(np.percentile(per_item, 50) * 1000),
+        'p99_ms': float(np.percentile(per_item, 99) * 1000),
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+
+def time_calls(func, args_list):
+    """依次调用 func(*args)，返回每次调用的耗时"""
+    times = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def synthetic_frames(n, fs=250, seed=0):
+    source = SyntheticECGSource(fs=fs, speed=0, seed=seed)
+    return source.generate(0, n), source
+
+
+def make_handler(fs=250, data=b'', chunk_size=4096):
+    return SerialHandler(source=MemorySerialPort(data, chunk_size), fs=fs)
+
+
+def warmed_up_handler(fs=250):
+    """已处理过 1 秒数据（基线滤波器已有状态）的处理器，之后的测试直接从归一化阶段开始"""
+    handler = make_handler(fs)
+    frames, _ = synthetic_frames(fs, fs)
+    handler.normalize_frames(frames)
+    return handler
+
+
+def bench_parse(n_frames, batch):
+    frames, _ = synthetic_frames(n_frames)
+    results = []
+    for frame_format in ('ascii', 'binary16', 'binary24'):
+        data = encode_frames(np.clip(frames, -32768, 32767), frame_format)
+        chunk = len(data) // (n_frames // batch)
+        chunks = [(data[i:i + chunk],) for i in range(0, len(data), chunk)]
+        parser = FrameParser(frame_format=frame_format)
+        counts = []
+
+        def feed(block):
+            counts.append(len(parser.feed(block)))
+
+        times = time_calls(feed, chunks)
+        results.append(summarize(f'parse_{frame_format}', times, counts))
+    return results
+
+
+def bench_lead_modes(n_frames, batch):
+    """12 导联与 8 导联（接收端导出肢体导联）协议的每帧字节数和解析（含导出）吞吐量"""
+    frames, _ = synthetic_frames(n_frames)
+    results = []
+    for frame_format in ('ascii', 'binary16'):
+        for leads in (12, 8):
+            data = encode_frames(np.clip(frames[:, list(TRANSMITTED_LEADS[leads])], -32768, 32767), frame_format)
+            chunk = len(data) // (n_frames // batch)
+            chunks = [(data[i:i + chunk],) for i in range(0, len(data), chunk)]
+            parser = FrameParser(n_channels=leads, frame_format=frame_format)
+            counts = []
+
+            def feed(block):
+                parsed = parser.feed(block)
+                if leads == 8:
+                    parsed = derive_leads(parsed)
+                counts.append(len(parsed))
+
+            times = time_calls(feed, chunks)
+            result = summarize(f'parse_{frame_format}_{leads}leads', times, counts)
+            result['bytes_per_frame'] = len(data) / n_frames
+            results.append(result)
+    return results
+
+
+def bench_normalize(n_frames, batch):
+    handler = warmed_up_handler()
+    frames, _ = synthetic_frames(n_frames)
+    blocks = [(frames[i:i + batch],) for i in range(0, n_frames, batch)]
+    times = time_calls(handler.normalize_frames, blocks)
+    return summarize('normalize_frames', times, [len(b[0]) for b in blocks])
+
+
+def bench_baseline(n_frames, batch):
+    """连续基线去除：高通 IIR 与两级中值滤波"""
+    from baseline import create_baseline_filter
+
+    frames, _ = synthetic_frames(n_frames)
+    blocks = [(frames[i:i + batch],) for i in range(0, n_frames, batch)]
+    results = []
+    for method in ('highpass', 'median'):
+        baseline_filter = create_baseline_filter(method)
+        counts = []
+
+        def remove_baseline(block):
+            counts.append(len(baseline_filter.process(block)))
+
+        times = time_calls(remove_baseline, blocks)
+        summary = summarize(f'baseline_{method}', times, counts)
+        summary['latency_samples'] = baseline_filter.latency()
+        results.append(summary)
+    return results
+
+
+def bench_wavelet(n_windows):
+    handler = warmed_up_handler()
+    windows = [(np.random.default_rng(i).normal(0, 0.1, (12, handler.wavelet_window)),) for i in range(n_windows)]
+    times = time_calls(handler.wavelet_denoise, windows)
+    return summarize('wavelet_denoise_12x64', times, [1] * n_windows, unit='windows')
+
+
+def bench_denoise(n_frames, batch):
+    results = []
+    for hop in (1, 16, 32):
+        handler = warmed_up_handler()
+        handler.denoiser.hop = hop
+        handler.denoiser.reset()
+        frames, _ = synthetic_frames(n_frames)
+        normalized = handler.normalize_frames(frames)
+        blocks = [(normalized[i:i + batch],) for i in range(0, len(normalized), batch)]
+        counts = []
+
+        def denoise(block):
+            counts.append(len(handler.pipeline.denoise(block)))
+
+        times = time_calls(denoise, blocks)
+        results.append(summarize(f'denoise_frames_hop{hop}', times, counts))
+    return results
+
+
+def bench_r_peak(n_samples, batch):
+    handler = warmed_up_handler()
+    frames, _ = synthetic_frames(n_samples)
+    normalized = handler.normalize_frames(frames)
+    blocks = [(normalized[i:i + batch],) for i in range(0, len(normalized), batch)]
+    times = time_calls(handler.pipeline.detect, blocks)
+    return summarize('detect_r_peak', times, [len(b[0]) for b in blocks], unit='samples')
+
+
+def corrupt_lead_i(frames, case, seed=0):
+    """模拟导联I的故障：flat 为导联脱落（平直），noisy 为 1mV 噪声"""
+    frames = frames.copy()
+    if case == 'flat':
+        frames[:, 0] = frames[0, 0]
+    elif case == 'noisy':
+        frames[:, 0] += np.round(np.random.default_rng(seed).normal(0, 4000, len(frames))).astype(frames.dtype)
+    return frames
+
+
+def bench_qrs_accuracy(duration=300.0, fs=250, batch=5):
+    """用带 R 波标注的模拟心电评估 QRS 检测的灵敏度、阳性预测值和 R 波定位误差"""
+    cases = [(heart_rate, noise, 'clean', 0.1) for heart_rate in (50, 72, 120, 180) for noise in (0.02, 0.1, 0.2)]
+    cases += [(72, 0.02, 'flat', 0.1), (72, 0.02, 'noisy', 0.1), (72, 0.1, 'clean', 2.0)]
+    results = []
+    for heart_rate, noise, lead_i, wander in cases:
+        source = SyntheticECGSource(fs=fs, speed=0, heart_rate=heart_rate, noise=noise, wander=wander, seed=1)
+        n_frames = int(duration * fs)
+        frames = corrupt_lead_i(source.generate(0, n_frames), lead_i)
+        handler = make_handler(fs)
+        peaks = []
+        confidences = []
+        for i in range(0, n_frames, batch):
+            normalized = handler.normalize_frames(frames[i:i + batch])
+            if len(normalized):
+                block_peaks, block_confidences = handler.pipeline.detect(normalized)
+                peaks.extend(block_peaks.tolist())
+                confidences.extend(block_confidences)
+
+        # 检出位置与原始帧编号一致（基线去除不丢弃样本）
+        reference = source.beat_samples
+        reference = reference[reference < n_frames]
+        result = evaluate_detections(peaks, reference, tolerance=int(0.15 * fs))
+        # R 波定位误差换算为毫秒，RR 误差直接决定 RMSSD 等 HRV 指标的偏差
+        for key in ('position_error', 'rr_error'):
+            value = result.pop(key)
+            result[key + '_ms'] = value * 1000.0 / fs if value is not None else None
+        result.update({
+            'name': (f'qrs_{heart_rate}bpm_noise{noise}' + ('' if lead_i == 'clean' else f'_lead_i_{lead_i}')
+                     + ('' if wander == 0.1 else f'_wander{wander}')),
+            'heart_rate': heart_rate,
+            'noise_mv': noise,
+            'mean_confidence': float(np.mean(confidences)) if confidences else None,
+            'selected_leads': handler.qrs_detector.selected_leads
+        })
+        results.append(result)
+    return results
+
+
+def bench_hrv(n_calls):
+    """新增心拍时的增量更新，以及界面每个刷新周期读取 HRV 数据"""
+    handler = warmed_up_handler()
+    rr_intervals = [(rr,) for rr in np.random.default_rng(0).normal(800, 50, n_calls)]
+    update_times = time_calls(handler.update_rr_intervals, rr_intervals)
+    read_times = time_calls(handler.get_hrv_data, [()] * n_calls)
+
+    # 后台线程的 5 分钟频域/非线性分析（72bpm 约 360 个心拍）
+    rr = np.random.default_rng(1).normal(833, 40, 360)
+    analysis_times = time_calls(analyze_rr, [(np.cumsum(rr), rr)] * 20)
+    return [summarize('update_rr_intervals', update_times, [1] * n_calls, unit='beats'),
+            summarize('get_hrv_data', read_times, [1] * n_calls, unit='calls'),
+            summarize('hrv_analysis_5min', analysis_times, [1] * 20, unit='windows')]
+
+
+def bench_end_to_end(rate, duration, tick=0.02, instrumented=False):
+    """从内存假串口读取，按刷新周期分批处理 rate Hz × 12 导联的数据
+
+    instrumented 为 True 时打开各阶段耗时统计，与关闭时的结果对比即统计本身的开销。
+    """
+    n_frames = int(rate * duration)
+    frames, _ = synthetic_frames(n_frames, fs=rate)
+    data = encode_frames(frames)
+    chunk_size = int(len(data) / n_frames * rate * tick)
+
+    handler = make_handler(rate, data, chunk_size)
+    handler.set_metrics_enabled(instrumented)
+    times = []
+    counts = []
+    while handler.serial_port.position < len(data):
+        start = time.perf_counter()
+        result = handler.read_data()
+        times.append(time.perf_counter() - start)
+        counts.append(0 if result is None else len(result))
+
+    summary = summarize(f'end_to_end_{rate}hz' + ('_instrumented' if instrumented else ''), times, counts)
+    summary['rate_hz'] = rate
+    summary['realtime_factor'] = summary['frames_per_s'] / rate if summary['frames_per_s'] else None
+    summary['malformed'] = handler.parser.frames_malformed
+    if instrumented:
+        summary['stages'] = MetricsWindow(handler.metrics).take()['stages']
+    return summary
+
+
+def bench_multi_device(device_counts, duration, fs=250, dsp_backend='inprocess'):
+    """多设备并发采集：每台设备一个实时速率的模拟数据源和采集线程，统计 CPU 占用和是否跟得上实时
+
+    dsp_backend='process' 时 CPU 占用包含各设备 DSP 子进程，main_cpu_percent 为主进程（含界面线程所在进程）的部分。
+    """
+    from device_manager import DeviceManager
+
+    def worker_cpu(handlers):
+        return sum(getattr(h.dsp, 'worker_cpu_time', 0.0) for h in handlers)
+
+    results = []
+    for n_devices in device_counts:
+        manager = DeviceManager(fs=fs, speed=1.0, dsp_backend=dsp_backend)
+        for i in range(n_devices):
+            manager.add_device('synthetic', name=f'bed{i}',
+                               source=SyntheticECGSource(fs=fs, speed=1.0, heart_rate=60 + 10 * i, seed=i))
+        handlers = [manager.handler(name) for name in manager.devices()]
+        time.sleep(1.0)  # 跳过启动阶段（子进程启动、QRS 检测的学习期）
+        start_cpu = time.process_time()
+        start_worker_cpu = worker_cpu(handlers)
+        start = time.perf_counter()
+        start_samples = [h.sample_count for h in handlers]
+        time.sleep(duration)
+        elapsed = time.perf_counter() - start
+        main_cpu = time.process_time() - start_cpu
+        cpu = main_cpu + worker_cpu(handlers) - start_worker_cpu
+        processed = sum(h.sample_count - s for h, s in zip(handlers, start_samples))
+        manager.close_all()
+
+        results.append({
+            'name': f'multi_device_{n_devices}' + ('' if dsp_backend == 'inprocess' else f'_{dsp_backend}'),
+            'devices': n_devices,
+            'rate_hz': fs,
+            'dsp_backend': dsp_backend,
+            'cpu_percent': cpu / elapsed * 100,
+            'main_cpu_percent': main_cpu / elapsed * 100,
+            'cpu_percent_per_device': cpu / elapsed * 100 / n_devices,
+            # 实际处理样本数与应产生样本数之比，约为 1 表示全部设备都跟得上（去噪输出有少量延迟）
+            'realtime_ratio': processed / (n_devices * fs * elapsed),
+            'peak_rss_mb': peak_rss_mb()
+        })
+    return results
+
+
+def bench_stream_server(client_counts, duration, fs=250):
+    """流服务压力测试：实时速率的模拟数据源，n 个正常读取的客户端加 1 个从不读取的客户端，
+    统计采集是否跟得上实时、正常客户端收到的样本比例和慢客户端被丢弃的消息数"""
+    import socket
+    import asyncio
+    from stream_server import StreamServer, read_message, decode_payload, MSG_DENOISED
+
+    async def reader_client(port, received):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        try:
+            while True:
+                msg_type, payload = await read_message(reader)
+                if msg_type == MSG_DENOISED:
+                    received[0] += len(decode_payload(msg_type, payload)[1])
+        except (asyncio.CancelledError, asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    async def stalled_client(port):
+        # 接收缓冲区设得很小，服务器端很快就会积压
+        sock = socket.socket()
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        sock.setblocking(False)
+        await asyncio.get_running_loop().sock_connect(sock, ('127.0.0.1', port))
+        try:
+            await asyncio.sleep(duration * 10)
+        except asyncio.CancelledError:
+            sock.close()
+
+    async def run(n_clients):
+        handler = SerialHandler(source=SyntheticECGSource(fs=fs, speed=1.0), fs=fs)
+        server = StreamServer(handler, port=0, queue_size=64)
+        await server.start()
+        serving = asyncio.ensure_future(server.serve_forever())
+        received = [[0] for _ in range(n_clients)]
+        clients = [asyncio.ensure_future(reader_client(server.port, r)) for r in received]
+        clients.append(asyncio.ensure_future(stalled_client(server.port)))
+        await asyncio.sleep(0.5)
+        handler.start_acquisition_thread()
+        start_cpu = time.process_time()
+        start = time.perf_counter()
+        await asyncio.sleep(duration)
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - start_cpu
+        produced = handler.sample_count
+        handler.stop_acquisition_thread()
+        await asyncio.sleep(0.2)  # 等待已发出的数据到达客户端
+        stats = server.stats()
+        for task in clients:
+            task.cancel()
+        serving.cancel()
+        await asyncio.gather(serving, *clients, return_exceptions=True)
+        handler.close()
+
+        delivered = [r[0] / produced for r in received] if produced else []
+        # 发送字节数最少的是不读取的客户端
+        stalled = min(stats['client_stats'], key=lambda c: c['sent_bytes'])
+        return {
+            'name': f'stream_server_{n_clients}_clients',
+            'clients': n_clients,
+            'rate_hz': fs,
+            'cpu_percent': cpu / elapsed * 100,
+            'realtime_ratio': produced / (fs * elapsed),
+            'min_delivered_ratio': min(delivered) if delivered else None,
+            'stalled_client_sent_bytes': stalled['sent_bytes'],
+            'stalled_client_queued': stalled['queued'],
+            'stalled_client_dropped_messages': stalled['dropped_messages'],
+            'published_messages': stats['published_messages']
+        }
+
+    return [asyncio.run(run(n_clients)) for n_clients in client_counts]
+
+
+def bench_history(hours, fs=250, width=1600):
+    """历史存储：按 20ms 一批追加 hours 小时的数据，再按不同时间范围、固定像素宽度查询"""
+    import tempfile
+    from history import HistoryStore
+
+    store = HistoryStore(fs=fs, directory=tempfile.mkdtemp(prefix='ecg_history_bench_'), delete_on_close=True)
+    minute, _ = synthetic_frames(fs * 60, fs)
+    batch = fs // 50
+    blocks = [(minute[i:i + batch],) for i in range(0, len(minute), batch)]
+    times = []
+    for _ in range(int(hours * 60)):
+        times.extend(time_calls(store.append, blocks))
+    results = [summarize(f'history_append_{hours:g}h', times, [batch] * len(times))]
+
+    for seconds in sorted({10, 600, 3600, hours * 3600}):
+        args_list = [(len(store) - seconds * fs, len(store), width)] * 20
+        points = []
+
+        def query(start, stop, max_points):
+            points.append(len(store.query(start, stop, max_points)[0]))
+
+        summary = summarize(f'history_query_{seconds:g}s', time_calls(query, args_list), [1] * 20, unit='queries')
+        summary['points'] = points[0]
+        results.append(summary)
+    store.close()
+    return results
+
+
+def bench_alarms(minutes, n_events, fs=250):
+    """报警引擎：按 20ms 一批评估默认规则的耗时；事件日志写入 n_events 条后的统计和跳转查询耗时"""
+    from alarms import AlarmEngine, EventLog, EVENT_DTYPE
+
+    quality = {'version': 0, 'lead_off': [False] * 12}
+    engine = AlarmEngine(fs=fs, quality=lambda: quality)
+    batch = fs // 50
+    block = np.zeros((batch, 12))
+    rr = int(fs * 60 / 75)
+
+    def evaluate(index):
+        sample = index * batch
+        if sample // rr != (sample + batch) // rr:
+            peak = (sample + batch) // rr * rr
+            engine.write_r_peak(peak)
+            engine.write_hrv(peak, {'heart_rate': 75.0, 'SDNN_1min': 40.0})
+        if index % 25 == 0:  # 信号质量每 0.5 秒更新一次
+            quality['version'] += 1
+        engine.write_processed(block)
+
+    n_blocks = int(minutes * 60 * fs / batch)
+    times = time_calls(evaluate, [(i,) for i in range(n_blocks)])
+    results = [summarize('alarm_evaluate', times, [batch] * n_blocks)]
+
+    log = EventLog(['a', 'b', 'c'])
+    records = np.zeros(n_events, dtype=EVENT_DTYPE)
+    records['sample'] = np.arange(n_events) * fs * 10
+    records['onset'] = records['sample']
+    records['rule'] = np.arange(n_events) % 3
+    records['active'] = np.arange(n_events) % 2 == 0
+    for i in range(0, n_events, 1000):
+        log.append(records[i:i + 1000])
+    span = int(records['sample'][-1])
+    rng = np.random.default_rng(0)
+    starts = rng.integers(0, span, 1000).tolist()
+    for name, query in (('count', lambda s: log.count(s, s + fs * 3600, rule='b')),
+                        ('next', lambda s: log.next_alarm(s)),
+                        ('previous', lambda s: log.previous_alarm(s, rule='c'))):
+        times = time_calls(query, [(s,) for s in starts])
+        summary = summarize(f'event_log_{name}_{n_events}', times, [1] * len(times), unit='queries')
+        results.append(summary)
+    return results
+
+
+def bench_ui(n_ticks, batch):
+    """界面绘制（离屏 Qt）：每个刷新周期写入一批数据并刷新曲线"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from ui import ECGMonitorUI
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    ui = ECGMonitorUI()
+    ui.show()
+    handler = warmed_up_handler()
+    frames, _ = synthetic_frames(n_ticks * batch)
+    normalized = handler.normalize_frames(frames)
+
+    results = []
+    for name, paint in (('update_plot_data', False), ('update_plot_data_with_paint', True)):
+        ui.clear_plots()
+        blocks = [(normalized[i:i + batch], paint) for i in range(0, len(normalized), batch)]
+
+        def tick(block, paint):
+            ui.update_plot_data(block)
+            ui.refresh_plots()
+            if paint:
+                app.processEvents()
+
+        times = time_calls(tick, blocks)
+        results.append(summarize(name, times, [len(b[0]) for b in blocks]))
+    ui.close()
+    return results
+
+
+def parse_importtime(stderr):
+    """解析 -X importtime 的输出，返回 {顶层模块: 累计导入耗时 ms}"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):  # 缩进表示被其他模块间接导入
+            modules[name.strip()] = int(cumulative) / 1000
+    return modules
+
+
+def bench_startup(repeat=5):
+    """冷启动：main.py 从启动到窗口显示（--exit-after-show）的总耗时和导入耗时，
+    以及推迟到开始采集时才导入的信号处理模块的耗时"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    commands = {
+        'startup_to_window': [sys.executable, '-X', 'importtime', 'main.py', '--exit-after-show'],
+        'startup_dsp_import': [sys.executable, '-X', 'importtime', '-c', 'import serial_handle'],
+    }
+    results = []
+    for name, command in commands.items():
+        wall = []
+        imports = []
+        modules = {}
+        for _ in range(repeat):
+            start = time.perf_counter()
+            proc = subprocess.run(command, cwd=here, env=env, capture_output=True, text=True)
+            wall.append((time.perf_counter() - start) * 1000)
+            modules = parse_importtime(proc.stderr)
+            imports.append(sum(modules.values()))
+        slowest = sorted(modules.items(), key=lambda item: -item[1])[:5]
+        results.append({
+            'name': name,
+            'wall_ms_p50': float(np.median(wall)),
+            'import_ms_p50': float(np.median(imports)),
+            'slowest_imports_ms': {module: round(ms, 1) for module, ms in slowest}
+        })
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="心电上位机性能测试")
+    parser.add_argument('--rates', type=int, nargs='+', default=[250, 500, 1000], help="端到端测试的采样率")
+    parser.add_argument('--duration', type=float, default=60.0, help="端到端测试的数据时长（秒）")
+    parser.add_argument('--frames', type=int, default=10000, help="微基准测试的帧数")
+    parser.add_argument('--batch', type=int, default=5, help="微基准测试每批帧数（250Hz 下 20ms 为 5 帧）")
+    parser.add_argument('--devices', type=int, nargs='+', default=[1, 2, 4, 8], help="多设备测试的设备数")
+    parser.add_argument('--dsp-backends', nargs='+', choices=['inprocess', 'process'], default=['inprocess', 'process'],
+                        help="多设备测试对比的 DSP 后端")
+    parser.add_argument('--device-duration', type=float, default=5.0, help="多设备测试每组的运行时长（秒）")
+    parser.add_argument('--stream-clients', type=int, nargs='+', default=[1, 16, 64], help="流服务测试的客户端数")
+    parser.add_argument('--history-hours', type=float, default=1.0, help="历史存储测试写入的时长（小时）")
+    parser.add_argument('--alarm-events', type=int, default=1000000, help="事件日志查询测试写入的事件数")
+    parser.add_argument('--skip-ui', action='store_true', help="跳过界面测试")
+    parser.add_argument('--output', help="结果 JSON 文件路径，默认输出到标准输出")
+    args = parser.parse_args()
+
+    results = []
+    # 被测代码的打印信息转到标准错误，保证标准输出是干净的 JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        results.extend(bench_startup())
+        results.extend(bench_parse(args.frames, args.batch))
+        results.extend(bench_lead_modes(args.frames, args.batch))
+        results.append(bench_normalize(args.frames, args.batch))
+        results.extend(bench_baseline(args.frames, args.batch))
+        results.append(bench_wavelet(args.frames // 10))
+        results.extend(bench_denoise(args.frames, args.batch))
+        results.append(bench_r_peak(args.frames, args.batch))
+        results.extend(bench_qrs_accuracy())
+        results.extend(bench_hrv(args.frames))
+        for rate in args.rates:
+            results.append(bench_end_to_end(rate, args.duration))
+        results.append(bench_end_to_end(args.rates[0], args.duration, instrumented=True))
+        for dsp_backend in args.dsp_backends:
+            results.extend(bench_multi_device(args.devices, args.device_duration, dsp_backend=dsp_backend))
+        results.extend(bench_stream_server(args.stream_clients, args.device_duration))
+        results.extend(bench_history(args.history_hours))
+        results.extend(bench_alarms(args.duration / 60, args.alarm_events))
+        if not args.skip_ui:
+            results.extend(bench_ui(args.frames // args.batch // 10, args.batch))
+
+    report = {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'results': results
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
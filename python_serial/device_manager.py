@@ -0,0 +1,85 @@
+import os
+import numpy as np
+from serial_handle import SerialHandler
+
+
+class DeviceManager:
+    """多设备采集管理
+
+    每台设备一个 SerialHandler，各自在独立的采集线程中完成读取、解析、去噪和 R 波检测，
+    结果写入各自的环形缓冲区。总览界面用 latest() 取最近的波形（不移动读游标），
+    详情界面用 read_samples() 按顺序取新数据，两者互不影响。
+    """
+
+    def __init__(self, fs=250, frame_format='ascii', speed=1.0, baudrate=115200, dsp_backend='inprocess',
+                 baseline_method='highpass', history_dir=None, leads=12, alarm_rules=None):
+        self.fs = fs
+        self.frame_format = frame_format
+        self.speed = speed
+        self.baudrate = baudrate
+        self.dsp_backend = dsp_backend  # 'process' 时每台设备的去噪和R波检测在独立子进程中运行
+        self.baseline_method = baseline_method
+        self.history_dir = history_dir  # 各设备的会话历史保存在此目录下（按设备名分子目录），None 为临时目录
+        self.leads = leads  # 设备发送的导联数（12 或 8），见 SerialHandler
+        self.alarm_rules = alarm_rules  # 报警规则参数列表（见 alarms.load_rules），None 为默认规则
+        self.handlers = {}  # 设备名 -> SerialHandler，按添加顺序排列
+
+    def add_device(self, port, name=None, source=None):
+        """打开一台设备并启动采集，返回设备名；打开失败时返回 None"""
+        name = name or port
+        if name in self.handlers:
+            return name
+
+        handler = SerialHandler(port=port, baudrate=self.baudrate, frame_format=self.frame_format,
+                                source=source, speed=self.speed, fs=self.fs,
+                                dsp_backend=self.dsp_backend, baseline_method=self.baseline_method,
+                                history_dir=self._device_history_dir(name), leads=self.leads,
+                                alarm_rules=self.alarm_rules)
+        if not handler.serial_port:
+            print(f"设备 {name} 打开失败")
+            return None
+        handler.start_acquisition_thread()
+        self.handlers[name] = handler
+        return name
+
+    def _device_history_dir(self, name):
+        if not self.history_dir:
+            return None
+        return os.path.join(self.history_dir, ''.join(c if c.isalnum() else '_' for c in name))
+
+    def remove_device(self, name):
+        """停止并关闭一台设备"""
+        handler = self.handlers.pop(name, None)
+        if handler:
+            handler.close()
+
+    def devices(self):
+        return list(self.handlers)
+
+    def handler(self, name):
+        return self.handlers.get(name)
+
+    def overview(self, seconds=5.0, lead=1):
+        """各设备的概况：最近 seconds 秒的单导联波形（默认导联 II）、心率和采集统计
+
+        回放录制目录的设备按录制时的采样率处理，各设备的 fs 可能不同。
+        """
+        result = []
+        for name, handler in list(self.handlers.items()):
+            n = int(seconds * handler.fs)
+            ring = handler.sample_ring
+            samples = ring.latest(n)[lead] if ring is not None else np.zeros(0)
+            result.append({
+                'name': name,
+                'fs': handler.fs,
+                'samples': samples,
+                'heart_rate': handler.get_hrv_data().get('heart_rate', 0),
+                'beat_confidence': handler.last_beat_confidence,
+                'dropped_samples': ring.dropped_samples if ring is not None else 0
+            })
+        return result
+
+    def close_all(self):
+        """关闭所有设备"""
+        for name in list(self.handlers):
+            self.remove_device(name)
@@ -0,0 +1,297 @@
+import time
+import queue
+import multiprocessing
+import numpy as np
+from wavelet_stream import StreamingWaveletDenoiser
+from qrs_detector import MultiLeadQRSDetector
+from signal_quality import SignalQualityMonitor
+from instrumentation import Metrics
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python 3.7 没有 shared_memory，只能使用进程内处理
+    shared_memory = None
+
+
+class DSPPipeline:
+    """进程内的信号处理：信号质量评估 + 流式小波去噪 + 多导联融合 R 波检测
+
+    process() 输入归一化后的帧 (n, n_channels)，返回 (去噪结果 (m, n_channels), R 波采样点编号, 各心拍置信度)。
+    ProcessDSPBackend 提供相同的接口，在子进程中运行本类。
+    质量评估判为脱落、饱和或噪声过大的导联不参与 R 波检测；去噪默认不再把大幅值置0，
+    以免削掉真实的高大 QRS 波。
+    """
+
+    def __init__(self, fs=250, n_channels=12, wavelet='db4', level=3, window=64, hop=16, outlier_limit=None):
+        self.fs = fs
+        self.n_channels = n_channels
+        self.denoiser = StreamingWaveletDenoiser(wavelet, level, window=window, hop=hop,
+                                                 outlier_limit=outlier_limit, n_channels=n_channels)
+        self.qrs_detector = MultiLeadQRSDetector(fs=fs, n_channels=n_channels)
+        self.quality_monitor = SignalQualityMonitor(fs=fs, n_channels=n_channels)
+        self.metrics = Metrics()  # 进程内使用时由 SerialHandler 替换为它的统计对象
+
+    def config(self):
+        """构造参数，子进程据此创建一份相同的处理流程"""
+        return {'fs': self.fs, 'n_channels': self.n_channels, 'wavelet': self.denoiser.wavelet,
+                'level': self.denoiser.level, 'window': self.denoiser.window, 'hop': self.denoiser.hop,
+                'outlier_limit': self.denoiser.outlier_limit}
+
+    @property
+    def selected_leads(self):
+        return self.qrs_detector.selected_leads
+
+    @property
+    def sqi(self):
+        return self.qrs_detector.sqi
+
+    def signal_quality(self):
+        """各导联的信号质量评估结果，见 SignalQualityMonitor.summary()"""
+        return self.quality_monitor.summary()
+
+    def denoise(self, frames):
+        try:
+            return self.denoiser.process(frames)
+        except Exception as e:
+            print(f"小波去噪错误: {e}")
+            self.denoiser.reset()
+            return np.zeros((0, self.n_channels))
+
+    def detect(self, frames):
+        """返回 (R 波采样点编号, 各心拍置信度)"""
+        try:
+            if self.quality_monitor.update(frames):
+                self.qrs_detector.set_lead_quality(self.quality_monitor.quality)
+            peaks = self.qrs_detector.process(frames)
+        except Exception as e:
+            print(f"R波检测错误: {e}")
+            self.qrs_detector.reset()
+            return np.zeros(0, dtype=np.int64), []
+        return peaks, list(self.qrs_detector.confidences)
+
+    def process(self, frames):
+        with self.metrics.timer('detect'):
+            peaks, confidences = self.detect(frames)
+        with self.metrics.timer('denoise'):
+            denoised = self.denoise(frames)
+        return denoised, peaks, confidences
+
+    def close(self):
+        pass
+
+
+class SharedBlockRing:
+    """共享内存中的样本环形缓冲区，单写者/单读者
+
+    共享内存开头是两个 int64 游标：写游标由写者推进，读游标由读者在拷贝完成后推进，
+    写者据此判断剩余空间，不会覆盖读者尚未取走的数据。数据块的位置和长度通过消息队列传递，
+    队列中只有几个整数，样本本身不经过 pickle。
+    """
+
+    HEADER = 16
+
+    def __init__(self, n_channels, capacity, name=None):
+        self.n_channels = n_channels
+        self.capacity = capacity
+        create = name is None
+        size = self.HEADER + capacity * n_channels * 8
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        self.name = self.shm.name
+        self.counters = np.ndarray((2,), dtype=np.int64, buffer=self.shm.buf)  # [写游标, 读游标]
+        self.data = np.ndarray((capacity, n_channels), dtype=np.float64, buffer=self.shm.buf, offset=self.HEADER)
+        if create:
+            self.counters[:] = 0
+
+    def free(self):
+        return self.capacity - int(self.counters[0] - self.counters[1])
+
+    def write(self, block):
+        """写入一批样本 (n, n_channels)，返回其起始位置；调用前需确认 free() 足够"""
+        n = len(block)
+        start = int(self.counters[0])
+        i = start % self.capacity
+        first = min(n, self.capacity - i)
+        self.data[i:i + first] = block[:first]
+        if first < n:
+            self.data[:n - first] = block[first:]
+        self.counters[0] = start + n
+        return start
+
+    def read(self, start, n):
+        """拷贝出 [start, start + n) 的样本并推进读游标"""
+        i = start % self.capacity
+        first = min(n, self.capacity - i)
+        block = self.data[i:i + first].copy()
+        if first < n:
+            block = np.concatenate((block, self.data[:n - first]))
+        self.counters[1] = start + n
+        return block
+
+    def close(self, unlink=False):
+        # 先释放指向共享内存的数组，否则 close() 会因仍有导出的缓冲区而失败
+        self.counters = self.data = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _dsp_worker(config, input_name, output_name, capacity, tasks, results):
+    """子进程：从输入环取数据块，去噪和 R 波检测后写入输出环，再通过结果队列通知主进程"""
+    n_channels = config['n_channels']
+    input_ring = SharedBlockRing(n_channels, capacity, name=input_name)
+    output_ring = SharedBlockRing(n_channels, capacity, name=output_name)
+    pipeline = DSPPipeline(**config)
+    quality_version = None
+    results.put(('ready',))
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            seq, start, n = task
+            denoised, peaks, confidences = pipeline.process(input_ring.read(start, n))
+            # 主进程来不及取走输出时等待，不覆盖未读的数据
+            while output_ring.free() < len(denoised):
+                time.sleep(0.001)
+            out_start = output_ring.write(denoised)
+            # 信号质量只在重新评估后随结果发送
+            quality = None
+            if pipeline.quality_monitor.version != quality_version:
+                quality = pipeline.signal_quality()
+                quality_version = quality['version']
+            results.put((seq, out_start, len(denoised), peaks, confidences,
+                         list(pipeline.selected_leads), pipeline.sqi.tolist(), quality, time.process_time()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        input_ring.close()
+        output_ring.close()
+
+
+class ProcessDSPBackend:
+    """在子进程中运行 DSPPipeline，接口与 DSPPipeline 相同
+
+    去噪和检测的状态是逐样本连续的，每台设备固定使用一个子进程，多台设备各有各的子进程，
+    处理在多个 CPU 核上并行，也不再与界面线程争用 GIL。数据块经共享内存环传递，
+    每块带有序号，结果按序号顺序返回。process() 会等待本块的结果（最多 timeout 秒），
+    等待期间不占用 GIL；超时未完成的块在之后的调用中按顺序返回。
+    """
+
+    def __init__(self, config, capacity=None, timeout=0.5, start_timeout=30.0):
+        if shared_memory is None:
+            raise RuntimeError("当前 Python 版本不支持 multiprocessing.shared_memory（需要 3.8 及以上）")
+        self.n_channels = config['n_channels']
+        self.timeout = timeout
+        capacity = capacity or int(config['fs'] * 10)  # 默认可容纳 10 秒数据
+        self.input_ring = SharedBlockRing(self.n_channels, capacity)
+        self.output_ring = SharedBlockRing(self.n_channels, capacity)
+        self.max_block = max(capacity // 2, 1)  # 单次提交的最大帧数
+
+        # 用 spawn 启动，避免 fork 复制界面线程和 Qt 的状态
+        context = multiprocessing.get_context('spawn')
+        self.tasks = context.Queue()
+        self.results = context.Queue()
+        self.process_handle = context.Process(
+            target=_dsp_worker, name='dsp-worker', daemon=True,
+            args=(config, self.input_ring.name, self.output_ring.name, capacity, self.tasks, self.results))
+        self.process_handle.start()
+
+        self.next_seq = 0  # 下一个提交的数据块序号
+        self.expected_seq = 0  # 下一个应返回的数据块序号
+        self.completed = {}  # 已完成但尚未按顺序返回的结果
+        self.selected_leads = []
+        self.sqi = np.zeros(self.n_channels)
+        self.quality = SignalQualityMonitor(n_channels=self.n_channels).summary()
+        self.worker_cpu_time = 0.0  # 子进程累计占用的 CPU 时间（秒）
+        self.closed = False
+
+        try:
+            self.results.get(timeout=start_timeout)
+        except queue.Empty:
+            self.close()
+            raise RuntimeError("DSP子进程启动超时")
+
+    def process(self, frames):
+        frames = np.asarray(frames, dtype=np.float64)
+        # 大于缓冲区一半的数据块（如高倍速回放积压）拆成多块提交，否则永远等不到足够的空间
+        for begin in range(0, len(frames), self.max_block):
+            block = frames[begin:begin + self.max_block]
+            while self.input_ring.free() < len(block):
+                # 子进程落后超过缓冲区容量时等它处理完一部分
+                if not self.process_handle.is_alive():
+                    raise RuntimeError("DSP子进程已退出")
+                self._receive(self.timeout)
+            start = self.input_ring.write(block)
+            self.tasks.put((self.next_seq, start, len(block)))
+            self.next_seq += 1
+
+        deadline = time.perf_counter() + self.timeout
+        while self.expected_seq + len(self.completed) < self.next_seq:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or not self._receive(remaining):
+                break
+        return self._collect()
+
+    def _receive(self, timeout):
+        """等待一个结果，收到时拷贝出输出数据并返回 True"""
+        try:
+            result = self.results.get(timeout=timeout)
+        except queue.Empty:
+            return False
+        seq, out_start, n, peaks, confidences, selected_leads, sqi, quality, cpu_time = result
+        # 立即取走输出，子进程不会因输出环已满而阻塞
+        self.completed[seq] = (self.output_ring.read(out_start, n), peaks, confidences)
+        self.selected_leads = selected_leads
+        self.sqi = np.array(sqi)
+        if quality is not None:
+            self.quality = quality
+        self.worker_cpu_time = cpu_time
+        return True
+
+    def signal_quality(self):
+        return self.quality
+
+    def _collect(self):
+        """按序号顺序合并已完成的结果"""
+        denoised = []
+        peaks = []
+        confidences = []
+        while self.expected_seq in self.completed:
+            block, block_peaks, block_confidences = self.completed.pop(self.expected_seq)
+            denoised.append(block)
+            peaks.append(block_peaks)
+            confidences.extend(block_confidences)
+            self.expected_seq += 1
+        if not denoised:
+            return np.zeros((0, self.n_channels)), np.zeros(0, dtype=np.int64), []
+        return np.concatenate(denoised), np.concatenate(peaks), confidences
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.process_handle.is_alive():
+            self.tasks.put(None)
+            self.process_handle.join(timeout=1.0)
+            if self.process_handle.is_alive():
+                self.process_handle.terminate()
+                self.process_handle.join(timeout=1.0)
+        self.tasks.close()
+        self.results.close()
+        self.input_ring.close(unlink=True)
+        self.output_ring.close(unlink=True)
+
+
+def create_backend(name, pipeline):
+    """按名称创建 DSP 后端：'inprocess' 直接使用 pipeline，'process' 在子进程中运行同样配置的流程
+
+    子进程后端不可用（Python 3.7 或启动失败）时退回进程内处理。
+    """
+    if name == 'process':
+        try:
+            return ProcessDSPBackend(pipeline.config())
+        except Exception as e:
+            print(f"DSP子进程启动失败，改用进程内处理: {e}")
+    elif name != 'inprocess':
+        print(f"未知的 DSP 后端 {name}，改用进程内处理")
+    return pipeline
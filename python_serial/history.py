@@ -0,0 +1,209 @@
+import os
+import time
+import shutil
+import numpy as np
+
+
+class ChunkedArray:
+    """只追加的分块数组，第一维为时间
+
+    每块预先分配 chunk_len 行，放在内存中，或在 directory 下用 np.memmap 映射到文件（占用内存由系统页缓存决定）。
+    单写者/单读者使用，无需加锁：写者先写数据再增加 length，读者只读取 length 以内的部分。
+    """
+
+    def __init__(self, tail_shape, dtype=np.float32, chunk_len=65536, directory=None, name='data'):
+        self.tail_shape = tuple(tail_shape)
+        self.dtype = np.dtype(dtype)
+        self.chunk_len = chunk_len
+        self.directory = directory
+        self.name = name
+        self.chunks = []
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def _new_chunk(self):
+        shape = (self.chunk_len,) + self.tail_shape
+        if self.directory is None:
+            return np.empty(shape, dtype=self.dtype)
+        path = os.path.join(self.directory, f'{self.name}_{len(self.chunks):05d}.bin')
+        return np.memmap(path, dtype=self.dtype, mode='w+', shape=shape)
+
+    def append(self, block):
+        block = np.asarray(block, dtype=self.dtype)
+        position = 0
+        n = len(block)
+        while position < n:
+            index, offset = divmod(self.length, self.chunk_len)
+            if index == len(self.chunks):
+                self.chunks.append(self._new_chunk())
+            count = min(n - position, self.chunk_len - offset)
+            self.chunks[index][offset:offset + count] = block[position:position + count]
+            position += count
+            # 数据写完后再推进长度，读者只会看到完整的行
+            self.length += count
+
+    def read(self, start, stop):
+        """拷贝 [start, stop) 行，超出已写入范围的部分被截掉"""
+        start = max(start, 0)
+        stop = min(stop, self.length)
+        if stop <= start:
+            return np.zeros((0,) + self.tail_shape, dtype=self.dtype)
+        parts = []
+        position = start
+        while position < stop:
+            index, offset = divmod(position, self.chunk_len)
+            count = min(stop - position, self.chunk_len - offset)
+            parts.append(self.chunks[index][offset:offset + count])
+            position += count
+        return np.concatenate(parts) if len(parts) > 1 else parts[0].copy()
+
+    def flush(self):
+        for chunk in self.chunks:
+            if isinstance(chunk, np.memmap):
+                chunk.flush()
+
+    def close(self):
+        self.flush()
+        self.length = 0
+        self.chunks = []
+
+
+class HistoryStore:
+    """整个会话的多导联波形历史，附带逐级 min/max 细节层次（LOD）金字塔
+
+    第 0 层是原始样本 (n, n_channels)；第 k 层（k >= 1）每个桶覆盖 factor**k 个样本，
+    保存 (min, max) 两行，形状为 (n_buckets, 2, n_channels)，由第 k-1 层的完整桶逐级归约得到，
+    样本到达时增量更新。query() 按请求的点数选一层读取，无论查看 10 秒还是 12 小时，
+    读取和绘制的数据量都只与像素宽度有关。
+    同时实现 SerialHandler 数据输出端接口，只保存处理后的波形；在采集线程写入，界面线程读取。
+    """
+
+    def __init__(self, n_channels=12, fs=250, factor=4, chunk_len=65536, directory=None,
+                 delete_on_close=False, start_sample=0):
+        self.n_channels = n_channels
+        self.fs = fs
+        self.factor = factor
+        self.chunk_len = chunk_len
+        self.directory = directory  # None 时保存在内存中
+        self.delete_on_close = delete_on_close
+        self.start_sample = start_sample  # 第 0 个样本在 SerialHandler 中的采样点编号
+        self.start_time = time.time()  # 第 0 个样本的大致墙钟时间
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.samples = ChunkedArray((n_channels,), chunk_len=chunk_len, directory=directory, name='level0')
+        self.levels = []  # 第 1 层起的 min/max 数组
+
+    def __len__(self):
+        return len(self.samples)
+
+    def duration(self):
+        """已保存的时长（秒）"""
+        return len(self.samples) / self.fs
+
+    def bucket_size(self, level):
+        return self.factor ** level
+
+    def append(self, frames):
+        """追加一批处理后的样本 (n, n_channels)，并更新各层的完整桶"""
+        frames = np.asarray(frames)
+        if len(frames) == 0:
+            return
+        self.samples.append(frames)
+
+        factor = self.factor
+        source = self.samples
+        level = 1
+        while True:
+            complete = len(source) // factor
+            if level > len(self.levels):
+                if complete == 0:
+                    break
+                # 高层的块按比例缩小，避免每层都分配一整块
+                chunk_len = max(self.chunk_len // self.bucket_size(level), 1024)
+                self.levels.append(ChunkedArray((2, self.n_channels), chunk_len=chunk_len,
+                                                directory=self.directory, name=f'level{level}'))
+            target = self.levels[level - 1]
+            done = len(target)
+            if complete == done:
+                break  # 本层没有新桶，更高层也不会变化
+            if complete > done:
+                block = source.read(done * factor, complete * factor)
+                if level == 1:
+                    block = block.reshape(-1, factor, self.n_channels)
+                    reduced = np.stack((block.min(axis=1), block.max(axis=1)), axis=1)
+                else:
+                    block = block.reshape(-1, factor, 2, self.n_channels)
+                    reduced = np.stack((block[:, :, 0].min(axis=1), block[:, :, 1].max(axis=1)), axis=1)
+                target.append(reduced)
+            source = target
+            level += 1
+
+    def choose_level(self, n_samples, max_points):
+        """覆盖 n_samples 个样本时不超过 max_points 个点（或桶）的最精细一层"""
+        level = 0
+        while level < len(self.levels) and n_samples / self.bucket_size(level) > max_points:
+            level += 1
+        return level
+
+    def query(self, start, stop, max_points=2000, channels=None):
+        """读取 [start, stop) 样本范围（相对本存储的编号）内的波形，用于绘图
+
+        返回 (x, y, level)：x 为样本编号 (m,)，y 为 (len(channels), m)。第 0 层直接返回原始样本；
+        更高层每个桶输出 min、max 两个点，连线即为该段的包络，峰值不会因降采样丢失。
+        最新的、尚未凑满该层一个桶的样本从原始数据补算。
+        """
+        channels = list(range(self.n_channels)) if channels is None else list(channels)
+        length = len(self.samples)
+        start = max(int(start), 0)
+        stop = min(int(np.ceil(stop)), length)
+        if stop <= start:
+            return np.zeros(0), np.zeros((len(channels), 0)), 0
+
+        level = self.choose_level(stop - start, max_points)
+        if level == 0:
+            data = self.samples.read(start, stop)
+            return np.arange(start, stop, dtype=float), data[:, channels].T, 0
+
+        size = self.bucket_size(level)
+        first = start // size
+        last = -(-stop // size)
+        buckets = self.levels[level - 1].read(first, last)
+        covered = (first + len(buckets)) * size
+        if covered < stop:
+            # 该层还没有覆盖到的最新样本：按同样的桶边界从原始数据计算
+            tail = self.samples.read(covered, stop)
+            n_full, remainder = divmod(len(tail), size)
+            extra = [np.stack((part.min(axis=0), part.max(axis=0)))
+                     for part in np.split(tail[:n_full * size], n_full)] if n_full else []
+            if remainder:
+                part = tail[n_full * size:]
+                extra.append(np.stack((part.min(axis=0), part.max(axis=0))))
+            buckets = np.concatenate((buckets, np.array(extra, dtype=buckets.dtype)))
+
+        x = np.repeat((first + np.arange(len(buckets))) * size, 2).astype(float)
+        x[1::2] += size / 2
+        y = buckets[:, :, channels].reshape(len(buckets) * 2, len(channels)).T
+        return x, y, level
+
+    # ---- 数据输出端接口，在采集线程中调用 ----
+
+    def write_raw(self, frames):
+        pass
+
+    def write_processed(self, frames):
+        self.append(frames)
+
+    def write_r_peak(self, sample_index):
+        pass
+
+    def write_hrv(self, sample_index, hrv_data):
+        pass
+
+    def close(self):
+        self.samples.close()
+        for level in self.levels:
+            level.close()
+        if self.delete_on_close and self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
@@ -0,0 +1,280 @@
+import math
+import time
+import threading
+import numpy as np
+from scipy import signal
+
+# NumPy 2 把 trapz 改名为 trapezoid
+trapezoid = getattr(np, 'trapezoid', None) or np.trapz
+
+
+class RRWindow:
+    """滑动窗口内的 RR 间期统计
+
+    只记录窗口在环形缓冲区中的起点和各项累加量（和、平方和、相邻差值平方和、NN50 计数），
+    每进入或移出一个 RR 间期只做常数次加减。max_beats 按心拍数限定窗口，duration_ms 按时间限定。
+    """
+
+    def __init__(self, suffix, max_beats=None, duration_ms=None, nn50_threshold=50):
+        self.suffix = suffix  # 输出字段名的后缀
+        self.max_beats = max_beats
+        self.duration_ms = duration_ms
+        self.nn50_threshold = nn50_threshold
+        self.reset()
+
+    def reset(self):
+        """清空统计"""
+        self.start = 0  # 窗口内第一个 RR 间期的绝对编号
+        self.n = 0
+        self.shift = None  # 累加前减去的参考值，减小平方和的舍入误差
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.n_diff = 0
+        self.sum_sq_diff = 0.0
+        self.nn50 = 0
+
+    def add(self, engine, index):
+        """第 index 个 RR 间期进入窗口，并移出超出窗口范围的旧间期"""
+        rr = engine.rr[index % engine.capacity]
+        if self.shift is None:
+            self.shift = rr
+        value = rr - self.shift
+        self.sum += value
+        self.sum_sq += value * value
+        self.n += 1
+        if self.n > 1:
+            self._add_diff(rr - engine.rr[(index - 1) % engine.capacity], 1)
+
+        now = engine.times[index % engine.capacity]
+        while self.n > 0 and (
+                self.n > engine.capacity
+                or (self.max_beats is not None and self.n > self.max_beats)
+                or (self.duration_ms is not None and engine.times[self.start % engine.capacity] <= now - self.duration_ms)):
+            self._remove_oldest(engine)
+
+    def _add_diff(self, diff, sign):
+        self.n_diff += sign
+        self.sum_sq_diff += sign * diff * diff
+        if abs(diff) > self.nn50_threshold:
+            self.nn50 += sign
+
+    def _remove_oldest(self, engine):
+        oldest = engine.rr[self.start % engine.capacity]
+        value = oldest - self.shift
+        self.sum -= value
+        self.sum_sq -= value * value
+        self.n -= 1
+        if self.n > 0:
+            self._add_diff(engine.rr[(self.start + 1) % engine.capacity] - oldest, -1)
+        else:
+            # 窗口清空时顺便消除累积误差
+            self.sum = self.sum_sq = self.sum_sq_diff = 0.0
+            self.n_diff = self.nn50 = 0
+        self.start += 1
+
+    def stats(self):
+        """返回 (SDNN, RMSSD, pNN50)"""
+        sdnn = 0.0
+        if self.n > 1:
+            mean = self.sum / self.n
+            sdnn = math.sqrt(max(self.sum_sq / self.n - mean * mean, 0.0))
+        rmssd = math.sqrt(max(self.sum_sq_diff, 0.0) / self.n_diff) if self.n_diff > 0 else 0.0
+        pnn50 = self.nn50 / self.n_diff * 100 if self.n_diff > 0 else 0.0
+        return sdnn, rmssd, pnn50
+
+
+class HRVEngine:
+    """增量 HRV 统计引擎
+
+    RR 间期存放在固定大小的环形缓冲区中，多个窗口（默认最近 10 个心拍、1 分钟、5 分钟）
+    共享同一份数据，各自按增量维护统计量，新增一个心拍的开销与历史长度无关。
+    每次新增心拍后生成一份结果快照，数值有变化时 version 加一，界面据此决定是否刷新。
+    """
+
+    # (字段后缀, 心拍数, 时长 ms)；后缀为空的窗口即原来的 10 个心拍统计
+    WINDOWS = (('', 10, None), ('_1min', None, 60000), ('_5min', None, 300000))
+
+    def __init__(self, windows=None, capacity=4096, nn50_threshold=50):
+        self.capacity = capacity  # 需大于最长窗口内的心拍数（5 分钟 300bpm 为 1500）
+        self.windows = [RRWindow(suffix, max_beats, duration_ms, nn50_threshold)
+                        for suffix, max_beats, duration_ms in (windows or self.WINDOWS)]
+        self.rr = [0.0] * capacity
+        self.times = [0.0] * capacity
+        self.reset()
+
+    def reset(self):
+        """清空所有统计"""
+        self.count = 0  # 累计收到的 RR 间期数
+        self.time_ms = 0.0
+        for window in self.windows:
+            window.reset()
+        self.version = 0
+        self.snapshot = self._compute()
+
+    def add(self, rr_ms, time_ms=None):
+        """新增一个 RR 间期（毫秒），time_ms 为该心拍的时刻，缺省时按 RR 间期累加"""
+        self.time_ms = self.time_ms + rr_ms if time_ms is None else time_ms
+        index = self.count
+        self.rr[index % self.capacity] = float(rr_ms)
+        self.times[index % self.capacity] = self.time_ms
+        self.count += 1
+        for window in self.windows:
+            window.add(self, index)
+
+        snapshot = self._compute()
+        if snapshot != self.snapshot:
+            self.snapshot = snapshot
+            self.version += 1
+
+    def window_data(self, duration_ms):
+        """最近 duration_ms 内的 (心拍时刻 ms, RR 间期 ms) 数组，可在其他线程中调用"""
+        count = self.count
+        n = min(count, self.capacity - 1)  # 留一个位置，避免读到正被覆盖的数据
+        indices = [i % self.capacity for i in range(count - n, count)]
+        times = np.array([self.times[i] for i in indices])
+        rr = np.array([self.rr[i] for i in indices])
+        if len(times):
+            keep = times > times[-1] - duration_ms
+            times, rr = times[keep], rr[keep]
+        return times, rr
+
+    def last_rr(self):
+        return self.rr[(self.count - 1) % self.capacity] if self.count else 0.0
+
+    def _compute(self):
+        """生成结果快照；不足两个 RR 间期时全部为 0"""
+        data = {'heart_rate': 0}
+        enough = self.count >= 2
+        if enough:
+            last_rr = self.last_rr()
+            data['heart_rate'] = 60000 / last_rr if last_rr > 0 else 0
+        for window in self.windows:
+            sdnn, rmssd, pnn50 = window.stats() if enough else (0, 0, 0)
+            data['SDNN' + window.suffix] = sdnn
+            data['RMSSD' + window.suffix] = rmssd
+            data['pNN50' + window.suffix] = pnn50
+        return data
+
+
+def lomb_scargle_bands(times_ms, rr_ms, bands=None, n_freqs=256):
+    """用 Lomb-Scargle 周期图估计 RR 序列的频带功率（ms²），适用于不等间隔的心拍序列
+
+    谱的总面积按 RR 方差归一化，返回 {'LF': ..., 'HF': ..., 'LF_HF': ...}。
+    """
+    bands = bands or {'LF': (0.04, 0.15), 'HF': (0.15, 0.4)}
+    t = np.asarray(times_ms, dtype=float) / 1000.0
+    x = np.asarray(rr_ms, dtype=float)
+    x = x - x.mean()
+    variance = float(np.mean(x ** 2))
+    freqs = np.linspace(0.0033, 0.5, n_freqs)
+    if len(x) < 8 or variance == 0:
+        return dict({name: float('nan') for name in bands}, LF_HF=float('nan'))
+
+    power = signal.lombscargle(t, x, 2 * np.pi * freqs)
+    power *= variance / trapezoid(power, freqs)
+    result = {}
+    for name, (low, high) in bands.items():
+        mask = (freqs >= low) & (freqs < high)
+        result[name] = float(trapezoid(power[mask], freqs[mask]))
+    hf = result.get('HF', 0.0)
+    result['LF_HF'] = result['LF'] / hf if 'LF' in result and hf > 0 else float('nan')
+    return result
+
+
+def poincare(rr_ms):
+    """Poincaré 图的 SD1、SD2（ms）"""
+    rr = np.asarray(rr_ms, dtype=float)
+    if len(rr) < 3:
+        return float('nan'), float('nan')
+    diff_var = np.var(np.diff(rr))
+    sd1 = math.sqrt(0.5 * diff_var)
+    sd2 = math.sqrt(max(2 * np.var(rr) - 0.5 * diff_var, 0.0))
+    return sd1, sd2
+
+
+def sample_entropy(x, m=2, r=0.2):
+    """样本熵，r 为相对标准差的容限；模板匹配计数用 KD 树（切比雪夫距离）完成"""
+    from scipy.spatial import cKDTree  # 只在后台分析线程中用到，不拖慢启动
+
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    tolerance = r * np.std(x)
+    if n <= m + 1 or tolerance == 0:
+        return float('nan')
+
+    def matches(length):
+        # 长度为 m 和 m+1 的模板都只取前 n-m 个，保证两者可比
+        templates = x[np.arange(n - m)[:, None] + np.arange(length)]
+        tree = cKDTree(templates)
+        return (tree.count_neighbors(tree, tolerance, p=np.inf) - len(templates)) / 2
+
+    b = matches(m)
+    a = matches(m + 1)
+    if a == 0 or b == 0:
+        return float('inf') if b > 0 else float('nan')
+    return float(-math.log(a / b))
+
+
+def analyze_rr(times_ms, rr_ms):
+    """对一段 RR 序列计算频域和非线性指标"""
+    result = lomb_scargle_bands(times_ms, rr_ms)
+    result['SD1'], result['SD2'] = poincare(rr_ms)
+    result['SampEn'] = sample_entropy(rr_ms)
+    result['beats'] = len(rr_ms)
+    return result
+
+
+class HRVAnalysisWorker:
+    """后台 HRV 分析线程
+
+    每隔 interval 秒，或累计 min_new_beats 个新心拍后，取最近 window_ms 的 RR 序列计算
+    LF/HF、SD1/SD2、样本熵，结果缓存在 results 中，version 加一，界面线程按版本号取用。
+    """
+
+    def __init__(self, engine, window_ms=300000, interval=10.0, min_new_beats=30, min_beats=30):
+        self.engine = engine
+        self.window_ms = window_ms
+        self.interval = interval
+        self.min_new_beats = min_new_beats
+        self.min_beats = min_beats  # 少于该心拍数时不分析
+        self.results = {}
+        self.version = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.analyzed_count = 0
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name='hrv-analysis', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join(timeout=1.0)
+        self.thread = None
+
+    def _run(self):
+        last_run = 0.0
+        while not self.stop_event.wait(0.5):
+            new_beats = self.engine.count - self.analyzed_count
+            now = time.perf_counter()
+            if new_beats <= 0 or (new_beats < self.min_new_beats and now - last_run < self.interval):
+                continue
+            last_run = now
+            self.analyze()
+
+    def analyze(self):
+        """立即分析一次"""
+        self.analyzed_count = self.engine.count
+        times, rr = self.engine.window_data(self.window_ms)
+        if len(rr) < self.min_beats:
+            return
+        try:
+            self.results = analyze_rr(times, rr)
+            self.version += 1
+        except Exception as e:
+            print(f"HRV分析错误: {e}")
@@ -0,0 +1,243 @@
+import sys
+import json
+import math
+import time
+import threading
+
+
+class LatencyHistogram:
+    """对数分桶的耗时直方图（秒），用于统计 p50/p99/最大值
+
+    每个直方图只由一个线程写入（如采集线程的各处理阶段、界面线程的绘制），写入只是整数加一，
+    不需要加锁；读者拷贝计数列表后在自己的线程中计算百分位，拷贝期间的并发写入最多让结果差一次记录。
+    每十倍区间 bins_per_decade 个桶，默认相对误差约 6%。
+    """
+
+    def __init__(self, min_value=1e-6, max_value=100.0, bins_per_decade=20):
+        self.min_value = min_value
+        self.bins_per_decade = bins_per_decade
+        self.offset = math.log10(min_value)
+        self.n_bins = int(math.ceil((math.log10(max_value) - self.offset) * bins_per_decade)) + 1
+        self.counts = [0] * self.n_bins
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        if value > self.min_value:
+            index = min(int((math.log10(value) - self.offset) * self.bins_per_decade), self.n_bins - 1)
+        else:
+            index = 0
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def bin_upper(self, index):
+        """第 index 个桶的上界（秒）"""
+        return 10 ** (self.offset + (index + 1) / self.bins_per_decade)
+
+    def snapshot(self):
+        """当前的累计状态，供 summarize 计算某段时间内的统计"""
+        return list(self.counts), self.count, self.total, self.max
+
+    def summarize(self, snapshot, previous=None):
+        """由 snapshot() 的结果（减去更早的 previous）计算次数、均值和 p50/p99/最大值（毫秒）
+
+        百分位取所在桶的上界；有 previous 时最大值取最高非空桶的上界（不超过累计最大值）。
+        """
+        counts, count, total, maximum = snapshot
+        if previous is not None:
+            counts = [a - b for a, b in zip(counts, previous[0])]
+            count -= previous[1]
+            total -= previous[2]
+        if count <= 0:
+            return {'count': 0, 'mean_ms': None, 'p50_ms': None, 'p99_ms': None, 'max_ms': None}
+
+        def percentile(q):
+            threshold = q * count
+            cumulative = 0
+            for index, n in enumerate(counts):
+                cumulative += n
+                if cumulative >= threshold:
+                    return min(self.bin_upper(index), maximum)
+            return maximum
+
+        if previous is not None:
+            highest = max((i for i, n in enumerate(counts) if n > 0), default=None)
+            maximum = maximum if highest is None else min(self.bin_upper(highest), maximum)
+        return {
+            'count': count,
+            'mean_ms': total / count * 1000,
+            'p50_ms': percentile(0.5) * 1000,
+            'p99_ms': percentile(0.99) * 1000,
+            'max_ms': maximum * 1000
+        }
+
+
+class _StageTimer:
+    """单个阶段的计时上下文，每个阶段复用同一个对象（同一阶段不会在多个线程中同时计时）"""
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.record(time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    """关闭统计时使用的空计时上下文"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """处理流程的性能统计：各阶段耗时直方图和计数器
+
+    用法:
+        with metrics.timer('parse'):
+            frames = parser.feed(data)
+        metrics.count('bytes_received', len(data))
+
+    enabled 为 False 时 timer() 直接返回空上下文、count() 和 record() 立即返回，
+    每次调用只多一次属性判断，可以一直留在代码中。计时使用单调时钟 time.perf_counter。
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.histograms = {}
+        self.timers = {}
+        self.counters = {}
+
+    def histogram(self, stage):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms[stage] = LatencyHistogram()
+        return histogram
+
+    def timer(self, stage):
+        """stage 阶段的计时上下文"""
+        if not self.enabled:
+            return NULL_TIMER
+        timer = self.timers.get(stage)
+        if timer is None:
+            timer = self.timers[stage] = _StageTimer(self.histogram(stage))
+        return timer
+
+    def record(self, stage, seconds):
+        """直接记录一次耗时（用于跨线程测得的延迟，如端到端延迟）"""
+        if self.enabled:
+            self.histogram(stage).record(seconds)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def snapshot(self):
+        """所有直方图和计数器的当前累计状态"""
+        histograms = list(self.histograms.items())
+        return ({stage: histogram.snapshot() for stage, histogram in histograms},
+                dict(self.counters))
+
+
+class MetricsWindow:
+    """按时间段读取一个或多个 Metrics（如采集线程和界面线程的统计）：每次 take() 返回自上次调用以来的统计
+
+    界面叠加层和日志各用一个 MetricsWindow，互不影响；只读，不修改 Metrics 中的数据。
+    多个 Metrics 中同名的阶段或计数器以后面的为准。
+    """
+
+    def __init__(self, *metrics):
+        self.metrics = metrics
+        self.previous = [({}, {}) for _ in metrics]
+        self.previous_time = time.perf_counter()
+
+    def take(self):
+        now = time.perf_counter()
+        elapsed = max(now - self.previous_time, 1e-9)
+        stages = {}
+        counters = {}
+        rates = {}
+        for i, metrics in enumerate(self.metrics):
+            histograms, totals = metrics.snapshot()
+            previous_histograms, previous_totals = self.previous[i]
+            for stage, snapshot in histograms.items():
+                stages[stage] = metrics.histograms[stage].summarize(snapshot, previous_histograms.get(stage))
+            for name, value in totals.items():
+                counters[name] = value
+                rates[name] = (value - previous_totals.get(name, 0)) / elapsed
+            self.previous[i] = (histograms, totals)
+        self.previous_time = now
+        return {'interval_s': elapsed, 'stages': stages, 'counters': counters, 'rates': rates}
+
+
+def format_metrics(report, stats=None):
+    """把 MetricsWindow.take() 的结果（和 SerialHandler.get_stats()）格式化为多行文本，用于界面叠加层"""
+    # 中文字符按两列宽计算对齐
+    lines = [f"{'阶段':<10}{'次数':>4}{'p50':>8}{'p99':>8}{'最大':>6}  (ms)"]
+    for stage, summary in sorted(report['stages'].items()):
+        if not summary['count']:
+            continue
+        lines.append(f"{stage:<12}{summary['count']:>6}{summary['p50_ms']:>8.2f}"
+                     f"{summary['p99_ms']:>8.2f}{summary['max_ms']:>8.2f}")
+    for name, rate in sorted(report['rates'].items()):
+        lines.append(f"{name}: {rate:.0f}/s")
+    if stats:
+        lines.append(f"已解析 {stats['frames_parsed']}  错误帧 {stats['frames_malformed']}  "
+                     f"丢弃样本 {stats['dropped_samples']}")
+        lines.append(f"串口待处理 {stats['serial_pending_bytes']} 字节  队列深度 {stats['queue_depth']}")
+    return '\n'.join(lines)
+
+
+class MetricsReporter:
+    """后台线程每隔 interval 秒把 collect() 返回的字典追加一行 JSON 到 path（'-' 为标准输出）"""
+
+    def __init__(self, collect, path='-', interval=10.0):
+        self.collect = collect
+        self.path = path
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is not None:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name='metrics-reporter', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join(timeout=1.0)
+        self.thread = None
+
+    def _run(self):
+        output = sys.stdout if self.path == '-' else open(self.path, 'a', encoding='utf-8')
+        try:
+            while not self.stop_event.wait(self.interval):
+                try:
+                    record = {'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+                    record.update(self.collect())
+                    output.write(json.dumps(record, ensure_ascii=False) + '\n')
+                    output.flush()
+                except Exception as e:
+                    print(f"性能统计输出错误: {e}")
+        finally:
+            if output is not sys.stdout:
+                output.close()
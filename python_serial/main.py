@@ -1,67 +1,261 @@
+import os
 import sys
+import time
+import argparse
+import threading
 from PyQt5.QtWidgets import QApplication
 from PyQt5.QtCore import QTimer
-from serial_handle import SerialHandler
 from ui import ECGMonitorUI
+from instrumentation import MetricsWindow, MetricsReporter, format_metrics
 
 
 class ECGController:
-    def __init__(self):
+    def __init__(self, handler=None, dsp_backend='inprocess', baseline_method='highpass', metrics_log=None,
+                 metrics_interval=10.0, history_dir=None, alarm_rules=None, record_options=None):
         self.ui = ECGMonitorUI()
+        self.dsp_backend = dsp_backend  # 去噪和R波检测的后端：'inprocess' 或 'process'
+        self.baseline_method = baseline_method  # 基线去除方法：'highpass' 或 'median'
+        self.history_dir = history_dir  # 会话历史（回看用）的保存目录，None 为临时目录
+        self.alarm_rules = alarm_rules  # 报警规则参数列表，None 为默认规则
+        self.record_options = record_options or {}  # 录制参数（ECGRecorder 的 compress、processed_dtype）
         self.serial_handler = None
+        # 由 DeviceManager 管理的设备：采集线程已在运行，界面只负责显示，停止时不关闭设备
+        self.managed_handler = handler
+        self.hrv_version = None  # 界面上已显示的HRV数据版本
+        self.hrv_analysis_version = None
+        self.quality_version = None  # 界面上已显示的信号质量版本
+        self.template_version = None  # 界面上已显示的心拍模板版本
+        self.alarms_version = None  # 界面上已显示的报警状态版本
+
+        # 性能统计：叠加层和日志各自按时间段读取采集线程与界面线程的统计
+        self.overlay_metrics = MetricsWindow(self.ui.metrics)
+        self.log_metrics = MetricsWindow(self.ui.metrics)
+        self.overlay_timer = QTimer()
+        self.overlay_timer.timeout.connect(self.update_performance_overlay)
+        self.metrics_reporter = None
+        if metrics_log:
+            self.metrics_reporter = MetricsReporter(self.collect_metrics, metrics_log, metrics_interval)
+            self.metrics_reporter.start()
+            self.ui.metrics.enabled = True
+        self.ui.overlay_checkbox.toggled.connect(self.set_instrumentation)
 
         # 连接UI控件信号
         self.ui.start_button.clicked.connect(self.start_acquisition)
         self.ui.stop_button.clicked.connect(self.stop_acquisition)
+        self.ui.record_button.toggled.connect(self.toggle_recording)
 
         # 创建定时器用于定期更新数据
         self.update_timer = QTimer()
         self.update_timer.timeout.connect(self.update_data)
 
     def start_acquisition(self):
-        port = self.ui.port_combo.currentText()
-        baudrate = int(self.ui.baudrate_combo.currentText())
+        if self.managed_handler is not None:
+            self.serial_handler = self.managed_handler
+        else:
+            # 信号处理相关模块（scipy、pywt 等）较重，到开始采集时才导入，窗口可以更快出现
+            from serial_handle import SerialHandler
 
-        self.serial_handler = SerialHandler(port=port, baudrate=baudrate)
-        self.update_timer.start(20)  # 50Hz更新率
+            port = self.ui.port_combo.currentText()
+            baudrate = int(self.ui.baudrate_combo.currentText())
+            frame_format = self.ui.format_combo.currentData()
+            speed = self.ui.speed_combo.currentData()
+            leads = self.ui.leads_combo.currentData()
+            self.serial_handler = SerialHandler(port=port, baudrate=baudrate, frame_format=frame_format, speed=speed,
+                                                dsp_backend=self.dsp_backend, baseline_method=self.baseline_method,
+                                                history_dir=self.history_dir, leads=leads,
+                                                alarm_rules=self.alarm_rules)
+        self.hrv_version = None
+        self.hrv_analysis_version = None
+        self.quality_version = None
+        self.template_version = None
+        self.alarms_version = None
+        self.serial_handler.set_metrics_enabled(self.instrumentation_enabled())
+        self.overlay_metrics = MetricsWindow(self.serial_handler.metrics, self.ui.metrics)
+        self.log_metrics = MetricsWindow(self.serial_handler.metrics, self.ui.metrics)
+        # 串口读取和信号处理放到后台线程，界面定时器只负责取数据刷新
+        self.serial_handler.start_acquisition_thread()
+        alarms = self.serial_handler.alarms
+        self.ui.review_widget.set_store(self.serial_handler.history, alarms.log if alarms is not None else None)
+        self.update_timer.start(self.ui.frame_governor.interval_ms())
 
         self.ui.start_button.setEnabled(False)
         self.ui.stop_button.setEnabled(True)
+        self.ui.record_button.setEnabled(True)
 
     def stop_acquisition(self):
+        self.ui.record_button.setChecked(False)
         if self.serial_handler:
-            self.serial_handler.close()
+            if self.serial_handler is not self.managed_handler:
+                self.serial_handler.close()
+            else:
+                self.serial_handler.set_metrics_enabled(False)
             self.serial_handler = None
+        self.ui.review_widget.set_store(None)
         self.update_timer.stop()
+        self.overlay_metrics = MetricsWindow(self.ui.metrics)
+        self.log_metrics = MetricsWindow(self.ui.metrics)
 
         self.ui.start_button.setEnabled(True)
         self.ui.stop_button.setEnabled(False)
+        self.ui.record_button.setEnabled(False)
         self.ui.clear_plots()
 
+    def toggle_recording(self, checked):
+        if not self.serial_handler:
+            return
+
+        if checked:
+            directory = os.path.join('recordings', time.strftime('%Y%m%d_%H%M%S'))
+            self.serial_handler.start_recording(directory, **self.record_options)
+            self.ui.record_button.setText("停止录制")
+        else:
+            self.serial_handler.stop_recording()
+            self.ui.record_button.setText("开始录制")
+
     def update_data(self):
         if not self.serial_handler:
             return
+        if self.managed_handler is not None and not self.ui.isVisible():
+            # 多设备模式下详情窗口关闭后不再取数据，总览仍可通过 latest() 显示
+            return
 
-        # 读取数据
-        data = self.serial_handler.read_data()
+        # 取出采集线程写入的新数据
+        data = self.serial_handler.read_samples()
         if data is not None:
-            # 更新波形图
-            for i, value in enumerate(data):
-                self.ui.update_plot_data(i, value)
+            # 新数据写入绘图缓冲区
+            self.ui.update_plot_data(data, arrival=self.serial_handler.latest_arrival)
+
+        # HRV数据只在有新心拍且数值变化时更新
+        hrv_version = self.serial_handler.hrv_version()
+        if hrv_version != self.hrv_version:
+            self.hrv_version = hrv_version
+            self.ui.data_receiver.hrv_data_updated.emit(self.serial_handler.get_hrv_data())
+        analysis_version = self.serial_handler.hrv_analysis_version()
+        if analysis_version != self.hrv_analysis_version:
+            self.hrv_analysis_version = analysis_version
+            self.ui.data_receiver.hrv_analysis_updated.emit(self.serial_handler.get_hrv_analysis())
+        quality = self.serial_handler.get_signal_quality()
+        if quality['version'] != self.quality_version:
+            self.quality_version = quality['version']
+            self.ui.data_receiver.signal_quality_updated.emit(quality)
+        template_version = self.serial_handler.beat_templates_version()
+        if template_version != self.template_version:
+            self.template_version = template_version
+            self.ui.data_receiver.beat_templates_updated.emit(self.serial_handler.get_beat_templates())
+        alarms_version = self.serial_handler.alarms_version()
+        if alarms_version != self.alarms_version:
+            self.alarms_version = alarms_version
+            self.ui.data_receiver.alarms_updated.emit(self.serial_handler.get_alarms())
+
+        # 每次刷新只重绘一次当前页面的曲线
+        self.ui.refresh_plots()
+
+        # 按实测绘制耗时调整刷新间隔
+        interval = self.ui.frame_governor.interval_ms()
+        if interval != self.update_timer.interval():
+            self.update_timer.setInterval(interval)
 
-            # 获取并更新HRV数据
-            hrv_data = self.serial_handler.get_hrv_data()
-            self.ui.data_receiver.hrv_data_updated.emit(hrv_data)
+    def instrumentation_enabled(self):
+        return self.ui.overlay_checkbox.isChecked() or self.metrics_reporter is not None
+
+    def set_instrumentation(self, overlay_enabled):
+        """性能叠加层开关：打开或关闭采集线程和界面线程的统计"""
+        enabled = self.instrumentation_enabled()
+        self.ui.metrics.enabled = enabled
+        if self.serial_handler:
+            self.serial_handler.set_metrics_enabled(enabled)
+        if overlay_enabled:
+            self.overlay_metrics.take()  # 丢弃打开前的统计
+            self.overlay_timer.start(500)
+        else:
+            self.overlay_timer.stop()
+
+    def update_performance_overlay(self):
+        stats = self.serial_handler.get_stats() if self.serial_handler else None
+        self.ui.set_performance_text(format_metrics(self.overlay_metrics.take(), stats))
+
+    def collect_metrics(self):
+        """在日志线程中调用：自上次输出以来的各阶段耗时、计数器和采集状态"""
+        report = self.log_metrics.take()
+        handler = self.serial_handler
+        if handler:
+            report['acquisition'] = handler.get_stats()
+        return report
+
+    def close_metrics(self):
+        if self.metrics_reporter:
+            self.metrics_reporter.stop()
+            self.metrics_reporter = None
 
     def show(self):
         self.ui.show()
 
+    @staticmethod
+    def preload_dsp():
+        """窗口显示后在后台线程中预先导入信号处理模块，点击开始时不必再等待导入"""
+        def preload():
+            try:
+                import serial_handle  # noqa: F401
+            except Exception as e:
+                print(f"预加载信号处理模块错误: {e}")
+
+        threading.Thread(target=preload, name='dsp-preload', daemon=True).start()
+
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
     app.setStyle('Fusion')  # 使用Fusion主题以获得更好的外观
 
-    controller = ECGController()
-    controller.show()
+    parser = argparse.ArgumentParser(description="十二导联心电上位机")
+    parser.add_argument('--devices', nargs='+', metavar='PORT',
+                        help="多设备总览模式：同时打开多个串口（或 synthetic:<心率>、replay:<路径>）")
+    parser.add_argument('--dsp-backend', choices=['inprocess', 'process'], default='inprocess',
+                        help="去噪和R波检测在采集线程中进行（inprocess），或放到独立子进程（process，需 Python 3.8+）")
+    parser.add_argument('--baseline', choices=['highpass', 'median'], default='highpass',
+                        help="基线去除方法：高通滤波（无延迟）或两级中值滤波（保留 ST 段形态，约 0.4 秒延迟）")
+    parser.add_argument('--leads', type=int, choices=[12, 8], default=12,
+                        help="设备发送的导联数：12，或 8（只发送 I、II、V1~V6，其余肢体导联在上位机导出）")
+    parser.add_argument('--history-dir', metavar='DIR',
+                        help="会话历史（历史回看用）保存目录，默认使用临时目录并在停止采集时删除")
+    parser.add_argument('--alarm-rules', metavar='PATH',
+                        help="报警规则 JSON 文件（ThresholdRule 参数列表），默认使用内置的心率、停搏、导联脱落和 HRV 规则")
+    parser.add_argument('--record-compress', action='store_true',
+                        help="录制文件用 gzip 压缩（原始帧约减小一半，不能再用 memmap 直接打开）")
+    parser.add_argument('--record-float16', action='store_true',
+                        help="处理后的波形以 float16 录制，文件大小减半")
+    parser.add_argument('--metrics-log', metavar='PATH',
+                        help="定期把各处理阶段耗时和采集统计以 JSON 行追加到文件（'-' 为标准输出），单设备模式")
+    parser.add_argument('--metrics-interval', type=float, default=10.0, help="性能统计日志的输出间隔（秒）")
+    parser.add_argument('--exit-after-show', action='store_true', help="窗口显示后立即退出（启动耗时测试用）")
+    args = parser.parse_args(app.arguments()[1:])
+    alarm_rules = None
+    if args.alarm_rules:
+        from alarms import load_rules
+        alarm_rules = load_rules(args.alarm_rules)
+    record_options = {'compress': args.record_compress,
+                      'processed_dtype': 'float16' if args.record_float16 else 'float32'}
+
+    if args.devices:
+        from device_manager import DeviceManager
+        from overview_ui import DeviceOverviewWindow
+
+        manager = DeviceManager(dsp_backend=args.dsp_backend, baseline_method=args.baseline,
+                                history_dir=args.history_dir, leads=args.leads, alarm_rules=alarm_rules)
+        for port in args.devices:
+            manager.add_device(port)
+        window = DeviceOverviewWindow(manager, record_options=record_options)
+        window.show()
+    else:
+        controller = ECGController(dsp_backend=args.dsp_backend, baseline_method=args.baseline,
+                                   metrics_log=args.metrics_log, metrics_interval=args.metrics_interval,
+                                   history_dir=args.history_dir, alarm_rules=alarm_rules,
+                                   record_options=record_options)
+        controller.ui.leads_combo.setCurrentIndex(controller.ui.leads_combo.findData(args.leads))
+        controller.show()
+        app.aboutToQuit.connect(controller.close_metrics)
 
+    if args.exit_after_show:
+        QTimer.singleShot(0, app.quit)
+    elif not args.devices:
+        QTimer.singleShot(0, ECGController.preload_dsp)
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,223 @@
+from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
+                             QPushButton, QComboBox, QLabel, QFrame)
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+import threading
+import numpy as np
+import pyqtgraph as pg
+
+
+class DeviceTile(QFrame):
+    """总览中的单台设备：一个导联的波形和心率"""
+
+    def __init__(self, name, seconds, parent=None):
+        super().__init__(parent)
+        self.name = name
+        self.setStyleSheet("""
+            QFrame {
+                background-color: #3d3d3d;
+                border-radius: 8px;
+            }
+        """)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(8, 8, 8, 8)
+
+        header = QHBoxLayout()
+        self.name_label = QLabel(name)
+        self.name_label.setStyleSheet("font-size: 16px; font-weight: bold;")
+        self.hr_label = QLabel("-- bpm")
+        self.hr_label.setStyleSheet("font-size: 20px; color: #ff4444; font-weight: bold;")
+        self.detail_button = QPushButton("详情")
+        self.remove_button = QPushButton("移除")
+        header.addWidget(self.name_label)
+        header.addStretch()
+        header.addWidget(self.hr_label)
+        header.addWidget(self.detail_button)
+        header.addWidget(self.remove_button)
+        layout.addLayout(header)
+
+        self.plot_widget = pg.PlotWidget()
+        self.plot_widget.setBackground('#1e1e1e')
+        plot = self.plot_widget.getPlotItem()
+        plot.hideAxis('bottom')
+        plot.hideAxis('left')
+        plot.setMouseEnabled(x=False, y=False)
+        plot.hideButtons()
+        plot.setMenuEnabled(False)
+        plot.setXRange(0, seconds, padding=0)
+        plot.setYRange(-1.5, 1.5, padding=0)
+        self.curve = plot.plot(pen=pg.mkPen('#00ff00', width=1))
+        layout.addWidget(self.plot_widget)
+
+    def update_view(self, info):
+        samples = info['samples']
+        self.curve.setData(np.arange(len(samples)) / info['fs'], samples)
+        heart_rate = info['heart_rate']
+        self.hr_label.setText(f"{heart_rate:.0f} bpm" if heart_rate else "-- bpm")
+
+
+class DeviceOverviewWindow(QMainWindow):
+    """多设备总览：每台设备一个小窗口（导联 II + 心率），点击“详情”查看完整十二导联"""
+
+    ports_listed = pyqtSignal(list)
+
+    def __init__(self, manager, columns=2, seconds=5.0, refresh_ms=100, record_options=None):
+        super().__init__()
+        self.manager = manager
+        self.record_options = record_options  # 详情界面录制时的 ECGRecorder 参数
+        self.columns = columns
+        self.seconds = seconds
+        self.tiles = {}
+        self.detail_controllers = {}  # 设备名 -> 详情界面的 ECGController
+
+        self.setWindowTitle("多床位心电监护总览")
+        self.resize(1600, 900)
+        self.setStyleSheet("""
+            QMainWindow, QWidget {
+                background-color: #2b2b2b;
+            }
+            QLabel {
+                color: #ffffff;
+                font-size: 13px;
+            }
+            QPushButton {
+                background-color: #3d3d3d;
+                color: #ffffff;
+                border: 1px solid #555555;
+                border-radius: 4px;
+                padding: 5px 15px;
+                font-size: 13px;
+            }
+            QComboBox {
+                background-color: #3d3d3d;
+                color: #ffffff;
+                border: 1px solid #555555;
+                border-radius: 4px;
+                padding: 5px;
+                min-width: 160px;
+            }
+        """)
+
+        central_widget = QWidget()
+        self.setCentralWidget(central_widget)
+        main_layout = QVBoxLayout(central_widget)
+
+        # 添加设备
+        control_layout = QHBoxLayout()
+        control_layout.addWidget(QLabel("串口:"))
+        self.port_combo = QComboBox()
+        self.port_combo.setEditable(True)
+        control_layout.addWidget(self.port_combo)
+        self.add_button = QPushButton("添加设备")
+        self.add_button.clicked.connect(self.add_device)
+        control_layout.addWidget(self.add_button)
+        control_layout.addStretch()
+        main_layout.addLayout(control_layout)
+
+        self.grid = QGridLayout()
+        self.grid.setSpacing(10)
+        main_layout.addLayout(self.grid, stretch=1)
+
+        # 串口枚举可能耗时数秒，放到窗口显示之后的后台线程中
+        self.ports_listed.connect(self.set_port_list)
+        self.set_port_list([])
+        QTimer.singleShot(0, self.update_port_list)
+        for name in manager.devices():
+            self._add_tile(name)
+
+        self.refresh_timer = QTimer()
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(refresh_ms)
+
+    def update_port_list(self):
+        """在后台线程中枚举串口，完成后由 set_port_list 更新列表"""
+        threading.Thread(target=self._enumerate_ports, name='port-enumeration', daemon=True).start()
+
+    def _enumerate_ports(self):
+        try:
+            import serial.tools.list_ports
+            ports = [port.device for port in serial.tools.list_ports.comports()]
+        except Exception as e:
+            print(f"串口枚举错误: {e}")
+            ports = []
+        # 跨线程发射信号，set_port_list 在界面线程中执行
+        self.ports_listed.emit(ports)
+
+    def set_port_list(self, ports):
+        """更新可用串口列表，保留当前选择"""
+        current = self.port_combo.currentText()
+        self.port_combo.clear()
+        for port in ports:
+            self.port_combo.addItem(port)
+        self.port_combo.addItem('synthetic')
+        index = self.port_combo.findText(current)
+        if index >= 0:
+            self.port_combo.setCurrentIndex(index)
+
+    def add_device(self):
+        port = self.port_combo.currentText().strip()
+        if not port:
+            return
+        # 同一种模拟信号可以添加多次，用序号区分
+        name = port
+        index = 2
+        while name in self.tiles:
+            name = f"{port} #{index}"
+            index += 1
+        name = self.manager.add_device(port, name=name)
+        if name:
+            self._add_tile(name)
+
+    def _add_tile(self, name):
+        tile = DeviceTile(name, self.seconds)
+        tile.detail_button.clicked.connect(lambda: self.show_detail(name))
+        tile.remove_button.clicked.connect(lambda: self.remove_device(name))
+        self.tiles[name] = tile
+        self._layout_tiles()
+
+    def _layout_tiles(self):
+        for tile in self.tiles.values():
+            self.grid.removeWidget(tile)
+        for i, tile in enumerate(self.tiles.values()):
+            self.grid.addWidget(tile, i // self.columns, i % self.columns)
+
+    def remove_device(self, name):
+        controller = self.detail_controllers.pop(name, None)
+        if controller:
+            controller.stop_acquisition()
+            controller.ui.close()
+        tile = self.tiles.pop(name, None)
+        if tile:
+            self.grid.removeWidget(tile)
+            tile.deleteLater()
+            self._layout_tiles()
+        self.manager.remove_device(name)
+
+    def show_detail(self, name):
+        """打开该设备的十二导联详情界面"""
+        from main import ECGController
+
+        controller = self.detail_controllers.get(name)
+        if controller is None:
+            handler = self.manager.handler(name)
+            if handler is None:
+                return
+            controller = ECGController(handler=handler, record_options=self.record_options)
+            controller.ui.setWindowTitle(f"12导联心电实时监护系统 - {name}")
+            self.detail_controllers[name] = controller
+        controller.start_acquisition()
+        controller.show()
+        controller.ui.raise_()
+
+    def refresh(self):
+        for info in self.manager.overview(self.seconds):
+            tile = self.tiles.get(info['name'])
+            if tile:
+                tile.update_view(info)
+
+    def closeEvent(self, event):
+        self.refresh_timer.stop()
+        for controller in self.detail_controllers.values():
+            controller.stop_acquisition()
+            controller.ui.close()
+        self.manager.close_all()
+        super().closeEvent(event)
@@ -0,0 +1,513 @@
+import numpy as np
+from scipy import signal
+
+
+class PanTompkinsDetector:
+    """流式 Pan-Tompkins QRS 检测器
+
+    按块处理：带通滤波、五点微分、平方、移动窗口积分都用带状态的
+    scipy 滤波器一次处理整块数据，积分信号的局部极大值作为候选峰，
+    只有候选峰（每秒几个）才进入 Python 逻辑：
+      - 积分信号（SPKI/NPKI）和带通信号（SPKF/NPKF）各自维护信号/噪声峰值估计和双阈值，
+        候选峰需同时超过两者的阈值
+      - 200ms 不应期，360ms 内斜率过小的峰视为 T 波
+      - 超过 1.66 倍平均 RR 间期未检出心拍时，用次阈值回溯搜索
+    process() 返回本块中检出的 R 波位置（输入样本的绝对编号）。
+    """
+
+    def __init__(self, fs=250, band=(5.0, 15.0), integration_window=0.15, refractory=0.2,
+                 t_wave_window=0.36, learning_time=2.0, history_time=4.0):
+        self.fs = fs
+        self.sos = signal.butter(2, band, btype='bandpass', fs=fs, output='sos')
+        self.derivative = np.array([1, 2, 0, -2, -1]) * fs / 8.0
+        self.window = max(1, int(integration_window * fs))
+        self.refractory = int(refractory * fs)
+        self.t_wave_window = int(t_wave_window * fs)
+        self.learning_samples = int(learning_time * fs)
+        self.history_len = int(history_time * fs)
+        self.slope_window = max(1, int(0.075 * fs))
+        self.search_radius = max(1, int(0.04 * fs))  # 在原始信号上细化 R 波位置的范围
+
+        # 带通滤波器在通带中心的群延迟
+        b, a = signal.sos2tf(self.sos)
+        _, delay = signal.group_delay((b, a), w=[np.sqrt(band[0] * band[1])], fs=fs)
+        self.filter_delay = int(round(delay[0]))
+        self.reset()
+
+    def reset(self):
+        """清空状态"""
+        self.filter_state = self._initial_filter_state()
+        self.sample_index = 0  # 下一个输入样本的绝对编号
+        self.mwi_tail = np.zeros(0)  # 上一块末尾的积分值，用于跨块判断局部极大
+
+        # 最近一段时间的原始信号、带通信号和积分信号
+        self.history_start = 0
+        self.history_x = np.zeros(0)
+        self.history_filtered = np.zeros(0)
+        self.history_mwi = np.zeros(0)
+
+        # 学习阶段
+        self.learning = True
+        self.learning_mwi = []
+        self.learning_filtered = []
+        self.learning_candidates = []
+
+        # 自适应阈值
+        self.spki = 0.0
+        self.npki = 0.0
+        self.threshold1 = 0.0
+        self.threshold2 = 0.0
+        self.spkf = 0.0
+        self.npkf = 0.0
+        self.threshold_f1 = 0.0
+        self.threshold_f2 = 0.0
+
+        self.last_qrs = None  # 上一个 QRS 在积分信号上的位置
+        self.last_r = None  # 上一个 R 波位置
+        self.last_slope = 0.0
+        self.rr_recent = []  # 最近 8 个 RR 间期（样本数）
+        self.rr_selected = []  # 最近 8 个落在正常范围内的 RR 间期
+        self.search_back_candidate = None  # 回溯搜索用：上个 QRS 之后最高的次阈值峰
+        self.peaks = []
+
+    def rr_average(self):
+        """当前平均 RR 间期（样本数），没有时返回 None"""
+        rr = self.rr_selected or self.rr_recent
+        return float(np.mean(rr)) if rr else None
+
+    def _initial_filter_state(self, n_channels=None):
+        """带通滤波器状态和微分、积分所需的前一块末尾数据；n_channels 不为 None 时为多通道 (n, C) 数据准备"""
+        tail = () if n_channels is None else (n_channels,)
+        return (np.zeros((self.sos.shape[0], 2) + tail),
+                np.zeros((len(self.derivative) - 1,) + tail),
+                np.zeros((self.window - 1,) + tail))
+
+    def _filter(self, x, state):
+        """带通滤波、微分、平方、移动窗口积分，沿第 0 维处理，返回 (带通信号, 积分信号, 新状态)
+
+        微分和积分是短 FIR，直接用切片和累加和计算，比 lfilter 对多通道逐列卷积快得多。
+        """
+        bp_zi, filtered_tail, squared_tail = state
+        n = len(x)
+        filtered, bp_zi = signal.sosfilt(self.sos, x, axis=0, zi=bp_zi)
+
+        extended = np.concatenate((filtered_tail, filtered))
+        taps = len(self.derivative)
+        derivative = self.derivative[0] * extended[taps - 1:]
+        for k in range(1, taps):
+            if self.derivative[k]:
+                derivative = derivative + self.derivative[k] * extended[taps - 1 - k:taps - 1 - k + n]
+        squared = derivative ** 2
+
+        if self.window > 1:
+            extended_sq = np.concatenate((squared_tail, squared))
+            cumulative = np.cumsum(extended_sq, axis=0)
+            mwi = cumulative[self.window - 1:].copy()
+            mwi[1:] -= cumulative[:n - 1]
+            mwi /= self.window
+            squared_tail = extended_sq[n:]
+        else:
+            mwi = squared
+        return filtered, mwi, (bp_zi, extended[n:], squared_tail)
+
+    def process(self, samples):
+        """处理一批样本，返回本块检出的 R 波位置数组"""
+        x = np.asarray(samples, dtype=float)
+        if len(x) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        filtered, mwi, self.filter_state = self._filter(x, self.filter_state)
+        return self._detect(x, filtered, mwi)
+
+    def _detect(self, x, filtered, mwi):
+        """在滤波后的信号上检测 QRS，x、filtered、mwi 为等长的一维数组"""
+        n = len(x)
+        start = self.sample_index
+        self._append_history(x, filtered, mwi)
+        self.sample_index += n
+
+        # 积分信号的局部极大值作为候选峰
+        extended = np.concatenate((self.mwi_tail, mwi))
+        offset = start - len(self.mwi_tail)
+        middle = extended[1:-1]
+        maxima = np.flatnonzero((middle > extended[:-2]) & (middle >= extended[2:])) + 1
+        self.mwi_tail = extended[-2:]
+
+        self.peaks = []
+        if self.learning:
+            self.learning_mwi.append(mwi)
+            self.learning_filtered.append(np.abs(filtered))
+            self.learning_candidates.extend(zip((maxima + offset).tolist(), extended[maxima].tolist()))
+            if self.sample_index >= self.learning_samples:
+                self._finish_learning()
+        else:
+            for index, value in zip((maxima + offset).tolist(), extended[maxima].tolist()):
+                self._process_candidate(index, value)
+
+        self._check_search_back(self.sample_index)
+        return np.array(self.peaks, dtype=np.int64)
+
+    def _append_history(self, x, filtered, mwi):
+        self.history_x = np.concatenate((self.history_x, x))[-self.history_len:]
+        self.history_filtered = np.concatenate((self.history_filtered, filtered))[-self.history_len:]
+        self.history_mwi = np.concatenate((self.history_mwi, mwi))[-self.history_len:]
+        self.history_start = self.sample_index + len(x) - len(self.history_x)
+
+    def _history_slice(self, history, begin, end):
+        """取绝对编号 [begin, end) 的历史数据"""
+        begin = max(begin - self.history_start, 0)
+        end = max(end - self.history_start, 0)
+        return history[begin:end], begin + self.history_start
+
+    def _finish_learning(self):
+        """学习阶段结束：根据前几秒的积分信号初始化阈值，再处理期间的候选峰"""
+        self.learning = False
+        # 信号峰取每秒最大值的中位数，噪声峰取全部局部极大值的中位数（大部分候选峰是噪声），
+        # 比原算法的 最大值/3、均值/2 更不容易被高噪声拉低阈值
+        mwi = np.concatenate(self.learning_mwi)
+        filtered = np.concatenate(self.learning_filtered)
+        self.learning_mwi, self.learning_filtered = [], []
+        seconds = max(1, len(mwi) // self.fs)
+        self.spki = float(np.median([part.max() for part in np.array_split(mwi, seconds)]))
+        self.spkf = float(np.median([part.max() for part in np.array_split(filtered, seconds)]))
+        candidate_values = [value for _, value in self.learning_candidates]
+        self.npki = float(np.median(candidate_values)) if candidate_values else 0.0
+        self.npkf = float(np.median(filtered))
+        self._update_thresholds()
+        candidates, self.learning_candidates = self.learning_candidates, []
+        for index, value in candidates:
+            self._process_candidate(index, value)
+
+    def _update_thresholds(self):
+        self.threshold1 = self.npki + 0.25 * (self.spki - self.npki)
+        self.threshold2 = 0.5 * self.threshold1
+        self.threshold_f1 = self.npkf + 0.25 * (self.spkf - self.npkf)
+        self.threshold_f2 = 0.5 * self.threshold_f1
+
+    def _filtered_peak(self, index):
+        """积分窗口内带通信号的峰值"""
+        segment, _ = self._history_slice(self.history_filtered, index - self.window, index + 1)
+        return float(np.abs(segment).max()) if len(segment) else 0.0
+
+    def _slope(self, index):
+        """积分信号在峰值前 75ms 内的平均上升斜率，比带通信号的最大斜率更不受噪声影响"""
+        segment, _ = self._history_slice(self.history_mwi, index - self.slope_window, index + 1)
+        if len(segment) < 2:
+            return 0.0
+        return float(segment[-1] - segment[0]) / (len(segment) - 1)
+
+    def _locate_r(self, index):
+        """在原始信号上确定 R 波位置"""
+        segment, seg_start = self._history_slice(self.history_filtered, index - self.window, index + 1)
+        if len(segment) == 0:
+            return index - self.filter_delay
+        estimate = seg_start + int(np.argmax(np.abs(segment))) - self.filter_delay
+
+        segment, seg_start = self._history_slice(self.history_x, estimate - self.search_radius,
+                                                 estimate + self.search_radius + 1)
+        if len(segment) == 0:
+            return estimate
+        return seg_start + int(np.argmax(np.abs(segment - np.median(segment))))
+
+    def _process_candidate(self, index, peak):
+        self._check_search_back(index)
+
+        if self.last_qrs is not None and index - self.last_qrs < self.refractory:
+            return
+
+        filtered_peak = self._filtered_peak(index)
+        if peak > self.threshold1 and filtered_peak > self.threshold_f1:
+            slope = self._slope(index)
+            if (self.last_qrs is not None and index - self.last_qrs < self.t_wave_window
+                    and slope < 0.5 * self.last_slope):
+                # 斜率过小，判定为 T 波
+                self._update_noise(peak, filtered_peak)
+                return
+            self.spki = 0.125 * peak + 0.875 * self.spki
+            self.spkf = 0.125 * filtered_peak + 0.875 * self.spkf
+            self._accept(index, slope)
+        else:
+            self._update_noise(peak, filtered_peak)
+            if (peak > self.threshold2 and filtered_peak > self.threshold_f2
+                    and (self.search_back_candidate is None or peak > self.search_back_candidate[1])):
+                self.search_back_candidate = (index, peak, filtered_peak)
+
+    def _update_noise(self, peak, filtered_peak):
+        self.npki = 0.125 * peak + 0.875 * self.npki
+        self.npkf = 0.125 * filtered_peak + 0.875 * self.npkf
+        self._update_thresholds()
+
+    def _check_search_back(self, now):
+        """长时间未检出心拍时，把次阈值以上的最高峰补为 QRS"""
+        rr_average = self.rr_average()
+        if (self.last_qrs is None or rr_average is None or self.search_back_candidate is None
+                or now - self.last_qrs <= 1.66 * rr_average):
+            return
+        index, peak, filtered_peak = self.search_back_candidate
+        self.spki = 0.25 * peak + 0.75 * self.spki
+        self.spkf = 0.25 * filtered_peak + 0.75 * self.spkf
+        self._accept(index, self._slope(index))
+
+    def _accept(self, index, slope):
+        """确认一个 QRS"""
+        r_index = self._locate_r(index)
+        if self.last_r is not None:
+            rr = r_index - self.last_r
+            if rr <= 0:
+                self.search_back_candidate = None
+                return
+            rr_average = self.rr_average()
+            self.rr_recent = (self.rr_recent + [rr])[-8:]
+            if rr_average is None or 0.92 * rr_average <= rr <= 1.16 * rr_average:
+                self.rr_selected = (self.rr_selected + [rr])[-8:]
+
+        self.last_qrs = index
+        self.last_r = r_index
+        self.last_slope = slope
+        self.search_back_candidate = None
+        self._update_thresholds()
+        self.peaks.append(r_index)
+
+
+class MultiLeadQRSDetector(PanTompkinsDetector):
+    """多导联融合 QRS 检测器
+
+    所有候选导联的带通、微分、积分在一次向量化滤波中完成（数据形状 (n, C)）。
+    每个导联维护信号峰/噪声水平和信号质量指数 SQI（0~1），自动选出 SQI 最高的
+    n_selected 个导联，按各自信号水平归一化、按 SQI 加权合成一路检测信号，
+    再交给 Pan-Tompkins 的阈值判决。每个心拍的置信度为各导联对该心拍的
+    支持程度按 SQI 加权的平均值，保存在 confidences 中（与 process() 的返回值一一对应）。
+    R 波位置不从合成信号上取（合成时按极性翻转的导联会把深 S 波当成峰值，所选导联一变位置就在 R、S 之间跳动），
+    而是在一个参考导联的原始信号上取主波方向的峰值：参考导联为主波向上的导联中 SQI 最高的一个，
+    只在它的 SQI 明显落后时才更换，保证各心拍的定位基准一致。
+    """
+
+    def __init__(self, fs=250, n_channels=12, leads=None, n_selected=3, **kwargs):
+        self.n_channels = n_channels
+        self.leads = list(range(n_channels)) if leads is None else list(leads)  # 参与检测的导联
+        self.n_selected = min(n_selected, len(self.leads))
+        super().__init__(fs=fs, **kwargs)
+
+    def reset(self):
+        """清空状态"""
+        super().reset()
+        n_leads = len(self.leads)
+        self.lead_filter_state = self._initial_filter_state(n_leads)
+        self.lead_sample_index = 0
+
+        # 各导联最近一段时间的带通信号和积分信号
+        self.lead_history_start = 0
+        self.lead_history_x = np.zeros((0, n_leads))
+        self.lead_history_filtered = np.zeros((0, n_leads))
+        self.lead_history_mwi = np.zeros((0, n_leads))
+
+        self.lead_learning = True
+        self.lead_learning_blocks = []
+        self.lead_signal = np.ones(n_leads)  # 各导联 QRS 在积分信号上的峰值水平
+        self.lead_noise = np.zeros(n_leads)  # 各导联心拍之间积分信号的水平
+        self.lead_polarity = np.ones(n_leads)  # 各导联带通信号中 QRS 的主要符号（用于合成）
+        self.lead_direction = np.ones(n_leads)  # 各导联原始信号中 QRS 主波方向（>0 向上），用于定位 R 波
+        self.lead_agreement = np.ones(n_leads)  # 各导联对已确认心拍的平均支持程度
+        self.lead_updated = 0  # 上次更新导联统计时的样本编号
+        self.lead_last_beat = None
+        self.lead_quality = np.ones(n_leads)  # 外部信号质量评估给出的各导联质量（0~1）
+        self.sqi = np.zeros(n_leads)
+        self.weights = np.zeros(n_leads)
+        self.selected_leads = []
+        self.reference_lead = 0  # 确定 R 波位置的参考导联（self.leads 中的序号）
+        self.confidences = []
+
+    def process(self, frames):
+        """处理一批多导联帧 (n, n_channels)，返回本块检出的 R 波位置数组"""
+        frames = np.asarray(frames, dtype=float)
+        if len(frames) == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        x = frames[:, self.leads]
+        filtered, mwi, self.lead_filter_state = self._filter(x, self.lead_filter_state)
+        self._append_lead_history(x, filtered, mwi)
+        self.confidences = []
+
+        if self.lead_learning:
+            # 学习阶段先缓存，结束时按各导联统计量确定权重后再一起送入检测
+            self.lead_learning_blocks.append((x, filtered, mwi))
+            if self.lead_sample_index < self.learning_samples:
+                return np.zeros(0, dtype=np.int64)
+            x, filtered, mwi = (np.concatenate(parts) for parts in zip(*self.lead_learning_blocks))
+            self.lead_learning_blocks = []
+            self.lead_learning = False
+            self._learn_leads(x, filtered, mwi)
+        elif self.lead_sample_index - self.lead_updated > self.history_len:
+            # 长时间没有检出心拍（如所选导联同时脱落），按最近的数据重新评估各导联
+            self._learn_leads(self.lead_history_x, self.lead_history_filtered, self.lead_history_mwi, relearn=True)
+
+        return self._detect(*self._fuse(x, filtered, mwi))
+
+    def _append_lead_history(self, x, filtered, mwi):
+        self.lead_sample_index += len(filtered)
+        self.lead_history_x = np.concatenate((self.lead_history_x, x))[-self.history_len:]
+        self.lead_history_filtered = np.concatenate((self.lead_history_filtered, filtered))[-self.history_len:]
+        self.lead_history_mwi = np.concatenate((self.lead_history_mwi, mwi))[-self.history_len:]
+        self.lead_history_start = self.lead_sample_index - len(self.lead_history_mwi)
+
+    def _lead_slice(self, begin, end):
+        """取绝对编号 [begin, end) 的各导联 (带通信号, 积分信号)"""
+        begin = max(begin - self.lead_history_start, 0)
+        end = max(end - self.lead_history_start, 0)
+        return self.lead_history_filtered[begin:end], self.lead_history_mwi[begin:end]
+
+    def _learn_leads(self, x, filtered, mwi, relearn=False):
+        """根据一段数据估计各导联的信号/噪声水平、极性和主波方向"""
+        seconds = max(1, len(mwi) // self.fs)
+        deviation = x - np.median(x, axis=0)
+        lead_direction = np.where(deviation.max(axis=0) >= -deviation.min(axis=0), 1.0, -1.0)
+        lead_signal = np.median([part.max(axis=0) for part in np.array_split(mwi, seconds)], axis=0)
+        lead_noise = np.median(mwi, axis=0)
+        lead_polarity = np.where(filtered.max(axis=0) >= -filtered.min(axis=0), 1.0, -1.0)
+        if relearn:
+            # 这段时间平直（导联脱落）的导联保留原有统计，否则重新接上后按接近 0 的水平归一化，
+            # 合成信号暴涨，阈值被抬高后再也检不出心拍
+            keep = lead_signal < 0.01 * self.lead_signal
+            lead_signal = np.where(keep, self.lead_signal, lead_signal)
+            lead_noise = np.where(keep, self.lead_noise, lead_noise)
+            lead_polarity = np.where(keep, self.lead_polarity, lead_polarity)
+            lead_direction = np.where(keep, self.lead_direction, lead_direction)
+        self.lead_direction = lead_direction
+        self.lead_signal = lead_signal
+        self.lead_noise = lead_noise
+        self.lead_polarity = lead_polarity
+        self.lead_updated = self.lead_sample_index
+        self._update_weights()
+
+    def set_lead_quality(self, quality):
+        """设置各通道的信号质量（如 SignalQualityMonitor.quality），质量为 0 的导联不参与合成"""
+        self.lead_quality = np.asarray(quality, dtype=float)[self.leads]
+        if not self.lead_learning:
+            self._update_weights()
+
+    def _update_weights(self):
+        """更新 SQI，选出质量最好的导联并计算合成权重"""
+        signal_level = np.maximum(self.lead_signal, 1e-12)
+        # 积分信号中 QRS 峰应远高于心拍间的水平；纯噪声导联两者相近，平直导联两者都接近 0。
+        # 再乘以该导联对融合结果的支持程度，中途脱落的导联因此逐渐被排除；
+        # 外部质量评估判为脱落或饱和的导联立即排除
+        snr_quality = np.clip(1 - 2 * self.lead_noise / signal_level, 0, 1)
+        self.sqi = np.where(self.lead_signal > 1e-12, snr_quality * self.lead_agreement * self.lead_quality, 0.0)
+        order = np.argsort(-self.sqi)[:self.n_selected]
+        weights = np.zeros(len(self.leads))
+        if self.sqi[order].sum() > 0:
+            weights[order] = self.sqi[order] / self.sqi[order].sum()
+        else:
+            weights[order] = 1.0 / len(order)
+        self.weights = weights
+        self.selected_leads = [self.leads[i] for i in order if weights[i] > 0]
+
+        # 参考导联：优先选主波向上的导联（R 波即最高点）；当前参考导联的 SQI 不低于最佳的 80% 时不更换
+        upright = np.where(self.lead_direction > 0, self.sqi, 0.0)
+        candidates = upright if upright.max() > 0 else self.sqi
+        best = int(np.argmax(candidates))
+        if candidates[self.reference_lead] < 0.8 * candidates[best]:
+            self.reference_lead = best
+
+    def _fuse(self, x, filtered, mwi):
+        """按权重合成一路检测信号；各导联先按自身信号水平归一化，合成后 QRS 峰值约为 1"""
+        signal_level = np.maximum(self.lead_signal, 1e-12)
+        amplitude = self.weights * self.lead_polarity / np.sqrt(signal_level)
+        return x @ amplitude, filtered @ amplitude, mwi @ (self.weights / signal_level)
+
+    def _locate_r(self, index):
+        """先按合成的带通信号估计 QRS 位置，再在参考导联的原始信号上取主波方向的峰值"""
+        segment, seg_start = self._history_slice(self.history_filtered, index - self.window, index + 1)
+        if len(segment) == 0:
+            return index - self.filter_delay
+        estimate = seg_start + int(np.argmax(np.abs(segment))) - self.filter_delay
+
+        begin = max(estimate - self.search_radius - self.lead_history_start, 0)
+        end = max(estimate + self.search_radius + 1 - self.lead_history_start, 0)
+        segment = self.lead_history_x[begin:end, self.reference_lead]
+        if len(segment) == 0:
+            return estimate
+        deviation = (segment - np.median(segment)) * np.sign(self.lead_direction[self.reference_lead])
+        return self.lead_history_start + begin + int(np.argmax(deviation))
+
+    def _accept(self, index, slope):
+        count = len(self.peaks)
+        super()._accept(index, slope)
+        if len(self.peaks) > count:
+            self.confidences.append(self._update_leads(index))
+
+    def _update_leads(self, index):
+        """确认心拍后更新各导联统计量，返回该心拍的置信度"""
+        half = self.window // 2
+        filtered, mwi = self._lead_slice(index - self.window, index + half + 1)
+        if len(mwi) == 0:
+            return 0.0
+        peak = mwi.max(axis=0)
+
+        # 各导联对该心拍的支持程度：峰值相对本导联噪声/信号水平的位置
+        span = np.maximum(self.lead_signal - self.lead_noise, 1e-12)
+        support = np.clip((peak - self.lead_noise) / span, 0, 1)
+        total = self.sqi.sum()
+        confidence = float(support @ self.sqi / total) if total > 0 else 0.0
+
+        self.lead_signal = 0.125 * peak + 0.875 * self.lead_signal
+        self.lead_agreement = 0.125 * support + 0.875 * self.lead_agreement
+        if self.lead_last_beat is not None:
+            _, between = self._lead_slice(self.lead_last_beat + self.refractory, index - self.window)
+            if len(between):
+                self.lead_noise = 0.125 * np.median(between, axis=0) + 0.875 * self.lead_noise
+        polarity = np.sign(filtered[np.argmax(np.abs(filtered), axis=0), np.arange(filtered.shape[1])])
+        self.lead_polarity = np.where(polarity != 0, polarity, self.lead_polarity)
+        # 主波方向按原始信号中 QRS 两侧偏移的大小逐拍平滑更新
+        begin = max(index - self.window - self.filter_delay - self.lead_history_start, 0)
+        end = max(index + half + 1 - self.filter_delay - self.lead_history_start, 0)
+        raw = self.lead_history_x[begin:end]
+        if len(raw):
+            raw = raw - np.median(raw, axis=0)
+            direction = np.where(raw.max(axis=0) >= -raw.min(axis=0), 1.0, -1.0)
+            self.lead_direction = 0.125 * direction + 0.875 * self.lead_direction
+
+        self.lead_last_beat = index
+        self.lead_updated = self.lead_sample_index
+        self._update_weights()
+        return confidence
+
+
+def evaluate_detections(detected, reference, tolerance):
+    """按容差（样本数）把检出位置与标注配对，返回灵敏度、阳性预测值和定位误差
+
+    position_error 为配对心拍的 |检出 - 标注|（样本数）的最大值；
+    rr_error 为相邻两个心拍都配对上时，检出与标注 RR 间期之差（样本数）的均方根，
+    反映定位抖动对 RMSSD 等 HRV 指标的影响（只看灵敏度和 PPV 发现不了这类问题）。
+    """
+    detected = np.sort(np.asarray(detected, dtype=np.int64))
+    reference = np.sort(np.asarray(reference, dtype=np.int64))
+    matched = np.zeros(len(detected), dtype=bool)
+    pairs = np.full(len(reference), -1, dtype=np.int64)  # 每个标注配对的检出位置
+    true_positive = 0
+    for k, r in enumerate(reference):
+        lo = np.searchsorted(detected, r - tolerance, side='left')
+        hi = np.searchsorted(detected, r + tolerance, side='right')
+        candidates = [i for i in range(lo, hi) if not matched[i]]
+        if candidates:
+            best = min(candidates, key=lambda i: abs(detected[i] - r))
+            matched[best] = True
+            pairs[k] = detected[best]
+            true_positive += 1
+
+    paired = pairs >= 0
+    errors = pairs[paired] - reference[paired]
+    both = paired[1:] & paired[:-1]
+    rr_errors = np.diff(pairs)[both] - np.diff(reference)[both]
+
+    false_negative = len(reference) - true_positive
+    false_positive = len(detected) - true_positive
+    return {
+        'true_positive': true_positive,
+        'false_positive': false_positive,
+        'false_negative': false_negative,
+        'sensitivity': true_positive / len(reference) if len(reference) else None,
+        'ppv': true_positive / len(detected) if len(detected) else None,
+        'position_error': int(np.abs(errors).max()) if len(errors) else None,
+        'rr_error': float(np.sqrt(np.mean(rr_errors ** 2))) if len(rr_errors) else None
+    }
@@ -0,0 +1,66 @@
+import time
+from PyQt5.QtCore import QSettings
+
+
+class RenderSettings:
+    """绘图性能设置，通过 QSettings 持久化"""
+
+    DEFAULTS = {
+        'target_fps': 50,  # 目标帧率
+        'adaptive_fps': True,  # 根据绘制耗时自动降低帧率
+        'antialias': True,  # 抗锯齿
+        'clip_to_view': False,  # 只处理可见范围内的数据
+        'auto_downsample': False,  # 数据点多于像素时自动降采样
+        'skip_finite_check': False,  # 跳过 NaN/Inf 检查（扫描模式下无效）
+        'use_opengl': False  # 使用 OpenGL 绘制
+    }
+
+    def __init__(self, organization='python_serial', application='ECGMonitor'):
+        self.settings = QSettings(organization, application)
+        for key, default in self.DEFAULTS.items():
+            setattr(self, key, self.settings.value(f'render/{key}', default, type=type(default)))
+
+    def save(self):
+        """保存设置"""
+        for key in self.DEFAULTS:
+            self.settings.setValue(f'render/{key}', getattr(self, key))
+        self.settings.sync()
+
+
+class FrameRateGovernor:
+    """帧率调节器：根据实测的每帧绘制耗时调整刷新间隔
+
+    绘制耗时控制在刷新间隔的 load_factor 以内，剩余时间留给事件处理，
+    机器性能不足时自动降低帧率，但不低于 min_fps。
+    """
+
+    def __init__(self, target_fps=50, min_fps=5, load_factor=0.5, smoothing=0.2):
+        self.target_fps = target_fps
+        self.min_fps = min_fps
+        self.load_factor = load_factor
+        self.smoothing = smoothing  # 指数平均系数
+        self.adaptive = True
+        self.reset()
+
+    def reset(self):
+        """清空统计"""
+        self.paint_time = 0.0  # 平均每帧绘制耗时（秒）
+        self.fps = 0.0  # 实测帧率
+        self.last_frame_time = None
+
+    def record_frame(self, paint_time):
+        """记录一帧的绘制耗时（秒）"""
+        now = time.perf_counter()
+        if self.last_frame_time is not None and now > self.last_frame_time:
+            fps = 1.0 / (now - self.last_frame_time)
+            self.fps += self.smoothing * (fps - self.fps)
+        self.last_frame_time = now
+        self.paint_time += self.smoothing * (paint_time - self.paint_time)
+
+    def interval_ms(self):
+        """下一帧的刷新间隔（毫秒）"""
+        target = 1000.0 / self.target_fps
+        if not self.adaptive:
+            return int(round(target))
+        needed = self.paint_time * 1000.0 / self.load_factor
+        return int(round(min(max(target, needed), 1000.0 / self.min_fps)))
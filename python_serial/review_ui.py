@@ -0,0 +1,190 @@
+from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QCheckBox, QPushButton
+from PyQt5.QtCore import Qt, QTimer
+import numpy as np
+import pyqtgraph as pg
+
+
+class HistoryReviewWidget(QWidget):
+    """历史回看：十二导联共用时间轴，可拖动平移、滚轮缩放，从 10 秒一直看到整个会话
+
+    每次视图范围变化时按绘图区的像素宽度向 HistoryStore 取对应细节层次的数据，
+    绘制的点数只与窗口宽度有关，与查看的时长无关。勾选“跟随最新”时视图随新数据向右滚动。
+    设置了报警事件日志时可跳转到上一个/下一个报警，并显示视图范围内的报警次数（均为日志上的二分查找）。
+    """
+
+    SPANS = [("10 秒", 10), ("1 分钟", 60), ("10 分钟", 600), ("1 小时", 3600), ("12 小时", 43200), ("全部", None)]
+
+    def __init__(self, lead_names, parent=None):
+        super().__init__(parent)
+        self.store = None
+        self.events = None  # 报警事件日志（EventLog）
+        self.current_event = None  # 最近一次跳转到的报警，继续跳转时以它为起点
+        self.lead_names = lead_names
+        self.updating_range = False  # 程序设置视图范围时为 True，与用户拖动区分
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+        toolbar = QHBoxLayout()
+        toolbar.addWidget(QLabel("时间范围:"))
+        self.span_combo = QComboBox()
+        for text, seconds in self.SPANS:
+            self.span_combo.addItem(text, seconds)
+        self.span_combo.currentIndexChanged.connect(self.apply_span)
+        toolbar.addWidget(self.span_combo)
+        self.follow_checkbox = QCheckBox("跟随最新")
+        self.follow_checkbox.setStyleSheet("color: #ffffff;")
+        self.follow_checkbox.setChecked(True)
+        self.follow_checkbox.toggled.connect(self.apply_span)
+        toolbar.addWidget(self.follow_checkbox)
+        self.previous_event_button = QPushButton("◀ 上一报警")
+        self.previous_event_button.clicked.connect(lambda: self.jump_to_event(forward=False))
+        toolbar.addWidget(self.previous_event_button)
+        self.next_event_button = QPushButton("下一报警 ▶")
+        self.next_event_button.clicked.connect(lambda: self.jump_to_event(forward=True))
+        toolbar.addWidget(self.next_event_button)
+        self.info_label = QLabel("")
+        toolbar.addStretch()
+        toolbar.addWidget(self.info_label)
+        layout.addLayout(toolbar)
+
+        self.plot_widget = pg.GraphicsLayoutWidget()
+        self.plot_widget.setBackground('#1e1e1e')
+        layout.addWidget(self.plot_widget)
+
+        self.plots = []
+        self.curves = []
+        self.event_lines = []  # 各导联上标出当前报警起点的竖线
+        for i, lead in enumerate(lead_names):
+            axis = pg.DateAxisItem(orientation='bottom')
+            plot = self.plot_widget.addPlot(row=i, col=0, axisItems={'bottom': axis})
+            plot.setLabel('left', lead, color='#ffffff')
+            plot.setYRange(-1.5, 1.5, padding=0)
+            plot.setMouseEnabled(x=True, y=False)
+            plot.setMenuEnabled(False)
+            plot.hideButtons()
+            plot.getAxis('left').setWidth(40)
+            if i < len(lead_names) - 1:
+                plot.getAxis('bottom').setStyle(showValues=False)
+            if self.plots:
+                plot.setXLink(self.plots[0])
+            curve = plot.plot(pen=pg.mkPen('#00ff00', width=1))
+            curve.setSkipFiniteCheck(True)
+            line = pg.InfiniteLine(angle=90, pen=pg.mkPen('#ff4444', width=1, style=Qt.DashLine))
+            line.setVisible(False)
+            plot.addItem(line)
+            self.event_lines.append(line)
+            self.plots.append(plot)
+            self.curves.append(curve)
+        self.plots[0].sigXRangeChanged.connect(self.on_range_changed)
+
+        # 拖动和缩放时视图范围连续变化，合并后再取数据
+        self.redraw_timer = QTimer(self)
+        self.redraw_timer.setSingleShot(True)
+        self.redraw_timer.timeout.connect(self.redraw)
+        self.follow_timer = QTimer(self)
+        self.follow_timer.timeout.connect(self.follow_latest)
+
+    def set_store(self, store, events=None):
+        """设置要回看的 HistoryStore（None 表示没有数据）和同一会话的报警事件日志"""
+        self.store = store
+        self.events = events
+        self.current_event = None
+        for curve in self.curves:
+            curve.setData([], [])
+        for line in self.event_lines:
+            line.setVisible(False)
+        self.apply_span()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.follow_timer.start(1000)
+        self.apply_span()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.follow_timer.stop()
+
+    def _set_range(self, start, stop):
+        self.updating_range = True
+        self.plots[0].setXRange(start, stop, padding=0)
+        self.updating_range = False
+        self.redraw_timer.start(0)
+
+    def apply_span(self):
+        """按选择的时间范围显示最新的一段"""
+        store = self.store
+        if store is None:
+            return
+        end = store.start_time + store.duration()
+        seconds = self.span_combo.currentData()
+        if seconds is None:
+            start = store.start_time
+        else:
+            start = end - seconds
+        self._set_range(start, max(end, start + 1.0))
+
+    def follow_latest(self):
+        if self.follow_checkbox.isChecked():
+            self.apply_span()
+        else:
+            self.redraw()
+
+    def on_range_changed(self):
+        if not self.updating_range and self.follow_checkbox.isChecked():
+            # 用户拖动或缩放后停止跟随
+            self.follow_checkbox.blockSignals(True)
+            self.follow_checkbox.setChecked(False)
+            self.follow_checkbox.blockSignals(False)
+        if not self.updating_range:
+            self.current_event = None
+        self.redraw_timer.start(30)
+
+    def jump_to_event(self, forward=True):
+        """把视图移到上一个/下一个报警，报警起点位于视图左侧四分之一处，时间跨度不变"""
+        store, events = self.store, self.events
+        if store is None or events is None:
+            return
+        x_min, x_max = self.plots[0].viewRange()[0]
+        if self.current_event is not None:
+            reference = self.current_event['sample']
+        else:
+            reference = store.start_sample + ((x_min + x_max) / 2 - store.start_time) * store.fs
+        if forward:
+            event = events.next_alarm(reference)
+        else:
+            event = events.previous_alarm(reference)
+        if event is None:
+            return
+        self.follow_checkbox.blockSignals(True)
+        self.follow_checkbox.setChecked(False)
+        self.follow_checkbox.blockSignals(False)
+        onset = store.start_time + (event['onset'] - store.start_sample) / store.fs
+        width = x_max - x_min
+        self._set_range(onset - width / 4, onset + width * 3 / 4)
+        self.current_event = event
+        for line in self.event_lines:
+            line.setPos(onset)
+            line.setVisible(True)
+
+    def redraw(self):
+        """按当前视图范围和像素宽度取数据并绘制"""
+        store = self.store
+        if store is None or not self.isVisible():
+            return
+        x_min, x_max = self.plots[0].viewRange()[0]
+        fs = store.fs
+        start = (x_min - store.start_time) * fs
+        stop = (x_max - store.start_time) * fs
+        width = max(int(self.plots[0].getViewBox().width()), 100)
+        x, y, level = store.query(start, stop, max_points=width)
+        times = store.start_time + x / fs
+        for channel, curve in enumerate(self.curves):
+            curve.setData(times, y[channel] if len(x) else np.zeros(0))
+        span = (x_max - x_min)
+        text = (f"已保存 {store.duration() / 60:.1f} 分钟  视图 {span:.0f} 秒  "
+                f"层级 {level}（分辨率 {store.bucket_size(level) / fs * 1000:.0f} ms）")
+        if self.events is not None:
+            text += f"  报警 {self.events.count(store.start_sample + start, store.start_sample + stop)} 次"
+            if self.current_event is not None:
+                text += f"（当前: {self.current_event['label']}）"
+        self.info_label.setText(text)
@@ -0,0 +1,87 @@
+import numpy as np
+
+
+class SampleRingBuffer:
+    """预分配的多通道环形缓冲区
+
+    单生产者/单消费者使用，无需加锁：生产者先写数据再推进写游标，
+    消费者读取后再次检查写游标，被覆盖的部分计入丢弃样本数。
+    """
+
+    def __init__(self, n_channels=12, capacity=4096, dtype=np.float64):
+        self.n_channels = n_channels
+        self.capacity = capacity
+        self.data = np.zeros((n_channels, capacity), dtype=dtype)
+
+        self.write_count = 0  # 写游标：累计写入的样本数
+        self.read_count = 0  # 读游标：消费者已取走的样本数
+        self.dropped_samples = 0  # 未被读取就被覆盖的样本数
+
+    def write(self, block):
+        """写入一批样本，block 形状为 (n_samples, n_channels)"""
+        block = np.asarray(block)
+        n = len(block)
+        if n == 0:
+            return
+
+        # 单次写入超过容量时只保留最新的部分
+        if n > self.capacity:
+            block = block[-self.capacity:]
+            self.write_count += n - self.capacity
+            n = self.capacity
+
+        start = self.write_count % self.capacity
+        first = min(n, self.capacity - start)
+        self.data[:, start:start + first] = block[:first].T
+        if first < n:
+            self.data[:, :n - first] = block[first:].T
+
+        # 数据写完后再推进游标，读者只会看到完整的样本
+        self.write_count += n
+
+    def pending(self):
+        """尚未被消费者读取的样本数（队列深度）"""
+        return min(self.write_count - self.read_count, self.capacity)
+
+    def _copy_range(self, start, end):
+        """拷贝 [start, end) 区间的样本，返回 (n_channels, n)"""
+        i = start % self.capacity
+        j = end % self.capacity
+        if end - start == 0:
+            return self.data[:, :0].copy()
+        if i < j:
+            return self.data[:, i:j].copy()
+        return np.concatenate((self.data[:, i:], self.data[:, :j]), axis=1)
+
+    def read_new(self):
+        """读取自上次调用以来的新样本，返回 (n_samples, n_channels)"""
+        end = self.write_count
+        start = self.read_count
+
+        if end - start > self.capacity:
+            self.dropped_samples += end - start - self.capacity
+            start = end - self.capacity
+
+        snapshot = self._copy_range(start, end)
+
+        # 拷贝期间生产者可能已经覆盖了最旧的部分，丢掉这些样本
+        overrun = self.write_count - self.capacity - start
+        if overrun > 0:
+            self.dropped_samples += overrun
+            snapshot = snapshot[:, overrun:]
+
+        self.read_count = end
+        return snapshot.T
+
+    def latest(self, n):
+        """获取最新的 n 个样本（不移动读游标），返回 (n_channels, n)"""
+        end = self.write_count
+        n = min(n, self.capacity, end)
+        return self._copy_range(end - n, end)
+
+    def clear(self):
+        """清空缓冲区和计数器"""
+        self.data.fill(0)
+        self.write_count = 0
+        self.read_count = 0
+        self.dropped_samples = 0
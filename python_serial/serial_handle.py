@@ -1,258 +1,446 @@
-import serial
-import numpy as np
-from scipy import stats
-import pywt
+import os
+import time
+import tempfile
+import threading
 from collections import deque
+import numpy as np
+from ring_buffer import SampleRingBuffer
+from frame_parser import FrameParser, LEAD_MODES, derive_leads
+from recorder import ECGRecorder
+from baseline import create_baseline_filter
+from dsp_backend import DSPPipeline, create_backend
+from hrv import HRVEngine, HRVAnalysisWorker
+from sources import open_source
+from instrumentation import Metrics
+from history import HistoryStore
+from beat_template import BeatTemplateEngine
+from alarms import AlarmEngine
 
 class SerialHandler:
-    def __init__(self, port='COM3', baudrate=115200):
+    def __init__(self, port='COM3', baudrate=115200, frame_format='ascii', source=None, speed=1.0, fs=250,
+                 dsp_backend='inprocess', baseline_method='highpass', history_dir=None, leads=12,
+                 alarm_rules=None):
+        # 后台采集线程相关参数
+        self.sample_ring = None  # 采集线程与界面之间的环形缓冲区
+        self.acquisition_thread = None
+        self.stop_event = threading.Event()
+        # 采集线程未能及时退出时，close() 把资源释放交给线程退出时完成
+        self.close_lock = threading.Lock()
+        self.acquisition_running = False
+        self.close_pending = False
+        self.poll_interval = 0.01  # 两次读取串口之间的间隔（秒），让每次处理攒成一批，降低多设备时的CPU占用
+        self.recorder = None  # 数据录制器
+        # 整个会话的处理后波形及其 min/max 金字塔，供回看界面使用；保存在 history_dir 下的 memmap 文件中，
+        # 未指定时使用临时目录并在关闭时删除
+        self.history_dir = history_dir
+        self.history = None
+        self.beat_templates = None  # 各导联的中值心拍模板
+        self.alarms = None  # 心率、停搏、导联脱落和 HRV 报警及事件日志
+        # 数据输出端（录制器、流服务器等），接口与 ECGRecorder 的 write_* 方法相同；
+        # 增删时整体替换元组，采集线程无需加锁
+        self.sinks = ()
+        self.hrv = HRVEngine()  # RR间期（毫秒）及其增量HRV统计
+        self.hrv_analysis = HRVAnalysisWorker(self.hrv)  # 后台计算频域和非线性HRV指标
+        self.dsp = None  # 去噪和R波检测的后端：进程内的 DSPPipeline 或 ProcessDSPBackend
+        # 各处理阶段的耗时和计数统计，默认关闭（界面叠加层或 --metrics-log 打开）
+        self.metrics = Metrics()
+        self.arrivals = deque()  # (该批读取后的累计帧数, 读到字节的时刻)，用于计算端到端延迟
+        self.latest_arrival = None  # 最新写入环形缓冲区的样本对应的字节到达时刻（perf_counter）
+        # 设备发送的导联数：12 为全部导联，8 为 I、II、V1~V6（其余四个肢体导联解析后导出），
+        # 解析之后的处理流程始终是十二导联
+        self.leads = leads
+        # 初始化失败时保持以下默认值，界面叠加层和性能日志仍可调用 get_stats()、close()
+        self.serial_port = None
+        self.parser = None
+        self.fs = fs
+        self.sample_period = 1000 / fs
+        self.sample_count = 0
+        self.last_r_peak_sample = None
+        self.last_beat_confidence = 0.0
+
         try:
-            self.serial_port = serial.Serial(
-                port=port,
-                baudrate=baudrate,
-                bytesize=serial.EIGHTBITS,
-                parity=serial.PARITY_NONE,
-                stopbits=serial.STOPBITS_ONE,
-                timeout=0.1
-            )
+            # 数据源：串口、文件回放或模拟信号，接口与 serial.Serial 相同
+            if leads not in LEAD_MODES:
+                raise ValueError(f"不支持的导联数: {leads}")
+            if source is None:
+                source = open_source(port, baudrate, frame_format=frame_format, speed=speed, fs=fs, leads=leads)
+            self.serial_port = source
             print(f"串口初始化成功")
-            self.buffer = ""
+            # 回放录制目录时采样率以录制时为准，滤波器、QRS 检测和 HRV 都按数据源的采样率建立
+            source_fs = getattr(source, 'fs', fs)
+            if source_fs != fs:
+                print(f"数据源采样率为 {source_fs} Hz，替代设定的 {fs} Hz")
+                fs = source_fs
+            self.parser = FrameParser(n_channels=leads, frame_format=frame_format)  # 帧解析器
 
             # 初始化参数
-            self.warmup_samples = 100
-            self.is_warmed_up = False
-            self.warmup_buffer = [[] for _ in range(12)]
-            self.baselines = [0] * 12
+            # 连续跟踪基线：'highpass' 为无延迟的高通滤波，'median' 为两级中值滤波（约 0.4 秒延迟）
+            self.baseline_method = baseline_method
+            self.baseline_filter = create_baseline_filter(baseline_method, fs=fs, n_channels=12)
             self.scaling_factor = 10000
 
             # 小波变换参数
             self.wavelet_type = 'db4'  # 德拜小波
             self.wavelet_level = 3  # 分解层数
-            self.signal_buffers = [deque(maxlen=64) for _ in range(12)]  # 存储信号用于小波变换
+            self.wavelet_window = 64  # 小波变换窗口长度
+            self.denoise_hop = 16  # 每累积多少个新样本做一次变换（1 为逐点处理，越大越省CPU、延迟越高）
 
             # 采样率相关参数
-            self.fs = 250  # 采样频率 Hz
+            self.fs = fs  # 采样频率 Hz
             self.sample_period = 1000 / self.fs  # 采样周期（毫秒）
             self.sample_count = 0  # 采样点计数器
 
             # R波检测相关参数
-            self.data_buffer = deque(maxlen=3)  # ECG数据缓冲区
-            self.threshold = 0.4  # R波检测阈值
+            # 十二导联融合检测，自带带通滤波，直接处理归一化后的数据
+            self.pipeline = DSPPipeline(fs=self.fs, n_channels=12, wavelet=self.wavelet_type,
+                                        level=self.wavelet_level, window=self.wavelet_window,
+                                        hop=self.denoise_hop)
+            self.pipeline.metrics = self.metrics
+            self.denoiser = self.pipeline.denoiser
+            self.qrs_detector = self.pipeline.qrs_detector
             self.last_r_peak_sample = None  # 上一个R波峰值的采样点编号
-            self.rr_intervals = []  # 存储RR间期（单位：毫秒）
+            self.last_beat_confidence = 0.0  # 最近一个心拍的置信度
+
+            # 'inprocess' 在采集线程中直接处理，'process' 交给子进程（经共享内存传递数据）
+            self.dsp = create_backend(dsp_backend, self.pipeline)
+
+            # 每个 R 波附近的去噪波形对齐后逐拍更新各导联的中值模板
+            self.beat_templates = BeatTemplateEngine(fs=self.fs, n_channels=12)
+            self.add_sink(self.beat_templates)
+
+            # 每批数据评估一次报警规则（alarm_rules 为规则参数字典列表，None 时使用默认规则），报警和解除写入事件日志
+            self.alarms = AlarmEngine(fs=self.fs, rules=alarm_rules, quality=self.get_signal_quality)
+            self.add_sink(self.alarms)
 
         except Exception as e:
             print(f"串口初始化失败: {e}")
+            # 关闭已经打开的数据源和已启动的 DSP 子进程
+            self._release_resources()
             self.serial_port = None
 
     def wavelet_denoise(self, data):
         """使用小波变换进行去噪"""
-        try:
-            # 进行小波分解
-            coeffs = pywt.wavedec(data, self.wavelet_type, level=self.wavelet_level)
-
-            # 计算阈值
-            threshold = np.median(np.abs(coeffs[-1])) * 1.4826 * np.sqrt(2 * np.log(len(data)))
-
-            def safe_threshold(c, threshold):
-                with np.errstate(divide='ignore', invalid='ignore'):
-                    thresholded = pywt.threshold(c, threshold, mode='soft')
-
-                return np.nan_to_num(thresholded, nan=0.0, posinf=0.0, neginf=0.0)
-
-            coeffs_thresholded = [safe_threshold(c, threshold) for c in coeffs]
-
-            # 重构信号
-            denoised = pywt.waverec(coeffs_thresholded, self.wavelet_type)
-
-            # 确保输出长度与输入相同并处理可能的 nan 值
-            result = denoised[:len(data)]
-            result = np.nan_to_num(result, nan=0.0, posinf=0.0, neginf=0.0)
-
-            # 添加新的滤除条件：将大于0.9或小于-1的点置0
-            result[result > 0.7] = 0
-            result[result < -0.7] = 0
+        from wavelet_stream import wavelet_denoise
 
-            return result
+        try:
+            return wavelet_denoise(data, self.wavelet_type, self.wavelet_level)
 
         except Exception as e:
             print(f"小波去噪错误: {e}")
             return np.zeros_like(data)
 
-    def process_value(self, value):
-        """保留符号并只取后四位数据"""
-        sign = 1 if value >= 0 else -1
-        abs_value = abs(value)
-        return sign * (abs_value % 100000)
-
-    def normalize_value(self, value, channel_index):
-        """基于基线的归一化，并应用小波去噪"""
+    def normalize_frames(self, frames):
+        """去除基线漂移后归一化，frames 形状为 (n, 12)
+
+        基线滤波器从第一帧起就开始输出，不丢弃数据；中值法的输出比输入晚 latency() 个样本，
+        但样本编号与原始帧一致。
+        """
+        normalized = self.baseline_filter.process(frames) / self.scaling_factor
+        return np.clip(normalized, -1, 1)
+
+    def handle_r_peaks(self, peaks, confidences):
+        """根据检出的R波更新RR间期和HRV，并交给各数据输出端"""
+        sinks = self.sinks
+        for current_sample, confidence in zip(peaks.tolist(), confidences):
+            if self.last_r_peak_sample is not None:
+                # 计算RR间期（毫秒）
+                rr_interval = (current_sample - self.last_r_peak_sample) * self.sample_period
+                self.update_rr_intervals(rr_interval, current_sample * self.sample_period)
+            self.last_r_peak_sample = current_sample
+            self.last_beat_confidence = confidence
+
+            if sinks:
+                hrv_data = dict(self.get_hrv_data())
+                hrv_data['confidence'] = confidence
+                for sink in sinks:
+                    sink.write_r_peak(current_sample)
+                    sink.write_hrv(current_sample, hrv_data)
+
+    def update_rr_intervals(self, new_rr_interval, time_ms=None):
+        """新增一个RR间期（毫秒），增量更新HRV统计"""
         try:
-            if not self.is_warmed_up:
-                self.warmup_buffer[channel_index].append(value)
-                if len(self.warmup_buffer[channel_index]) >= self.warmup_samples:
-                    self.baselines[channel_index] = np.mean(self.warmup_buffer[channel_index])
-
-                    if all(len(buffer) >= self.warmup_samples for buffer in self.warmup_buffer):
-                        self.is_warmed_up = True
-                        print("预热完成，开始正常数据采集")
-                return 0
-
-            normalized = (value - self.baselines[channel_index]) / self.scaling_factor
-            normalized = max(min(normalized, 1), -1)
-
-            # 将归一化后的值添加到缓冲区
-            self.signal_buffers[channel_index].append(normalized)
-
-            # 当收集够足够的数据点时进行小波去噪
-            if len(self.signal_buffers[channel_index]) == self.signal_buffers[channel_index].maxlen:
-                signal_array = np.array(self.signal_buffers[channel_index])
-                denoised_signal = self.wavelet_denoise(signal_array)
-                result = denoised_signal[-1]  # 获取最新的去噪后的值
-
-                # 对去噪后的信号也进行检查
-                if abs(result) == 1:
-                    result = 0
-
-                # 对ECG导联的数据进行R波检测
-                if channel_index == 0:
-                    self.detect_r_peak(result)
-
-                return result
-
-            return normalized
-
+            self.hrv.add(new_rr_interval, time_ms)
         except Exception as e:
-            print(f"归一化错误: {e}")
-            return 0
-
-    def detect_r_peak(self, value):
-        """使用采样点计数的R波检测算法"""
-        try:
-            self.data_buffer.append((self.sample_count, value))
-
-            if len(self.data_buffer) < 3:
-                return
-
-            # 检查中间点是否是局部最大值且超过阈值
-            _, prev_val = self.data_buffer[-3]
-            current_sample, current_val = self.data_buffer[-2]
-            _, next_val = self.data_buffer[-1]
-
-            if (current_val > prev_val and
-                    current_val > next_val and
-                    current_val > self.threshold):
-
-                if self.last_r_peak_sample is None:
-                    self.last_r_peak_sample = current_sample
-                else:
-                    # 计算RR间期（毫秒）
-                    samples_between = current_sample - self.last_r_peak_sample
-                    rr_interval = samples_between * self.sample_period
-
-                    # 更新RR间期
-                    self.update_rr_intervals(rr_interval)
-                    self.last_r_peak_sample = current_sample
-
-        except Exception as e:
-            print(f"R波检测错误: {e}")
-
-    def update_rr_intervals(self, new_rr_interval):
-        """更新RR间期列表"""
-        self.rr_intervals.append(new_rr_interval)
-        # 保持列表长度在一个合理范围内
-        if len(self.rr_intervals) > 100:  # 保留最近100个RR间期
-            self.rr_intervals.pop(0)
+            print(f"计算HRV指标时出错: {str(e)}")
 
     def get_hrv_data(self):
-        """获取HRV相关数据"""
-        try:
-            if len(self.rr_intervals) < 2:
-                return {
-                    'heart_rate': 0,
-                    'SDNN': 0,
-                    'RMSSD': 0,
-                    'pNN50': 0
-                }
-
-            # 计算心率 (bpm)
-            current_hr = (30000*6/7) / self.rr_intervals[-1] if self.rr_intervals else 0
-
-            # 使用最近的N个RR间期进行HRV分析
-            n_intervals = min(len(self.rr_intervals), 10)
-            recent_rr = np.array(self.rr_intervals[-n_intervals:])
-
-            # 计算SDNN
-            sdnn = np.std(recent_rr) if len(recent_rr) > 1 else 0
-
-            # 计算RMSSD
-            rr_diff = np.diff(recent_rr)
-            rmssd = np.sqrt(np.mean(rr_diff ** 2)) if len(rr_diff) > 0 else 0
-
-            # 计算pNN50
-            nn50 = np.sum(np.abs(rr_diff) > 50)
-            pnn50 = (nn50 / len(rr_diff) * 100) if len(rr_diff) > 0 else 0
-
-            return {
-                'heart_rate': current_hr,
-                'SDNN': sdnn,
-                'RMSSD': rmssd,
-                'pNN50': pnn50
-            }
-        except Exception as e:
-            print(f"计算HRV指标时出错: {str(e)}")
-            return {
-                'heart_rate': 0,
-                'SDNN': 0,
-                'RMSSD': 0,
-                'pNN50': 0
-            }
+        """获取HRV相关数据（最近一次心拍后的快照，不重复计算）"""
+        return self.hrv.snapshot
+
+    def hrv_version(self):
+        """HRV数据版本号，数值变化时加一"""
+        return self.hrv.version
+
+    def get_hrv_analysis(self):
+        """获取后台分析线程最近一次的 LF/HF、SD1/SD2、样本熵结果"""
+        return self.hrv_analysis.results
+
+    def hrv_analysis_version(self):
+        """后台分析结果的版本号"""
+        return self.hrv_analysis.version
+
+    def get_signal_quality(self):
+        """各导联的信号质量评估（质量分、脱落、饱和比例、高频噪声、基线漂移）"""
+        if self.dsp is None:
+            return {'version': 0}
+        return self.dsp.signal_quality()
+
+    def get_beat_templates(self):
+        """各导联的中值心拍模板和统计，见 BeatTemplateEngine.summary()"""
+        if self.beat_templates is None:
+            return {'version': 0}
+        return self.beat_templates.summary()
+
+    def beat_templates_version(self):
+        """心拍模板版本号，每接受一个心拍加一"""
+        return self.beat_templates.version if self.beat_templates is not None else 0
+
+    def get_alarms(self):
+        """正在报警的项目、最近的事件和各规则的报警次数，见 AlarmEngine.summary()"""
+        if self.alarms is None:
+            return {'version': 0}
+        return self.alarms.summary()
+
+    def alarms_version(self):
+        """报警状态版本号，有报警或解除时加一"""
+        return self.alarms.version if self.alarms is not None else 0
 
     def read_data(self):
+        """批量读取串口数据，返回本次收到的所有完整帧，形状为 (n_frames, 12)"""
         if not self.serial_port:
             return None
 
+        metrics = self.metrics
         try:
-            while self.serial_port.in_waiting:
-                self.buffer += self.serial_port.read().decode('ascii')
-
-            if '\n' in self.buffer:
-                line, self.buffer = self.buffer.split('\n', 1)
-                line = line.strip()
-
-                if not line:
-                    return None
-
-                str_values = [val.strip() for val in line.split(';') if val.strip()]
-
-                if len(str_values) != 12:
-                    return None
-
-                try:
-                    values = [int(val) for val in str_values]
-                    processed_values = [self.process_value(val) for val in values]
-                    normalized_values = [self.normalize_value(val, i) for i, val in enumerate(processed_values)]
-
-                    if not self.is_warmed_up:
-                        return None
-
-                    # 增加采样点计数
-                    self.sample_count += 1
-                    return normalized_values
-
-                except ValueError:
-                    print("数据转换错误")
-                    return None
+            # 一次性读出串口中等待的全部字节
+            with metrics.timer('read'):
+                waiting = self.serial_port.in_waiting
+                data = self.serial_port.read(waiting) if waiting else b''
+            if not data:
+                return None
+            metrics.count('bytes_received', len(data))
+
+            # 解析出所有完整帧，不完整的部分留在解析器缓冲区中
+            with metrics.timer('parse'):
+                frames = self.parser.feed(data)
+            if len(frames) == 0:
+                return None
+            if self.leads == 8:
+                # 由 I、II 导出 III、aVR、aVL、aVF，之后与十二导联设备完全相同
+                with metrics.timer('derive'):
+                    frames = derive_leads(frames)
+            metrics.count('frames_received', len(frames))
+            if metrics.enabled:
+                self.arrivals.append((self.parser.frames_parsed, time.perf_counter()))
+
+            sinks = self.sinks
+            with metrics.timer('sinks'):
+                for sink in sinks:
+                    sink.write_raw(frames)
+
+            with metrics.timer('baseline'):
+                normalized = self.normalize_frames(frames)
+            if len(normalized) == 0:
+                return None
+
+            # 多导联融合R波检测和小波去噪，由当前的 DSP 后端完成
+            with metrics.timer('dsp'):
+                denoised, peaks, confidences = self.dsp.process(normalized)
+            with metrics.timer('hrv'):
+                self.handle_r_peaks(peaks, confidences)
+            self.sample_count += len(denoised)
+            if len(denoised) == 0:
+                return None
+            if metrics.enabled:
+                self.latest_arrival = self._arrival_time(self.sample_count - 1)
+
+            with metrics.timer('sinks'):
+                for sink in sinks:
+                    sink.write_processed(denoised)
+
+            return denoised
 
         except Exception as e:
+            metrics.count('read_errors')
             print(f"数据读取错误: {e}")
-            self.buffer = ""
+            self.parser.buffer.clear()
             return None
 
+    def _arrival_time(self, sample_index):
+        """第 sample_index 个样本所在那批字节被读到的时刻；去噪和中值基线只延迟输出，样本编号与帧编号一致"""
+        arrivals = self.arrivals
+        while len(arrivals) > 1 and arrivals[0][0] <= sample_index:
+            arrivals.popleft()
+        if arrivals and arrivals[0][0] > sample_index:
+            return arrivals[0][1]
         return None
 
+    def set_metrics_enabled(self, enabled):
+        """打开或关闭性能统计（可在其他线程调用；arrivals 只由采集线程修改，旧记录在下次查询时自然移除）"""
+        self.metrics.enabled = enabled
+        if not enabled:
+            self.latest_arrival = None
+
+    def start_acquisition_thread(self, ring_capacity=None):
+        """启动后台采集线程，读取、解析和归一化都在该线程中完成"""
+        if not self.serial_port or self.acquisition_thread is not None:
+            return
+
+        if ring_capacity is None:
+            ring_capacity = self.fs * 10  # 默认缓存10秒数据
+        self.sample_ring = SampleRingBuffer(n_channels=12, capacity=ring_capacity)
+        if self.history is None:
+            self.open_history()
+
+        self.stop_event.clear()
+        self.acquisition_running = True
+        self.acquisition_thread = threading.Thread(
+            target=self._acquisition_loop, name='ecg-acquisition', daemon=True)
+        self.acquisition_thread.start()
+        self.hrv_analysis.start()
+
+    def stop_acquisition_thread(self, timeout=1.0):
+        """停止后台采集线程，返回线程是否已退出
+
+        read_data 卡住（如串口读取阻塞）时线程可能在超时后仍在运行，此时保留线程引用，
+        避免再启动第二个采集线程，调用方也不能释放线程还在使用的资源。
+        """
+        self.hrv_analysis.stop()
+        thread = self.acquisition_thread
+        if thread is None:
+            return True
+        self.stop_event.set()
+        thread.join(timeout=timeout)
+        if thread.is_alive():
+            print("采集线程未能及时退出")
+            return False
+        self.acquisition_thread = None
+        return True
+
+    def _acquisition_loop(self):
+        """采集线程主循环"""
+        try:
+            while not self.stop_event.is_set():
+                start = time.perf_counter()
+                data = self.read_data()
+                if data is not None:
+                    self.sample_ring.write(data)
+                # 处理耗时超过轮询间隔时（数据积压）立即读下一批
+                self.stop_event.wait(max(self.poll_interval - (time.perf_counter() - start), 0))
+        finally:
+            with self.close_lock:
+                self.acquisition_running = False
+                release = self.close_pending
+                self.close_pending = False
+            if release:
+                self.acquisition_thread = None
+                self._release_resources()
+
+    def read_samples(self):
+        """界面线程调用：取出采集线程写入的新样本，返回 (n_samples, 12)"""
+        if self.sample_ring is None:
+            return None
+        data = self.sample_ring.read_new()
+        if len(data) == 0:
+            return None
+        return data
+
+    def open_history(self):
+        """创建会话历史存储并开始接收处理后的波形"""
+        try:
+            if self.history_dir:
+                directory = os.path.join(self.history_dir, time.strftime('%Y%m%d_%H%M%S'))
+                delete_on_close = False
+            else:
+                directory = tempfile.mkdtemp(prefix='ecg_history_')
+                delete_on_close = True
+            self.history = HistoryStore(n_channels=12, fs=self.fs, directory=directory,
+                                        delete_on_close=delete_on_close, start_sample=self.sample_count)
+            self.add_sink(self.history)
+        except Exception as e:
+            print(f"创建历史存储错误: {e}")
+            self.history = None
+
+    def close_history(self):
+        history, self.history = self.history, None
+        if history:
+            self.remove_sink(history)
+            history.close()
+
+    def close_alarms(self):
+        """停止报警评估，关闭事件日志（写入文件时把最后的事件刷到磁盘）"""
+        alarms, self.alarms = self.alarms, None
+        if alarms:
+            self.remove_sink(alarms)
+            alarms.close()
+
+    def start_recording(self, directory, **kwargs):
+        """开始把原始帧、处理后的帧、R波位置和HRV快照录制到 directory"""
+        self.stop_recording()
+        recorder = ECGRecorder(directory, fs=self.fs, n_channels=12, **kwargs)
+        # 原始帧从解析器当前帧数开始，处理后的帧和R波位置按采样点计数编号
+        recorder.meta['raw_start_frame'] = self.parser.frames_parsed
+        recorder.meta['filtered_start_sample'] = self.sample_count
+        self.recorder = recorder
+        self.add_sink(recorder)
+
+    def stop_recording(self):
+        """停止录制"""
+        recorder, self.recorder = self.recorder, None
+        if recorder:
+            self.remove_sink(recorder)
+            recorder.close()
+
+    def add_sink(self, sink):
+        """添加数据输出端，需实现 write_raw / write_processed / write_r_peak / write_hrv，且不能阻塞"""
+        self.sinks = self.sinks + (sink,)
+
+    def remove_sink(self, sink):
+        self.sinks = tuple(s for s in self.sinks if s is not sink)
+
+    def get_stats(self):
+        """获取采集状态统计（队列深度、丢弃样本数等）"""
+        serial_pending = 0
+        try:
+            if self.serial_port:
+                serial_pending = self.serial_port.in_waiting
+        except Exception:
+            pass
+
+        ring = self.sample_ring
+        parser = self.parser
+        dsp = self.dsp
+        return {
+            'serial_pending_bytes': serial_pending + (parser.pending_bytes() if parser else 0),
+            'queue_depth': ring.pending() if ring else 0,
+            'dropped_samples': ring.dropped_samples if ring else 0,
+            'frames_parsed': parser.frames_parsed if parser else 0,
+            'frames_malformed': parser.frames_malformed if parser else 0,
+            'sample_count': self.sample_count,
+            'qrs_leads': list(dsp.selected_leads) if dsp is not None else [],
+            'lead_sqi': dsp.sqi.tolist() if dsp is not None else [],
+            'lead_quality': self.get_signal_quality().get('quality', []),
+            'beat_confidence': self.last_beat_confidence
+        }
+
     def close(self):
         """关闭串口连接"""
+        self.stop_acquisition_thread()
+        with self.close_lock:
+            # 采集线程仍在 read_data 中时，录制器、历史文件和处理后端由线程退出时释放
+            self.close_pending = self.acquisition_running
+        if self.close_pending:
+            print("采集线程退出后再关闭串口")
+            return
+        self.acquisition_thread = None
+        self._release_resources()
+
+    def _release_resources(self):
+        self.stop_recording()
+        self.close_history()
+        self.close_alarms()
+        if self.dsp is not None:
+            self.dsp.close()
         if self.serial_port and self.serial_port.is_open:
             self.serial_port.close()
             print("串口已关闭")
\ No newline at end of file
@@ -0,0 +1,111 @@
+import numpy as np
+
+
+class SignalQualityMonitor:
+    """各导联信号质量评估（SQI）与导联脱落检测
+
+    保留最近 window 秒的归一化数据，每累积 interval 秒新数据，对所有导联一次性计算：
+    - 平直：峰峰值低于 flat_threshold，视为导联脱落
+    - 饱和比例：幅度达到 saturation_level（归一化的截断上限）的样本比例
+    - 高频噪声：hf_cutoff 以上功率占 wander_cutoff 以上功率的比例（肌电、工频干扰）
+    - 基线漂移：wander_cutoff 以下（含直流偏移）功率占总功率的比例
+    综合为 0~1 的质量分，1 为良好，0 为不可用；结果数组按导联排列，version 在每次重新评估后加一。
+    """
+
+    def __init__(self, fs=250, n_channels=12, window=4.0, interval=0.5, flat_threshold=0.002,
+                 saturation_level=0.99, hf_cutoff=40.0, wander_cutoff=0.7):
+        self.fs = fs
+        self.n_channels = n_channels
+        self.capacity = int(window * fs)
+        self.interval = int(interval * fs)
+        self.flat_threshold = flat_threshold  # 归一化单位，约 5 µV
+        self.saturation_level = saturation_level
+        self.hf_cutoff = hf_cutoff
+        self.wander_cutoff = wander_cutoff
+        # 各指标从“良好”到“不可用”的线性区间
+        self.saturation_range = (0.0, 0.05)
+        self.hf_range = (0.3, 0.65)
+        self.wander_range = (0.7, 0.98)
+        self.buffer = np.zeros((self.capacity, n_channels))
+        self.reset()
+
+    def reset(self):
+        self.count = 0  # 累计收到的样本数
+        self.pending = 0  # 上次评估后新收到的样本数
+        self.quality = np.ones(self.n_channels)
+        self.flat = np.zeros(self.n_channels, dtype=bool)
+        self.lead_off = np.zeros(self.n_channels, dtype=bool)
+        self.saturation = np.zeros(self.n_channels)
+        self.hf_noise = np.zeros(self.n_channels)
+        self.baseline_wander = np.zeros(self.n_channels)
+        self.version = 0
+
+    def update(self, frames):
+        """写入一批归一化后的帧 (n, n_channels)，到达评估间隔时重新计算，返回是否已更新"""
+        frames = np.asarray(frames, dtype=float)
+        n = len(frames)
+        if n == 0:
+            return False
+        if n > self.capacity:
+            self.count += n - self.capacity
+            self.pending += n - self.capacity
+            frames = frames[-self.capacity:]
+            n = self.capacity
+        start = self.count % self.capacity
+        first = min(n, self.capacity - start)
+        self.buffer[start:start + first] = frames[:first]
+        if first < n:
+            self.buffer[:n - first] = frames[first:]
+        self.count += n
+        self.pending += n
+
+        # 至少 1 秒数据才评估，频率分辨率足以区分基线漂移
+        if self.pending < self.interval or self.count < self.fs:
+            return False
+        self.pending = 0
+        self._evaluate(self.window())
+        return True
+
+    def window(self):
+        """按时间顺序排列的最近 window 秒数据 (n, n_channels)"""
+        if self.count < self.capacity:
+            return self.buffer[:self.count]
+        start = self.count % self.capacity
+        return np.concatenate((self.buffer[start:], self.buffer[:start]))
+
+    @staticmethod
+    def _score(value, good_bad):
+        good, bad = good_bad
+        return np.clip((bad - value) / (bad - good), 0, 1)
+
+    def _evaluate(self, x):
+        self.flat = np.ptp(x, axis=0) < self.flat_threshold
+        self.saturation = np.mean(np.abs(x) >= self.saturation_level, axis=0)
+
+        power = np.abs(np.fft.rfft(x, axis=0)) ** 2
+        freqs = np.fft.rfftfreq(len(x), 1.0 / self.fs)
+        low = freqs < self.wander_cutoff
+        total = power.sum(axis=0)
+        above_wander = total - power[low].sum(axis=0)
+        self.baseline_wander = np.divide(total - above_wander, total, out=np.zeros(self.n_channels), where=total > 0)
+        self.hf_noise = np.divide(power[freqs >= self.hf_cutoff].sum(axis=0), above_wander,
+                                  out=np.zeros(self.n_channels), where=above_wander > 0)
+
+        quality = (self._score(self.saturation, self.saturation_range)
+                   * self._score(self.hf_noise, self.hf_range)
+                   * self._score(self.baseline_wander, self.wander_range))
+        self.lead_off = self.flat | (self.saturation > 0.5)
+        self.quality = np.where(self.lead_off, 0.0, quality)
+        self.version += 1
+
+    def summary(self):
+        """各导联的评估结果（列表形式，便于跨线程/进程传递）"""
+        return {
+            'quality': self.quality.tolist(),
+            'lead_off': self.lead_off.tolist(),
+            'flat': self.flat.tolist(),
+            'saturation': self.saturation.tolist(),
+            'hf_noise': self.hf_noise.tolist(),
+            'baseline_wander': self.baseline_wander.tolist(),
+            'version': self.version
+        }
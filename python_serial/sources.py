@@ -0,0 +1,269 @@
+import os
+import time
+import bisect
+import threading
+import serial
+import numpy as np
+from frame_parser import FrameParser, encode_frames, TRANSMITTED_LEADS
+from recorder import load_recording
+
+
+class SerialSource:
+    """串口数据源"""
+
+    def __init__(self, port='COM3', baudrate=115200):
+        self.port = serial.Serial(
+            port=port,
+            baudrate=baudrate,
+            bytesize=serial.EIGHTBITS,
+            parity=serial.PARITY_NONE,
+            stopbits=serial.STOPBITS_ONE,
+            timeout=0.1
+        )
+
+    @property
+    def is_open(self):
+        return self.port.is_open
+
+    @property
+    def in_waiting(self):
+        return self.port.in_waiting
+
+    def read(self, size=1):
+        return self.port.read(size)
+
+    def close(self):
+        self.port.close()
+
+
+class PacedFrameSource:
+    """按采样率节拍产生数据帧的数据源基类，接口与 serial.Serial 相同
+
+    speed=1 为实时，speed=N 为 N 倍速，speed=0 为尽可能快（每次读取给出 chunk_frames 帧）。
+    子类实现 total_frames() 和 encode(start, stop)。
+    帧只在 read() 中生成（持有 lock）；in_waiting 是纯查询，可以在统计、界面等其他线程中调用，
+    返回值按最近的帧长估计，read(in_waiting) 偶尔少取的部分留到下次读取。
+    """
+
+    def __init__(self, fs=250, speed=1.0, chunk_frames=1000, max_lag=1.0):
+        self.fs = fs
+        self.speed = speed
+        self.chunk_frames = chunk_frames
+        self.max_lag = max_lag  # 读取不及时时最多补发多少秒的数据
+        self.buffer = bytearray()
+        self.frames_sent = 0
+        self.bytes_per_frame = 1.0  # 最近一次编码的平均帧长，用于估计 in_waiting
+        self.start_time = time.perf_counter()
+        self.is_open = True
+        self.lock = threading.Lock()
+
+    def total_frames(self):
+        """数据源的总帧数，无限长时返回 None"""
+        return None
+
+    def encode(self, start, stop):
+        """返回第 start 到 stop 帧编码后的字节"""
+        raise NotImplementedError
+
+    @property
+    def finished(self):
+        total = self.total_frames()
+        return total is not None and self.frames_sent >= total and not self.buffer
+
+    def _frames_due(self, skip=False):
+        """按节拍计算当前应发出的帧数；skip 为 True 时把落后超过 max_lag 的部分跳过"""
+        if not self.speed:
+            due = self.chunk_frames
+        else:
+            elapsed = time.perf_counter() - self.start_time
+            due = int(elapsed * self.fs * self.speed) - self.frames_sent
+            max_frames = int(self.max_lag * self.fs * self.speed)
+            if due > max_frames:
+                # 读取方落后太多时跳过旧数据，避免一次性灌入大量数据
+                if skip:
+                    self.start_time += (due - max_frames) / (self.fs * self.speed)
+                due = max_frames
+        total = self.total_frames()
+        if total is not None:
+            due = min(due, total - self.frames_sent)
+        return max(due, 0)
+
+    @property
+    def in_waiting(self):
+        if not self.is_open:
+            return 0
+        return len(self.buffer) + int(self._frames_due() * self.bytes_per_frame)
+
+    def read(self, size=1):
+        with self.lock:
+            due = self._frames_due(skip=True) if self.is_open else 0
+            if due > 0:
+                data = self.encode(self.frames_sent, self.frames_sent + due)
+                self.buffer += data
+                self.frames_sent += due
+                self.bytes_per_frame = len(data) / due
+            data = bytes(self.buffer[:size])
+            del self.buffer[:size]
+        return data
+
+    def close(self):
+        self.is_open = False
+
+
+class FileReplaySource(PacedFrameSource):
+    """文件回放数据源
+
+    path 为文本日志（当前分号分隔格式，每行一帧十二导联）时，ASCII 十二导联直接按行回放，
+    其他格式或导联数时逐段解析后重新编码；path 为录制目录（见 recorder.py）时读取原始帧，
+    并按 frame_format 重新编码；leads=8 时只发送 I、II、V1~V6 八个导联。
+    文件为空或没有一个完整的帧时抛出 ValueError。
+    """
+
+    def __init__(self, path, fs=250, speed=1.0, frame_format='ascii', loop=False, leads=12, **kwargs):
+        self.path = path
+        self.frame_format = frame_format
+        self.columns = list(TRANSMITTED_LEADS[leads])
+        self.loop = loop
+        self.frames = None
+        self.data = None
+
+        if os.path.isdir(path):
+            meta, recording = load_recording(path)
+            fs = meta['fs']
+            self.frames = recording['raw']
+            n_frames = len(self.frames)
+        else:
+            if os.path.getsize(path) == 0:
+                raise ValueError(f"回放文件为空: {path}")
+            self.data = np.memmap(path, dtype=np.uint8, mode='r')
+            # 每帧的结束位置（换行符之后）
+            self.line_ends = np.flatnonzero(self.data == ord('\n')) + 1
+            n_frames = len(self.line_ends)
+            # 原样回放的前提是输出与日志的协议相同，否则把日志行解析成帧后重新编码
+            self.passthrough = frame_format == 'ascii' and leads == 12
+            self.line_parser = FrameParser(n_channels=12, frame_format='ascii')
+            if n_frames and len(self.line_parser.feed(self.data[:self.line_ends[0]].tobytes())) == 0:
+                raise ValueError(f"回放文件的第一行不是十二导联帧: {path}")
+
+        if n_frames == 0:
+            raise ValueError(f"回放文件中没有完整的帧: {path}")
+        self.n_frames = n_frames
+        super().__init__(fs=fs, speed=speed, **kwargs)
+
+    def total_frames(self):
+        return None if self.loop else self.n_frames
+
+    def encode(self, start, stop):
+        if not self.loop:
+            return self._encode_range(start, stop)
+
+        # 循环回放：跨越文件末尾时分段拼接
+        parts = []
+        index = start
+        while index < stop:
+            begin = index % self.n_frames
+            end = min(begin + stop - index, self.n_frames)
+            parts.append(self._encode_range(begin, end))
+            index += end - begin
+        return b''.join(parts)
+
+    def _encode_range(self, start, stop):
+        if self.frames is not None:
+            return encode_frames(self.frames[start:stop, self.columns], self.frame_format)
+        begin = self.line_ends[start - 1] if start > 0 else 0
+        end = self.line_ends[stop - 1] if stop > 0 else 0
+        if self.passthrough:
+            return self.data[begin:end].tobytes()
+        frames = self.line_parser.feed(self.data[begin:end].tobytes())
+        return encode_frames(frames[:, self.columns], self.frame_format)
+
+
+class SyntheticECGSource(PacedFrameSource):
+    """模拟十二导联心电数据源
+
+    用高斯波形叠加出 P、QRS、T 波，导联 III、aVR、aVL、aVF 由 I、II 按
+    Einthoven/Goldberger 关系导出。心率带有呼吸性变异，并加入基线漂移和噪声。
+    beat_samples 记录每个 R 波所在的帧编号，可作为检测算法的标注。
+    leads=8 时模拟只发送 I、II、V1~V6 的设备。
+    """
+
+    # (相对R波的时间 s, 宽度 s, 导联I幅度 mV, 导联II幅度 mV, V1~V6幅度 mV)
+    WAVES = [
+        (-0.20, 0.025, 0.08, 0.15, (0.05, 0.08, 0.10, 0.10, 0.10, 0.08)),
+        (-0.03, 0.010, -0.05, -0.10, (0.00, 0.00, -0.05, -0.10, -0.10, -0.10)),
+        (0.00, 0.012, 0.80, 1.20, (0.30, 0.60, 0.90, 1.30, 1.40, 1.00)),
+        (0.03, 0.012, -0.15, -0.25, (-1.00, -1.20, -0.80, -0.50, -0.30, -0.20)),
+        (0.28, 0.050, 0.20, 0.30, (0.10, 0.30, 0.35, 0.35, 0.30, 0.25)),
+    ]
+
+    def __init__(self, fs=250, speed=1.0, heart_rate=72, noise=0.02, wander=0.1,
+                 units_per_mv=4000, offset=10000, frame_format='ascii', seed=None, leads=12, **kwargs):
+        super().__init__(fs=fs, speed=speed, **kwargs)
+        self.heart_rate = heart_rate
+        self.noise = noise  # 噪声标准差（mV）
+        self.wander = wander  # 基线漂移幅度（mV）
+        self.units_per_mv = units_per_mv
+        self.offset = offset
+        self.frame_format = frame_format
+        self.columns = list(TRANSMITTED_LEADS[leads])  # 发送的导联
+        self.rng = np.random.default_rng(seed)
+
+        self.beat_times = []  # 已生成的 R 波时刻（秒）
+        self.next_beat = 0.5
+
+        # 每个波形分量在 12 个导联上的幅度
+        gains = []
+        for _, _, lead_i, lead_ii, chest in self.WAVES:
+            limb = [lead_i, lead_ii, lead_ii - lead_i, -(lead_i + lead_ii) / 2,
+                    lead_i - lead_ii / 2, lead_ii - lead_i / 2]
+            gains.append(limb + list(chest))
+        self.gains = np.array(gains)
+
+    @property
+    def beat_samples(self):
+        """R 波所在的帧编号"""
+        return np.round(np.array(self.beat_times) * self.fs).astype(np.int64)
+
+    def _extend_beats(self, until):
+        """生成到 until 秒为止的所有心拍时刻"""
+        while self.next_beat < until:
+            self.beat_times.append(self.next_beat)
+            rr = 60.0 / self.heart_rate
+            rr *= 1 + 0.05 * np.sin(2 * np.pi * 0.25 * self.next_beat) + self.rng.normal(0, 0.02)
+            self.next_beat += rr
+
+    def generate(self, start, stop):
+        """生成第 start 到 stop 帧的原始整数数据 (n, 12)"""
+        t = np.arange(start, stop) / self.fs
+        self._extend_beats(t[-1] + 1.0)
+
+        signal = np.zeros((len(t), 12))
+        first = bisect.bisect_left(self.beat_times, t[0] - 1.0)
+        last = bisect.bisect_right(self.beat_times, t[-1] + 1.0)
+        for beat in self.beat_times[first:last]:
+            for (offset, width, *_), gain in zip(self.WAVES, self.gains):
+                shape = np.exp(-((t - beat - offset) ** 2) / (2 * width ** 2))
+                signal += shape[:, None] * gain
+
+        signal += self.wander * np.sin(2 * np.pi * 0.3 * t)[:, None]
+        signal += self.rng.normal(0, self.noise, signal.shape)
+        return np.round(self.offset + signal * self.units_per_mv).astype(np.int64)
+
+    def encode(self, start, stop):
+        return encode_frames(self.generate(start, stop)[:, self.columns], self.frame_format)
+
+
+def open_source(port, baudrate=115200, frame_format='ascii', speed=1.0, fs=250, leads=12):
+    """按名称打开数据源
+
+    'synthetic' 或 'synthetic:<心率>' 为模拟信号，'replay:<路径>' 为文件回放，
+    其余按串口名打开。speed 和 leads 只对模拟和回放数据源有效（串口设备按自己的协议发送）。
+    """
+    if port.startswith('synthetic'):
+        _, _, heart_rate = port.partition(':')
+        return SyntheticECGSource(fs=fs, speed=speed, heart_rate=float(heart_rate or 72),
+                                  frame_format=frame_format, leads=leads)
+    if port.startswith('replay:'):
+        return FileReplaySource(port[len('replay:'):], fs=fs, speed=speed, frame_format=frame_format,
+                                leads=leads)
+    return SerialSource(port=port, baudrate=baudrate)
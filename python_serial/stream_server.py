@@ -0,0 +1,328 @@
+"""无界面的采集与流式输出服务
+
+采集和信号处理照常在 SerialHandler 的后台线程中进行，结果通过本地 TCP 或 Unix 套接字
+推送给任意多个订阅者（中央站看板、分析程序、压力测试客户端等）。
+
+用法:
+    python stream_server.py --port COM3 --listen 127.0.0.1:9750
+    python stream_server.py --port synthetic --unix /tmp/ecg.sock
+
+消息格式（小端）：5 字节消息头 <类型 uint8, 负载长度 uint32>，后接负载
+    HELLO     JSON：采样率、导联数、协议版本
+    RAW       <起始帧号 uint64, 帧数 uint16> + int32 (n, 12) 行优先
+    DENOISED  <起始采样点 uint64, 帧数 uint16> + float32 (n, 12) 行优先
+    BEAT      <R 波采样点 uint64, 置信度 float32>
+    HRV       JSON：该心拍时的 HRV 快照
+    ANALYSIS  JSON：5 分钟频域/非线性 HRV 分析结果
+    QUALITY   JSON：各导联信号质量
+    ALARM     JSON：新的报警/解除事件列表（见 alarms.EventLog.to_dict）
+客户端可随时发送 1 字节的订阅掩码（第 k 位对应类型 k），默认接收全部类型。
+每个客户端有自己的有界发送队列，队列满时丢弃该客户端最旧的消息，慢客户端不会拖慢采集和其他客户端。
+"""
+import json
+import math
+import struct
+import asyncio
+import argparse
+import numpy as np
+from instrumentation import MetricsWindow, MetricsReporter
+from alarms import load_rules
+
+MSG_HELLO = 0
+MSG_RAW = 1
+MSG_DENOISED = 2
+MSG_BEAT = 3
+MSG_HRV = 4
+MSG_ANALYSIS = 5
+MSG_QUALITY = 6
+MSG_ALARM = 7
+MESSAGE_NAMES = {MSG_HELLO: 'hello', MSG_RAW: 'raw', MSG_DENOISED: 'denoised', MSG_BEAT: 'beat',
+                 MSG_HRV: 'hrv', MSG_ANALYSIS: 'analysis', MSG_QUALITY: 'quality', MSG_ALARM: 'alarm'}
+PROTOCOL_VERSION = 1
+
+HEADER = struct.Struct('<BI')  # 消息类型, 负载长度
+BLOCK_HEADER = struct.Struct('<QH')  # 起始编号, 帧数
+BEAT = struct.Struct('<Qf')  # R 波采样点, 置信度
+MAX_BLOCK_FRAMES = 0xFFFF
+
+
+def encode_message(msg_type, payload):
+    return HEADER.pack(msg_type, len(payload)) + payload
+
+
+def encode_json(msg_type, data):
+    # NaN/inf（如心拍不足时的分析结果）不是合法 JSON，改为 null
+    data = {key: None if isinstance(value, float) and not math.isfinite(value) else value
+            for key, value in data.items()}
+    return encode_message(msg_type, json.dumps(data, separators=(',', ':')).encode('utf-8'))
+
+
+def encode_block(msg_type, start, frames, dtype):
+    """把 (n, n_channels) 的数据块编码成一条或多条消息（单条最多 65535 帧）"""
+    frames = np.asarray(frames, dtype=dtype)
+    parts = []
+    for i in range(0, len(frames), MAX_BLOCK_FRAMES):
+        block = frames[i:i + MAX_BLOCK_FRAMES]
+        parts.append(encode_message(msg_type, BLOCK_HEADER.pack(start + i, len(block)) + block.tobytes()))
+    return b''.join(parts)
+
+
+def decode_payload(msg_type, payload, n_channels=12):
+    """解析一条消息的负载：数据块返回 (起始编号, (n, n_channels) 数组)，心拍返回 (采样点, 置信度)，其余为字典"""
+    if msg_type in (MSG_RAW, MSG_DENOISED):
+        start, n = BLOCK_HEADER.unpack_from(payload)
+        dtype = '<i4' if msg_type == MSG_RAW else '<f4'
+        data = np.frombuffer(payload, dtype=dtype, offset=BLOCK_HEADER.size, count=n * n_channels)
+        return start, data.reshape(n, n_channels)
+    if msg_type == MSG_BEAT:
+        return BEAT.unpack(payload)
+    return json.loads(payload.decode('utf-8'))
+
+
+async def read_message(reader):
+    """客户端辅助函数：读取一条消息，返回 (类型, 负载字节)"""
+    header = await reader.readexactly(HEADER.size)
+    msg_type, length = HEADER.unpack(header)
+    return msg_type, await reader.readexactly(length)
+
+
+class StreamClient:
+    """服务器端的一个订阅者连接"""
+
+    def __init__(self, reader, writer, queue_size):
+        self.reader = reader
+        self.writer = writer
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.mask = 0xFF  # 订阅掩码
+        self.sent_messages = 0
+        self.sent_bytes = 0
+        self.dropped_messages = 0
+        self.peer = writer.get_extra_info('peername') or writer.get_extra_info('sockname')
+
+    def offer(self, msg_type, message):
+        """放入发送队列；队列满时丢弃最旧的消息，绝不等待"""
+        if not self.mask & (1 << msg_type):
+            return
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped_messages += 1
+        self.queue.put_nowait(message)
+
+
+class StreamServer:
+    """把 SerialHandler 的数据推送给多个本地订阅者
+
+    作为 SerialHandler 的数据输出端（add_sink），write_* 在采集线程中被调用，
+    只编码消息并通过 call_soon_threadsafe 交给事件循环，不做任何网络 IO。
+    """
+
+    def __init__(self, handler, host='127.0.0.1', port=9750, unix_path=None, queue_size=256,
+                 poll_interval=1.0):
+        self.handler = handler
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.queue_size = queue_size  # 每个客户端最多缓存的消息数
+        self.poll_interval = poll_interval  # 检查 HRV 分析、信号质量和报警事件更新的间隔（秒）
+        self.clients = set()
+        self.loop = None
+        self.server = None
+        self.raw_index = 0  # 下一个原始帧的编号
+        self.sample_index = 0  # 下一个去噪样本的编号
+        self.published_messages = 0
+
+    # ---- 数据输出端接口，在采集线程中调用 ----
+
+    def write_raw(self, frames):
+        self._publish(MSG_RAW, encode_block(MSG_RAW, self.raw_index, frames, '<i4'))
+        self.raw_index += len(frames)
+
+    def write_processed(self, frames):
+        self._publish(MSG_DENOISED, encode_block(MSG_DENOISED, self.sample_index, frames, '<f4'))
+        self.sample_index += len(frames)
+
+    def write_r_peak(self, sample_index):
+        confidence = self.handler.last_beat_confidence
+        self._publish(MSG_BEAT, encode_message(MSG_BEAT, BEAT.pack(sample_index, confidence)))
+
+    def write_hrv(self, sample_index, hrv_data):
+        data = {'sample': int(sample_index)}
+        data.update({key: float(value) for key, value in hrv_data.items()})
+        self._publish(MSG_HRV, encode_json(MSG_HRV, data))
+
+    def _publish(self, msg_type, message):
+        loop = self.loop
+        if loop is None or not self.clients:
+            return
+        try:
+            loop.call_soon_threadsafe(self._broadcast, msg_type, message)
+        except RuntimeError:  # 事件循环已关闭
+            pass
+
+    # ---- 以下在事件循环中运行 ----
+
+    def _broadcast(self, msg_type, message):
+        self.published_messages += 1
+        for client in self.clients:
+            client.offer(msg_type, message)
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        if self.unix_path:
+            self.server = await asyncio.start_unix_server(self._handle_client, path=self.unix_path)
+            print(f"流服务已启动: {self.unix_path}")
+        else:
+            self.server = await asyncio.start_server(self._handle_client, self.host, self.port)
+            self.port = self.server.sockets[0].getsockname()[1]  # port=0 时为系统分配的端口
+            print(f"流服务已启动: {self.host}:{self.port}")
+        self.raw_index = self.handler.parser.frames_parsed
+        self.sample_index = self.handler.sample_count
+        self.handler.add_sink(self)
+
+    async def serve_forever(self):
+        """启动服务并定期推送 HRV 分析、信号质量和报警事件，直到被取消"""
+        if self.server is None:
+            await self.start()
+        analysis_version = None
+        quality_version = None
+        log = self.handler.alarms.log if self.handler.alarms is not None else None
+        events_sent = len(log) if log is not None else 0  # 只推送服务启动之后的事件
+        try:
+            while True:
+                await asyncio.sleep(self.poll_interval)
+                version = self.handler.hrv_analysis_version()
+                if version != analysis_version:
+                    analysis_version = version
+                    self._broadcast(MSG_ANALYSIS, encode_json(MSG_ANALYSIS, self.handler.get_hrv_analysis()))
+                quality = self.handler.get_signal_quality()
+                if quality.get('version') != quality_version:
+                    quality_version = quality.get('version')
+                    self._broadcast(MSG_QUALITY, encode_json(MSG_QUALITY, quality))
+                if log is not None and len(log) > events_sent:
+                    records = log.read(events_sent, len(log))
+                    events_sent += len(records)
+                    events = [log.to_dict(record) for record in records]
+                    self._broadcast(MSG_ALARM, encode_json(MSG_ALARM, {'events': events}))
+        finally:
+            await self.close()
+
+    async def close(self):
+        self.handler.remove_sink(self)
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+        for client in list(self.clients):
+            client.writer.close()
+        self.clients.clear()
+
+    async def _handle_client(self, reader, writer):
+        client = StreamClient(reader, writer, self.queue_size)
+        client.offer(MSG_HELLO, encode_json(MSG_HELLO, {
+            'version': PROTOCOL_VERSION, 'fs': self.handler.fs, 'n_channels': 12,
+            'types': {name: msg_type for msg_type, name in MESSAGE_NAMES.items()}}))
+        self.clients.add(client)
+        sender = asyncio.ensure_future(self._send_loop(client))
+        try:
+            await self._receive_mask(client)
+        except asyncio.CancelledError:  # 服务关闭
+            pass
+        finally:
+            sender.cancel()
+            self.clients.discard(client)
+            writer.close()
+
+    async def _send_loop(self, client):
+        writer = client.writer
+        try:
+            while True:
+                message = await client.queue.get()
+                # 一次取出队列中所有消息合并发送，减少系统调用
+                messages = [message]
+                while not client.queue.empty():
+                    messages.append(client.queue.get_nowait())
+                data = b''.join(messages)
+                writer.write(data)
+                await writer.drain()
+                client.sent_messages += len(messages)
+                client.sent_bytes += len(data)
+        except ConnectionError:
+            # 连接已断开，让读取端也结束
+            writer.transport.abort()
+
+    async def _receive_mask(self, client):
+        """读取客户端发来的订阅掩码（取最后一个字节），客户端断开时返回"""
+        try:
+            while True:
+                data = await client.reader.read(64)
+                if not data:
+                    break
+                client.mask = data[-1] | (1 << MSG_HELLO)
+        except ConnectionError:
+            pass
+
+    def stats(self):
+        """连接和发送统计；拷贝客户端集合后再遍历，可在其他线程调用"""
+        clients = list(self.clients)
+        return {
+            'clients': len(clients),
+            'published_messages': self.published_messages,
+            'client_stats': [{'peer': str(client.peer), 'sent_messages': client.sent_messages,
+                              'sent_bytes': client.sent_bytes, 'dropped_messages': client.dropped_messages,
+                              'queued': client.queue.qsize()} for client in clients]
+        }
+
+
+def main():
+    from serial_handle import SerialHandler
+
+    parser = argparse.ArgumentParser(description="心电采集流服务（无界面）")
+    parser.add_argument('--port', default='synthetic', help="串口，或 synthetic:<心率>、replay:<路径>")
+    parser.add_argument('--baudrate', type=int, default=115200)
+    parser.add_argument('--format', default='ascii', choices=['ascii', 'binary16', 'binary24'], help="帧格式")
+    parser.add_argument('--leads', type=int, choices=[12, 8], default=12,
+                        help="设备发送的导联数（8 为 I、II、V1~V6，其余肢体导联导出后一起转发）")
+    parser.add_argument('--listen', default='127.0.0.1:9750', help="TCP 监听地址 host:port")
+    parser.add_argument('--unix', help="改用 Unix 套接字路径")
+    parser.add_argument('--queue-size', type=int, default=256, help="每个客户端的发送队列长度（消息数）")
+    parser.add_argument('--dsp-backend', choices=['inprocess', 'process'], default='inprocess')
+    parser.add_argument('--baseline', choices=['highpass', 'median'], default='highpass')
+    parser.add_argument('--alarm-rules', metavar='PATH', help="报警规则 JSON 文件，默认使用内置规则")
+    parser.add_argument('--metrics-log', metavar='PATH', help="定期把各处理阶段耗时、采集和连接统计以 JSON 行追加到文件（'-' 为标准输出）")
+    parser.add_argument('--metrics-interval', type=float, default=10.0, help="性能统计日志的输出间隔（秒）")
+    args = parser.parse_args()
+
+    handler = SerialHandler(port=args.port, baudrate=args.baudrate, frame_format=args.format,
+                            dsp_backend=args.dsp_backend, baseline_method=args.baseline, leads=args.leads,
+                            alarm_rules=load_rules(args.alarm_rules) if args.alarm_rules else None)
+    if not handler.serial_port:
+        return
+    host, _, port = args.listen.rpartition(':')
+    server = StreamServer(handler, host=host or '127.0.0.1', port=int(port), unix_path=args.unix,
+                          queue_size=args.queue_size)
+    reporter = None
+    if args.metrics_log:
+        window = MetricsWindow(handler.metrics)
+
+        def collect():
+            report = window.take()
+            report['acquisition'] = handler.get_stats()
+            report['server'] = server.stats()
+            return report
+
+        handler.set_metrics_enabled(True)
+        reporter = MetricsReporter(collect, args.metrics_log, args.metrics_interval)
+        reporter.start()
+    handler.start_acquisition_thread()
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if reporter:
+            reporter.stop()
+        handler.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 各模块以脚本目录为根互相导入（与 main.py 的运行方式一致）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
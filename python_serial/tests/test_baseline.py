@@ -0,0 +1,26 @@
+import numpy as np
+
+from baseline import MedianBaselineFilter, SlidingMedian
+
+
+def test_sliding_median_matches_numpy():
+    """任意分块方式下，第 k 个输出都是以第 k 个输入为中心（开头用第一个样本填充）的窗口中值"""
+    rng = np.random.default_rng(0)
+    x = rng.normal(size=(600, 3))
+    half = 20
+    padded = np.concatenate((np.repeat(x[:1], half, axis=0), x))
+    expected = np.array([np.median(padded[k:k + 2 * half + 1], axis=0) for k in range(len(x) - half)])
+
+    median = SlidingMedian(half, n_channels=3)
+    bounds = np.concatenate(([0], np.sort(rng.choice(np.arange(1, 600), 60, replace=False)), [600]))
+    output = np.concatenate([median.process(x[a:b]) for a, b in zip(bounds[:-1], bounds[1:])])
+    np.testing.assert_array_equal(output, expected)
+
+
+def test_median_baseline_latency():
+    """恒定偏置被完全去除，输出比输入晚 latency() 个样本"""
+    baseline_filter = MedianBaselineFilter(fs=250, n_channels=2)
+    x = np.full((1000, 2), 3.0)
+    output = np.concatenate([baseline_filter.process(x[i:i + 7]) for i in range(0, 1000, 7)])
+    assert len(output) == 1000 - baseline_filter.latency()
+    np.testing.assert_array_equal(output, 0.0)
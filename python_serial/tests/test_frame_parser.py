@@ -0,0 +1,24 @@
+import numpy as np
+
+from frame_parser import FrameParser, encode_frames
+
+
+def test_ascii_matches_int_parsing():
+    """任意位数的数值都按 int() 解析后取后五位，格式错误的行计数并跳过"""
+    lines = [b'1;2;3', b'1234567890123;-99999999999999999999912345;+7;', b' 4 ; 5 ;6', b'x;1;2', b'1;2']
+    parser = FrameParser(n_channels=3)
+    frames = parser.feed(b'\n'.join(lines) + b'\n')
+    expected = [[int(v) for v in line.split(b';') if v.strip()] for line in lines[:3]]
+    expected = [[(1 if v >= 0 else -1) * (abs(v) % 100000) for v in row] for row in expected]
+    np.testing.assert_array_equal(frames, expected)
+    assert parser.frames_malformed == 2
+
+
+def test_binary_round_trip():
+    frames = np.random.default_rng(0).integers(-30000, 30000, (50, 12))
+    for frame_format in ('ascii', 'binary16', 'binary24'):
+        data = encode_frames(frames, frame_format)
+        parser = FrameParser(frame_format=frame_format)
+        # 分成不完整的小块送入
+        parsed = np.concatenate([parser.feed(data[i:i + 37]) for i in range(0, len(data), 37)])
+        np.testing.assert_array_equal(parsed, frames)
@@ -0,0 +1,77 @@
+import numpy as np
+
+from hrv import HRVEngine, sample_entropy
+
+
+def reference_stats(rr):
+    """SDNN（总体标准差）、RMSSD、pNN50 的直接计算"""
+    diff = np.diff(rr)
+    return np.std(rr), np.sqrt(np.mean(diff ** 2)), np.mean(np.abs(diff) > 50) * 100
+
+
+def test_window_stats_match_numpy():
+    """各窗口的增量统计与对窗口内 RR 间期直接计算的结果一致"""
+    rng = np.random.default_rng(0)
+    rr = 800 + 60 * np.sin(np.arange(600) * 0.3) + rng.normal(0, 30, 600)
+    times = np.cumsum(rr)
+    engine = HRVEngine()
+    for k, value in enumerate(rr):
+        engine.add(value)
+        if k < 20 or k % 50:
+            continue
+        data = engine.snapshot
+        for suffix, window in (('', rr[k - 9:k + 1]),
+                               ('_1min', rr[:k + 1][times[:k + 1] > times[k] - 60000]),
+                               ('_5min', rr[:k + 1][times[:k + 1] > times[k] - 300000])):
+            sdnn, rmssd, pnn50 = reference_stats(window)
+            assert abs(data['SDNN' + suffix] - sdnn) < 1e-6
+            assert abs(data['RMSSD' + suffix] - rmssd) < 1e-6
+            assert abs(data['pNN50' + suffix] - pnn50) < 1e-9
+        assert abs(data['heart_rate'] - 60000 / rr[k]) < 1e-9
+
+
+def test_fixed_series():
+    """手算的固定序列"""
+    engine = HRVEngine()
+    for value in (800, 850, 790, 820):
+        engine.add(value)
+    data = engine.snapshot
+    assert np.isclose(data['RMSSD'], np.sqrt((50 ** 2 + 60 ** 2 + 30 ** 2) / 3))
+    assert np.isclose(data['SDNN'], np.std([800, 850, 790, 820]))
+    assert np.isclose(data['pNN50'], 100 / 3)
+
+
+def test_reset_and_too_few_beats():
+    engine = HRVEngine()
+    engine.add(800)
+    assert engine.snapshot['RMSSD'] == 0 and engine.snapshot['heart_rate'] == 0
+    engine.add(900)
+    engine.reset()
+    assert engine.count == 0 and engine.snapshot['SDNN_5min'] == 0
+
+
+def brute_force_sample_entropy(x, m=2, r=0.2):
+    """逐对比较模板的样本熵（切比雪夫距离 <= r·std，两种长度都取前 n-m 个模板）"""
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    tolerance = r * np.std(x)
+
+    def matches(length):
+        templates = [x[i:i + length] for i in range(n - m)]
+        return sum(np.max(np.abs(templates[i] - templates[j])) <= tolerance
+                   for i in range(len(templates)) for j in range(i + 1, len(templates)))
+
+    return -np.log(matches(m + 1) / matches(m))
+
+
+def test_sample_entropy_matches_brute_force():
+    rng = np.random.default_rng(2)
+    for rr in (rng.normal(800, 40, 200),
+               800 + 50 * np.sin(np.arange(150) * 0.4) + rng.normal(0, 10, 150),
+               np.round(rng.normal(800, 20, 120), -1)):  # 取整到 10ms，模板间有大量相同的距离
+        assert np.isclose(sample_entropy(rr), brute_force_sample_entropy(rr), rtol=1e-12)
+
+
+def test_sample_entropy_degenerate():
+    assert np.isnan(sample_entropy([800.0] * 50))
+    assert np.isnan(sample_entropy([800.0, 810.0, 820.0]))
@@ -0,0 +1,36 @@
+import numpy as np
+
+from wavelet_stream import StreamingWaveletDenoiser, wavelet_denoise
+
+
+def pointwise_denoise(x, window, outlier_limit):
+    """逐点实现：每个样本对最近 window 个样本做一次完整的去噪，只取最后一个点"""
+    out = np.array(x, dtype=float)
+    for i in range(window - 1, len(x)):
+        out[i] = wavelet_denoise(x[i - window + 1:i + 1].T, outlier_limit=outlier_limit)[..., -1]
+    return out
+
+
+def test_hop_one_matches_pointwise():
+    """hop=1 时与逐点实现一致，且与输入的分块方式无关"""
+    rng = np.random.default_rng(0)
+    t = np.arange(400) / 250.0
+    x = 0.5 * np.sin(2 * np.pi * 1.2 * t)[:, None] + rng.normal(0, 0.05, (400, 3))
+    expected = pointwise_denoise(x, 64, 0.7)
+
+    denoiser = StreamingWaveletDenoiser(window=64, hop=1, n_channels=3)
+    bounds = np.concatenate(([0], np.sort(rng.choice(np.arange(1, 400), 30, replace=False)), [400]))
+    output = np.concatenate([denoiser.process(x[a:b]) for a, b in zip(bounds[:-1], bounds[1:])])
+
+    assert output.shape == x.shape
+    np.testing.assert_allclose(output, expected, rtol=0, atol=1e-12)
+
+
+def test_single_channel_hop():
+    """单通道输入输出为一维，hop 个样本一批输出，总数与输入相同"""
+    x = np.random.default_rng(1).normal(0, 0.1, 256)
+    denoiser = StreamingWaveletDenoiser(window=64, hop=16)
+    output = np.concatenate([denoiser.process(x[i:i + 10]) for i in range(0, 256, 10)])
+    assert output.ndim == 1
+    assert len(output) == 256 - (256 - 63) % 16
+    np.testing.assert_array_equal(output[:63], x[:63])
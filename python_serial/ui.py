@@ -1,31 +1,70 @@
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QPushButton, QComboBox, QLabel, QSpinBox, QStackedWidget,
-                             QGroupBox, QFormLayout, QGridLayout, QFrame)
-from PyQt5.QtCore import QObject, pyqtSignal, Qt
+                             QGroupBox, QFormLayout, QGridLayout, QFrame, QCheckBox, QFileDialog)
+from PyQt5.QtCore import QObject, pyqtSignal, Qt, QTimer
 from PyQt5.QtGui import QFont, QPalette, QColor
+import os
+import time
+import threading
 import pyqtgraph as pg
 import numpy as np
-import serial.tools.list_ports
-from collections import deque
+from render_settings import RenderSettings, FrameRateGovernor
+from instrumentation import Metrics
+from review_ui import HistoryReviewWidget
 
 
 class DataReceiver(QObject):
     hrv_data_updated = pyqtSignal(dict)
+    hrv_analysis_updated = pyqtSignal(dict)
+    signal_quality_updated = pyqtSignal(dict)
+    beat_templates_updated = pyqtSignal(dict)
+    alarms_updated = pyqtSignal(dict)
+    ports_listed = pyqtSignal(list)
+
+
+class TimedGraphicsLayoutWidget(pg.GraphicsLayoutWidget):
+    """记录绘制耗时的 GraphicsLayoutWidget"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.paint_time = 0.0  # 上次取走后累计的绘制耗时（秒）
+        self.painted_at = 0.0  # 最近一次绘制完成的时刻
+
+    def paintEvent(self, ev):
+        start = time.perf_counter()
+        super().paintEvent(ev)
+        self.painted_at = time.perf_counter()
+        self.paint_time += self.painted_at - start
+
+    def take_paint_time(self):
+        """取出并清零累计的绘制耗时"""
+        paint_time, self.paint_time = self.paint_time, 0.0
+        return paint_time
 
 
 class ECGMonitorUI(QMainWindow):
     def __init__(self):
         super().__init__()
+        self.render_settings = RenderSettings()
+        self.frame_governor = FrameRateGovernor(target_fps=self.render_settings.target_fps)
+        # 界面线程各阶段的耗时统计，与 SerialHandler.metrics 一起由性能叠加层打开
+        self.metrics = Metrics()
+        self.latest_arrival = None  # 最新写入绘图缓冲区的样本对应的字节到达时刻
+        self.awaiting_paint = None  # (字节到达时刻, 交给曲线的时刻)，等待绘制完成后记录端到端延迟
         self.setup_ui()
         self.setup_plots()
+        self.apply_render_settings()
         from PyQt5.QtGui import QIcon
         self.setWindowIcon(QIcon('icon.ico'))
         self.data_receiver = DataReceiver()
         self.data_receiver.hrv_data_updated.connect(self.update_hrv_display)
-
-        self.data_buffers = [deque(maxlen=self.buffer_size) for _ in range(12)]
-        for buffer in self.data_buffers:
-            buffer.extend([0] * self.buffer_size)
+        self.data_receiver.hrv_analysis_updated.connect(self.update_hrv_analysis_display)
+        self.data_receiver.signal_quality_updated.connect(self.update_quality_badges)
+        self.data_receiver.beat_templates_updated.connect(self.update_beat_templates)
+        self.data_receiver.alarms_updated.connect(self.update_alarms)
+        self.data_receiver.ports_listed.connect(self.set_port_list)
+        # 串口枚举在部分系统上很慢，放到窗口显示之后在后台进行
+        QTimer.singleShot(0, self.update_port_list)
 
     def setup_ui(self):
         """设置基本UI元素"""
@@ -111,12 +150,42 @@ class ECGMonitorUI(QMainWindow):
         self.baudrate_combo.setCurrentText('115200')
         baud_layout.addWidget(self.baudrate_combo)
 
+        format_layout = QVBoxLayout()
+        format_label = QLabel("数据格式:")
+        format_label.setStyleSheet("font-size: 14px;")
+        format_layout.addWidget(format_label)
+        self.format_combo = QComboBox()
+        self.format_combo.addItem("文本(分号分隔)", 'ascii')
+        self.format_combo.addItem("二进制(int16)", 'binary16')
+        self.format_combo.addItem("二进制(int24)", 'binary24')
+        format_layout.addWidget(self.format_combo)
+        # 8 导联设备只发送 I、II、V1~V6，III、aVR、aVL、aVF 由上位机导出
+        self.leads_combo = QComboBox()
+        self.leads_combo.addItem("12导联", 12)
+        self.leads_combo.addItem("8导联(导出肢体导联)", 8)
+        format_layout.addWidget(self.leads_combo)
+
+        speed_layout = QVBoxLayout()
+        speed_label = QLabel("回放速度:")
+        speed_label.setStyleSheet("font-size: 14px;")
+        speed_layout.addWidget(speed_label)
+        self.speed_combo = QComboBox()
+        for text, speed in [("实时", 1.0), ("2倍速", 2.0), ("4倍速", 4.0), ("10倍速", 10.0), ("最快", 0.0)]:
+            self.speed_combo.addItem(text, speed)
+        speed_layout.addWidget(self.speed_combo)
+
         self.refresh_ports_button = QPushButton("刷新串口")
         self.refresh_ports_button.setIcon(self.style().standardIcon(self.style().SP_BrowserReload))
+        self.replay_button = QPushButton("回放文件")
 
         serial_layout.addLayout(port_layout)
         serial_layout.addLayout(baud_layout)
-        serial_layout.addWidget(self.refresh_ports_button)
+        serial_layout.addLayout(format_layout)
+        serial_layout.addLayout(speed_layout)
+        button_layout = QVBoxLayout()
+        button_layout.addWidget(self.refresh_ports_button)
+        button_layout.addWidget(self.replay_button)
+        serial_layout.addLayout(button_layout)
         serial_group.setLayout(serial_layout)
 
         # 数据显示组
@@ -189,10 +258,18 @@ class ECGMonitorUI(QMainWindow):
         self.start_button = QPushButton("开始采集")
         self.stop_button = QPushButton("停止采集")
         self.switch_view_button = QPushButton("切换视图")
+        self.sweep_mode_button = QPushButton("扫描模式")
+        self.sweep_mode_button.setCheckable(True)
         self.clear_button = QPushButton("清除数据")
+        self.record_button = QPushButton("开始录制")
+        self.record_button.setCheckable(True)
+        self.record_button.setEnabled(False)
+        self.review_button = QPushButton("历史回看")
+        self.review_button.setCheckable(True)
 
         # 设置按钮大小
-        for button in [self.start_button, self.stop_button, self.switch_view_button, self.clear_button]:
+        for button in [self.start_button, self.stop_button, self.switch_view_button,
+                       self.sweep_mode_button, self.clear_button, self.record_button, self.review_button]:
             button.setMinimumWidth(100)
             button.setMinimumHeight(35)
             button.setStyleSheet("""
@@ -209,7 +286,11 @@ class ECGMonitorUI(QMainWindow):
         # 添加所有组件到顶部面板
         top_layout.addWidget(serial_group)
         top_layout.addWidget(data_group)
+        top_layout.addWidget(self._create_alarm_group())
+        top_layout.addWidget(self._create_template_group())
+        top_layout.addWidget(self._create_analysis_group())
         top_layout.addWidget(control_group)
+        top_layout.addWidget(self._create_render_group())
         top_layout.addStretch()
 
         self.main_layout.addWidget(top_panel)
@@ -224,16 +305,209 @@ class ECGMonitorUI(QMainWindow):
             }
         """)
 
-        self.limb_leads_widget = pg.GraphicsLayoutWidget()
-        self.chest_leads_widget = pg.GraphicsLayoutWidget()
+        self.limb_leads_widget = TimedGraphicsLayoutWidget()
+        self.chest_leads_widget = TimedGraphicsLayoutWidget()
 
         self.stacked_widget.addWidget(self.limb_leads_widget)
         self.stacked_widget.addWidget(self.chest_leads_widget)
 
         self.main_layout.addWidget(self.stacked_widget, stretch=5)
 
-        self.update_port_list()
+        # 性能叠加层：浮在波形区域左上角，不参与布局
+        self.performance_overlay = QLabel(self.stacked_widget)
+        self.performance_overlay.setStyleSheet(
+            "background-color: rgba(0, 0, 0, 180); color: #ffff66; font-family: monospace; "
+            "font-size: 12px; padding: 6px; border-radius: 4px;")
+        self.performance_overlay.move(12, 12)
+        self.performance_overlay.hide()
+
+        self.set_port_list([])
         self.refresh_ports_button.clicked.connect(self.update_port_list)
+        self.replay_button.clicked.connect(self.choose_replay_file)
+
+    def _create_analysis_group(self):
+        """创建5分钟HRV分析面板（频域与非线性指标，由后台线程计算）"""
+        analysis_group = QGroupBox("HRV分析（5分钟）")
+        analysis_layout = QGridLayout()
+        analysis_layout.setSpacing(8)
+
+        self.analysis_labels = {}
+        analysis_panels = [
+            ('LF', "LF", "ms²"), ('HF', "HF", "ms²"), ('LF_HF', "LF/HF", ""),
+            ('SD1', "SD1", "ms"), ('SD2', "SD2", "ms"), ('SampEn', "SampEn", "")
+        ]
+        for i, (key, name, unit) in enumerate(analysis_panels):
+            name_label = QLabel(f"{name}" + (f" ({unit})" if unit else ""))
+            name_label.setStyleSheet("color: #66ccff;")
+            value_label = QLabel("--")
+            value_label.setStyleSheet("font-size: 16px; color: #66ccff; font-weight: bold;")
+            value_label.setMinimumWidth(70)
+            row, column = divmod(i, 3)
+            analysis_layout.addWidget(name_label, row * 2, column)
+            analysis_layout.addWidget(value_label, row * 2 + 1, column)
+            self.analysis_labels[key] = value_label
+
+        analysis_group.setLayout(analysis_layout)
+        return analysis_group
+
+    def _create_template_group(self):
+        """创建平均心拍面板：十二导联的中值模板按标准报告格式排成两列"""
+        template_group = QGroupBox("平均心拍")
+        template_layout = QVBoxLayout()
+        template_layout.setSpacing(2)
+
+        self.template_plot = pg.PlotWidget()
+        self.template_plot.setBackground('#1e1e1e')
+        self.template_plot.setMinimumSize(240, 140)
+        plot = self.template_plot.getPlotItem()
+        plot.hideAxis('bottom')
+        plot.hideAxis('left')
+        plot.setMouseEnabled(x=False, y=False)
+        plot.hideButtons()
+        plot.setMenuEnabled(False)
+        self.template_curves = []
+        lead_names = ['I', 'II', 'III', 'aVR', 'aVL', 'aVF', 'V1', 'V2', 'V3', 'V4', 'V5', 'V6']
+        for channel, lead in enumerate(lead_names):
+            self.template_curves.append(plot.plot(pen=pg.mkPen('#ffcc33', width=1)))
+            label = pg.TextItem(lead, color='#aaaaaa', anchor=(0, 0.5))
+            label.setFont(QFont('Arial', 7))
+            label.setPos((channel // 6) * 1.3, -(channel % 6))
+            plot.addItem(label)
+        plot.setXRange(0, 2.55, padding=0.02)
+        plot.setYRange(-5.6, 0.6, padding=0)
+        template_layout.addWidget(self.template_plot)
+
+        self.template_info_label = QLabel("心拍: 0  剔除: 0")
+        self.template_info_label.setStyleSheet("font-size: 12px; color: #ffcc33;")
+        template_layout.addWidget(self.template_info_label)
+
+        template_group.setLayout(template_layout)
+        return template_group
+
+    def _create_alarm_group(self):
+        """创建报警面板：正在报警的项目和最近的报警/解除事件"""
+        alarm_group = QGroupBox("报警")
+        alarm_layout = QVBoxLayout()
+        alarm_layout.setSpacing(4)
+
+        self.alarm_status_label = QLabel()
+        self.alarm_status_label.setWordWrap(True)
+        self.alarm_status_label.setMinimumWidth(180)
+        alarm_layout.addWidget(self.alarm_status_label)
+
+        self.alarm_events_label = QLabel()
+        self.alarm_events_label.setStyleSheet("font-size: 12px; color: #aaaaaa;")
+        self.alarm_events_label.setAlignment(Qt.AlignTop)
+        alarm_layout.addWidget(self.alarm_events_label, 1)
+
+        alarm_group.setLayout(alarm_layout)
+        self.update_alarms({})
+        return alarm_group
+
+    def _create_render_group(self):
+        """创建显示性能设置面板"""
+        render_group = QGroupBox("显示设置")
+        render_layout = QGridLayout()
+        render_layout.setSpacing(6)
+
+        settings = self.render_settings
+        self.render_checkboxes = {}
+        options = [
+            ('antialias', "抗锯齿"),
+            ('adaptive_fps', "自适应帧率"),
+            ('clip_to_view', "视图裁剪"),
+            ('auto_downsample', "自动降采样"),
+            ('skip_finite_check', "跳过有限值检查"),
+            ('use_opengl', "OpenGL")
+        ]
+        for i, (key, text) in enumerate(options):
+            checkbox = QCheckBox(text)
+            checkbox.setStyleSheet("color: #ffffff;")
+            checkbox.setChecked(getattr(settings, key))
+            checkbox.toggled.connect(self.on_render_settings_changed)
+            self.render_checkboxes[key] = checkbox
+            render_layout.addWidget(checkbox, i // 2, i % 2)
+
+        row = (len(options) + 1) // 2
+        fps_label = QLabel("目标帧率:")
+        self.fps_spinbox = QSpinBox()
+        self.fps_spinbox.setRange(5, 120)
+        self.fps_spinbox.setValue(settings.target_fps)
+        self.fps_spinbox.valueChanged.connect(self.on_render_settings_changed)
+        render_layout.addWidget(fps_label, row, 0)
+        render_layout.addWidget(self.fps_spinbox, row, 1)
+
+        # 实时帧率和绘制耗时显示
+        self.fps_label = QLabel("FPS: 0")
+        self.paint_time_label = QLabel("绘制: 0.0 ms")
+        render_layout.addWidget(self.fps_label, row + 1, 0)
+        render_layout.addWidget(self.paint_time_label, row + 1, 1)
+
+        # 打开时统计各处理阶段耗时并在波形上方显示（关闭时几乎没有开销）
+        self.overlay_checkbox = QCheckBox("性能叠加层")
+        self.overlay_checkbox.setStyleSheet("color: #ffffff;")
+        self.overlay_checkbox.toggled.connect(self.set_performance_overlay)
+        render_layout.addWidget(self.overlay_checkbox, row + 2, 0, 1, 2)
+
+        self.render_stats_timer = QTimer(self)
+        self.render_stats_timer.timeout.connect(self.update_render_stats)
+        self.render_stats_timer.start(500)
+
+        render_group.setLayout(render_layout)
+        return render_group
+
+    def on_render_settings_changed(self):
+        """界面上修改了显示设置：保存并应用"""
+        settings = self.render_settings
+        for key, checkbox in self.render_checkboxes.items():
+            setattr(settings, key, checkbox.isChecked())
+        settings.target_fps = self.fps_spinbox.value()
+        settings.save()
+        self.apply_render_settings()
+
+    def apply_render_settings(self):
+        """把显示设置应用到两个导联页面的所有曲线"""
+        settings = self.render_settings
+        pg.setConfigOptions(antialias=settings.antialias)
+
+        for widget in (self.limb_leads_widget, self.chest_leads_widget):
+            try:
+                widget.useOpenGL(settings.use_opengl)
+            except Exception as e:
+                print(f"OpenGL设置失败: {e}")
+
+        for curve in self.curves:
+            curve.setData(antialias=settings.antialias)
+            curve.setClipToView(settings.clip_to_view)
+            curve.setDownsampling(auto=settings.auto_downsample)
+            # 扫描模式的擦除带是 NaN，必须保留有限值检查
+            curve.setSkipFiniteCheck(settings.skip_finite_check and not self.sweep_mode)
+
+        self.frame_governor.target_fps = settings.target_fps
+        self.frame_governor.adaptive = settings.adaptive_fps
+        self.frame_governor.reset()
+        self.refresh_plots(force=True)
+
+    def update_render_stats(self):
+        """更新帧率和绘制耗时显示"""
+        self.fps_label.setText(f"FPS: {self.frame_governor.fps:.0f}")
+        self.paint_time_label.setText(f"绘制: {self.frame_governor.paint_time * 1000:.1f} ms")
+
+    def set_performance_overlay(self, enabled):
+        """显示或隐藏性能叠加层，同时打开或关闭界面线程的耗时统计"""
+        self.metrics.enabled = enabled
+        self.awaiting_paint = None
+        self.performance_overlay.setVisible(enabled)
+        if enabled:
+            self.performance_overlay.setText("等待数据...")
+            self.performance_overlay.adjustSize()
+            self.performance_overlay.raise_()
+
+    def set_performance_text(self, text):
+        """更新性能叠加层的内容"""
+        self.performance_overlay.setText(text)
+        self.performance_overlay.adjustSize()
+
     def setup_plots(self):
         """设置图表"""
         self.sample_rate = 360
@@ -241,8 +515,13 @@ class ECGMonitorUI(QMainWindow):
         self.buffer_size = int(self.time_window * self.sample_rate)
         self.time_array = np.linspace(0, self.time_window, self.buffer_size)
 
-        # 设置绘图样式
-        pg.setConfigOptions(antialias=True)
+        # 绘图数据环形缓冲区：滚动模式下每个样本同时写入前后两半，
+        # 任意时刻最近 buffer_size 个样本都是一段连续内存，可直接用视图绘制
+        self.plot_buffer = np.zeros((12, 2 * self.buffer_size))
+        self.write_pos = 0  # 下一个样本的写入位置
+        self.sweep_mode = False  # 扫描模式：波形从左到右刷新，前方留出擦除带
+        self.sweep_gap = int(0.05 * self.sample_rate)  # 擦除带宽度（样本数）
+        self.plots_dirty = False  # 有新数据尚未绘制
 
         # 设置背景颜色
         self.limb_leads_widget.setBackground('#1e1e1e')
@@ -250,6 +529,7 @@ class ECGMonitorUI(QMainWindow):
 
         self.plots = []
         self.curves = []
+        self.lead_names = []
 
         plot_params = {
             'limb': {
@@ -269,8 +549,16 @@ class ECGMonitorUI(QMainWindow):
                 curve = plot.plot(pen=pg.mkPen('#00ff00', width=1.5))
                 self.plots.append(plot)
                 self.curves.append(curve)
+                self.lead_names.append(lead)
+
+        # 第三页：整个会话的历史回看
+        self.review_widget = HistoryReviewWidget(self.lead_names)
+        self.stacked_widget.addWidget(self.review_widget)
+        self.live_page = 0  # 回看前所在的实时页面
 
         self.switch_view_button.clicked.connect(self.switch_view)
+        self.review_button.toggled.connect(self.set_review_mode)
+        self.sweep_mode_button.toggled.connect(self.set_sweep_mode)
         self.clear_button.clicked.connect(self.clear_plots)
 
     def _setup_single_plot(self, plot, lead_name):
@@ -292,11 +580,44 @@ class ECGMonitorUI(QMainWindow):
         plot.setMenuEnabled(False)
 
     def update_port_list(self):
-        """更新可用串口列表"""
+        """在后台线程中枚举串口，完成后由 set_port_list 更新列表"""
+        self.refresh_ports_button.setEnabled(False)
+        threading.Thread(target=self._enumerate_ports, name='port-enumeration', daemon=True).start()
+
+    def _enumerate_ports(self):
+        try:
+            import serial.tools.list_ports
+            ports = [port.device for port in serial.tools.list_ports.comports()]
+        except Exception as e:
+            print(f"串口枚举错误: {e}")
+            ports = []
+        # 跨线程发射信号，set_port_list 在界面线程中执行
+        self.data_receiver.ports_listed.emit(ports)
+
+    def set_port_list(self, ports):
+        """更新可用串口列表，保留当前选择"""
+        current = self.port_combo.currentText()
         self.port_combo.clear()
-        ports = serial.tools.list_ports.comports()
         for port in ports:
-            self.port_combo.addItem(port.device)
+            self.port_combo.addItem(port)
+        # 无设备时可使用模拟信号
+        self.port_combo.addItem('synthetic')
+        index = self.port_combo.findText(current)
+        if index >= 0:
+            self.port_combo.setCurrentIndex(index)
+        self.refresh_ports_button.setEnabled(True)
+
+    def choose_replay_file(self):
+        """选择回放的文本日志或录制目录"""
+        path, _ = QFileDialog.getOpenFileName(self, "选择回放文件", "",
+                                              "心电数据 (*.txt *.log *.csv meta.json);;所有文件 (*)")
+        if not path:
+            return
+        # 选择录制目录中的 meta.json 时回放整个录制
+        if os.path.basename(path) == 'meta.json':
+            path = os.path.dirname(path)
+        self.port_combo.addItem(f'replay:{path}')
+        self.port_combo.setCurrentIndex(self.port_combo.count() - 1)
 
     def update_hrv_display(self, hrv_dict):
         """更新HRV指标显示"""
@@ -307,28 +628,205 @@ class ECGMonitorUI(QMainWindow):
             if key in hrv_dict and key in self.data_labels:
                 self.data_labels[key].setText(f"{hrv_dict[key]:.1f}")
 
-    def update_plot_data(self, channel, value):
-        """更新指定通道的数据"""
-        if 0 <= channel < len(self.data_buffers):
-            self.data_buffers[channel].append(value)
-            self.curves[channel].setData(self.time_array, list(self.data_buffers[channel]))
+    def update_beat_templates(self, summary):
+        """显示各导联的中值心拍模板（所有导联同一幅度比例，便于比较 ST 段）"""
+        template = summary.get('template')
+        if template is None:
+            for curve in self.template_curves:
+                curve.setData([], [])
+            self.template_info_label.setText("心拍: 0  剔除: 0")
+            return
+        length = len(template)
+        x = np.arange(length) / length
+        scale = 0.45 / max(np.max(np.abs(template - np.median(template, axis=0))), 1e-6)
+        for channel, curve in enumerate(self.template_curves):
+            column, row = divmod(channel, 6)
+            y = (template[:, channel] - np.median(template[:, channel])) * scale - row
+            curve.setData(x + column * 1.3 + 0.25, y)
+        text = f"心拍: {summary['beats']}  剔除: {summary['rejected']}"
+        if summary.get('correlation') is not None:
+            text += f"  相关: {summary['correlation']:.2f}"
+        self.template_info_label.setText(text)
+
+    def update_alarms(self, summary):
+        """显示正在报警的项目（分导联的报警合并为一项）和最近 5 条事件"""
+        lead_names = ['I', 'II', 'III', 'aVR', 'aVL', 'aVF', 'V1', 'V2', 'V3', 'V4', 'V5', 'V6']
+        active = {}
+        for alarm in summary.get('active', []):
+            leads = active.setdefault(alarm['label'], [])
+            if alarm['lead'] >= 0:
+                leads.append(lead_names[alarm['lead']])
+        if active:
+            text = '  '.join(label + (f"({', '.join(leads)})" if leads else '') for label, leads in active.items())
+            self.alarm_status_label.setText(text)
+            self.alarm_status_label.setStyleSheet("font-size: 16px; font-weight: bold; color: #ff4444;")
+        else:
+            self.alarm_status_label.setText("无报警")
+            self.alarm_status_label.setStyleSheet("font-size: 16px; font-weight: bold; color: #33ff33;")
+
+        fs = summary.get('fs', 250)
+        lines = []
+        for event in reversed(summary.get('recent', [])[-5:]):
+            minutes, seconds = divmod(int(event['sample'] / fs), 60)
+            lead = f"({lead_names[event['lead']]})" if event['lead'] >= 0 else ''
+            state = "报警" if event['active'] else "解除"
+            lines.append(f"{minutes:02d}:{seconds:02d} {event['label']}{lead} {state}")
+        self.alarm_events_label.setText('\n'.join(lines))
+
+    def update_hrv_analysis_display(self, results):
+        """更新频域和非线性HRV指标显示"""
+        for key, label in self.analysis_labels.items():
+            value = results.get(key)
+            if value is None or not np.isfinite(value):
+                label.setText("--")
+            else:
+                label.setText(f"{value:.2f}" if key in ('LF_HF', 'SampEn') else f"{value:.0f}")
+
+    def update_quality_badges(self, quality):
+        """在各导联标题后显示信号质量标记"""
+        for channel, plot in enumerate(self.plots):
+            title = f'导联 {self.lead_names[channel]}'
+            if channel < len(quality.get('quality', [])):
+                score = quality['quality'][channel]
+                if quality['lead_off'][channel]:
+                    color, text = '#ff4444', '脱落'
+                elif score < 0.3:
+                    color, text = '#ff4444', f'差 {score:.0%}'
+                elif score < 0.7:
+                    color, text = '#ffaa00', f'中 {score:.0%}'
+                else:
+                    color, text = '#44dd44', f'良 {score:.0%}'
+                title += f' <span style="color: {color}; font-size: 11pt;">● {text}</span>'
+            plot.setTitle(title, color='#ffffff', size='14pt')
+
+    def update_plot_data(self, data, arrival=None):
+        """写入一批新数据，data 形状为 (n_samples, 12)；实际绘制在 refresh_plots 中完成
+
+        arrival 为最新样本对应的字节到达时刻（perf_counter），用于统计端到端延迟。
+        """
+        with self.metrics.timer('ui_update'):
+            self._write_plot_buffer(np.asarray(data))
+        if arrival is not None:
+            self.latest_arrival = arrival
+
+    def _write_plot_buffer(self, data):
+        n = len(data)
+        if n == 0:
+            return
+        if n > self.buffer_size:
+            self.write_pos = (self.write_pos + n - self.buffer_size) % self.buffer_size
+            data = data[-self.buffer_size:]
+            n = self.buffer_size
+
+        index = (self.write_pos + np.arange(n)) % self.buffer_size
+        self.plot_buffer[:, index] = data.T
+        self.write_pos = (self.write_pos + n) % self.buffer_size
+
+        if self.sweep_mode:
+            # 在写入位置前方清出一段擦除带
+            erase = (self.write_pos + np.arange(self.sweep_gap)) % self.buffer_size
+            self.plot_buffer[:, erase] = np.nan
+        else:
+            self.plot_buffer[:, index + self.buffer_size] = data.T
+
+        self.plots_dirty = True
+
+    def visible_channels(self):
+        """当前页面上显示的通道"""
+        page = self.stacked_widget.currentIndex()
+        if page > 1:  # 回看页面
+            return range(0)
+        return range(page * 6, page * 6 + 6)
+
+    def refresh_plots(self, force=False):
+        """把缓冲区中的数据绘制到当前页面的曲线上，每条曲线每次刷新最多更新一次"""
+        metrics = self.metrics
+        if metrics.enabled:
+            self._record_display_latency()
+        if not (self.plots_dirty or force):
+            return
+
+        start = time.perf_counter()
+        if self.sweep_mode:
+            window = self.plot_buffer[:, :self.buffer_size]
+        else:
+            window = self.plot_buffer[:, self.write_pos:self.write_pos + self.buffer_size]
+
+        # 隐藏页面上的曲线不更新，切换视图时再补画
+        for channel in self.visible_channels():
+            self.curves[channel].setData(self.time_array, window[channel])
+        self.plots_dirty = False
+
+        # 本帧更新耗时加上上一帧实际绘制的耗时
+        now = time.perf_counter()
+        update_time = now - start
+        paint_time = 0.0
+        for widget in (self.limb_leads_widget, self.chest_leads_widget):
+            paint_time += widget.take_paint_time()
+        self.frame_governor.record_frame(update_time + paint_time)
+        if metrics.enabled:
+            metrics.record('set_data', update_time)
+            if paint_time > 0:
+                metrics.record('paint', paint_time)
+            if self.latest_arrival is not None:
+                self.awaiting_paint = (self.latest_arrival, now)
+                self.latest_arrival = None
+
+    def _record_display_latency(self):
+        """上一帧交给曲线的数据已绘制到屏幕时，记录从读到串口字节到绘制完成的端到端延迟"""
+        if self.awaiting_paint is None:
+            return
+        arrival, submitted = self.awaiting_paint
+        painted_at = max(self.limb_leads_widget.painted_at, self.chest_leads_widget.painted_at)
+        if painted_at >= submitted:
+            self.metrics.record('end_to_end', painted_at - arrival)
+            self.awaiting_paint = None
+
+    def set_sweep_mode(self, enabled):
+        """切换滚动/扫描显示模式"""
+        self.sweep_mode = enabled
+        connect = 'finite' if enabled else 'all'
+        for curve in self.curves:
+            curve.setData(connect=connect)
+        self.apply_render_settings()
+        self.clear_plots()
 
     def switch_view(self):
         """切换视图"""
+        if self.review_button.isChecked():
+            self.review_button.setChecked(False)
+            return
         current_index = self.stacked_widget.currentIndex()
         new_index = (current_index + 1) % 2
         self.stacked_widget.setCurrentIndex(new_index)
+        self.refresh_plots(force=True)
+
+    def set_review_mode(self, enabled):
+        """切换到历史回看页面，或回到之前的实时页面"""
+        if enabled:
+            self.live_page = self.stacked_widget.currentIndex()
+            self.stacked_widget.setCurrentWidget(self.review_widget)
+        else:
+            self.stacked_widget.setCurrentIndex(self.live_page)
+            self.refresh_plots(force=True)
 
     def clear_plots(self):
         """清除所有图表数据"""
-        # 重置所有数据缓冲区
-        for i, buffer in enumerate(self.data_buffers):
-            buffer.clear()
-            buffer.extend([0] * self.buffer_size)
-            # 更新曲线显示
-            self.curves[i].setData(self.time_array, list(buffer))
+        # 重置数据缓冲区
+        self.plot_buffer.fill(0)
+        self.write_pos = 0
+        self.latest_arrival = None
+        self.awaiting_paint = None
+        for i, curve in enumerate(self.curves):
+            curve.setData(self.time_array, self.plot_buffer[i, :self.buffer_size])
+        self.plots_dirty = False
 
         # 重置所有数值显示
         self.data_labels['heart_rate'].setText("0")
         for key in ['SDNN', 'RMSSD', 'pNN50']:
-            self.data_labels[key].setText("0")
\ No newline at end of file
+            self.data_labels[key].setText("0")
+        for label in self.analysis_labels.values():
+            label.setText("--")
+        self.update_beat_templates({})
+        self.update_alarms({})
+        self.update_quality_badges({})
\ No newline at end of file